@@ -0,0 +1,207 @@
+"""
+ABC classification of SKUs by revenue
+
+SKUs are ranked by their revenue over the last ``periods`` business days
+(``Config.ABC_ANALYSIS_PERIODS``) and classed by the cumulative share of
+total revenue ranked above them: A while that share is below ``a_share``,
+B below ``b_share``, C for the rest and for SKUs without sales.
+
+Revenue is kept as one bucket per business day and SKU, plus running
+totals over the window. ``rebuild`` fills them from the sales ledger in a
+single pass. After that the window moves incrementally: either the
+analyzer is a sale listener, or a nightly job hands it the newest day's
+sales with ``add_day``. Moving to a new day only subtracts the buckets
+that left the window from the totals instead of rescanning it.
+Classification is a single NumPy sort over the totals and is cached until
+they change.
+
+``persist`` writes classes to a SQLAlchemy model's ``abc_classification``
+column in one executemany UPDATE.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+A_SHARE = 0.8
+B_SHARE = 0.95
+CLASSES = ('A', 'B', 'C')
+
+
+class ABCAnalyzer:
+    """Revenue per SKU over a sliding window of days, classed A, B or C"""
+
+    def __init__(self, periods=90, a_share=A_SHARE, b_share=B_SHARE, timezone=None):
+        self.periods = periods
+        self.a_share = a_share
+        self.b_share = b_share
+        # Days are business days in this timezone (server local time if None)
+        self.timezone = timezone
+        # {sku: revenue} per day with sales in the window
+        self._days = {}
+        self._totals = {}
+        # Last day the window was advanced to
+        self._latest = None
+        # Bumped whenever the totals change
+        self.revision = 0
+        self._ranked = None
+        self._lock = threading.Lock()
+
+    def business_day(self, when=None):
+        """Business date of a point in time; naive times are server local time"""
+        if when is None:
+            return datetime.now(self.timezone).date()
+        if self.timezone is not None:
+            when = when.astimezone(self.timezone)
+        return when.date()
+
+    def window_start(self, today=None):
+        """First business day inside the window ending ``today``"""
+        if today is None:
+            today = self.business_day()
+        return today - timedelta(days=self.periods - 1)
+
+    def rebuild(self, sales, today=None):
+        """Replace the buckets with the sales of the window, read in one pass
+
+        ``sales`` may run past the window on either side (e.g. a whole
+        ledger); those sales are skipped.
+        """
+        if today is None:
+            today = self.business_day()
+        start = self.window_start(today)
+        days = {}
+        for sale in sales:
+            day = self.business_day(datetime.fromisoformat(sale['date']))
+            if start <= day <= today:
+                _add_lines(days.setdefault(day, {}), sale['items'])
+
+        totals = {}
+        for revenue in days.values():
+            for sku, amount in revenue.items():
+                totals[sku] = totals.get(sku, 0.0) + amount
+        with self._lock:
+            self._days = days
+            self._totals = totals
+            self._latest = today
+            self.revision += 1
+
+    def record_sale(self, sale, lines):
+        """Sale listener: add the sale's revenue to its day"""
+        day = self.business_day(datetime.fromisoformat(sale['date']))
+        with self._lock:
+            if self._latest is None or day > self._latest:
+                self._advance(day)
+            if day < self.window_start(self._latest):
+                return
+            _add_lines(self._days.setdefault(day, {}), sale['items'])
+            _add_lines(self._totals, sale['items'])
+            self.revision += 1
+
+    def add_day(self, day, sales):
+        """Set one day's bucket from its sales and move the window up to it
+
+        The nightly incremental run; repeating it for the same day replaces
+        that day's revenue rather than adding it twice.
+        """
+        bucket = {}
+        for sale in sales:
+            _add_lines(bucket, sale['items'])
+        with self._lock:
+            if self._latest is None or day > self._latest:
+                self._advance(day)
+            if day < self.window_start(self._latest):
+                return
+            for sku, amount in self._days.pop(day, {}).items():
+                self._totals[sku] -= amount
+            for sku, amount in bucket.items():
+                self._totals[sku] = self._totals.get(sku, 0.0) + amount
+            self._days[day] = bucket
+            self._totals = {sku: amount for sku, amount in self._totals.items() if amount > 1e-9}
+            self.revision += 1
+
+    def advance(self, today=None):
+        """Close the days up to ``today``: drop the buckets that left the window"""
+        if today is None:
+            today = self.business_day()
+        with self._lock:
+            if self._latest is None or today > self._latest:
+                self._advance(today)
+
+    def _advance(self, today):
+        self._latest = today
+        start = self.window_start(today)
+        expired = [day for day in self._days if day < start]
+        for day in expired:
+            for sku, amount in self._days.pop(day).items():
+                remaining = self._totals[sku] - amount
+                if remaining > 1e-9:
+                    self._totals[sku] = remaining
+                else:
+                    del self._totals[sku]
+        if expired:
+            self.revision += 1
+
+    def revenue(self):
+        """Revenue per SKU over the window"""
+        with self._lock:
+            return dict(self._totals)
+
+    def classify(self, skus=(), today=None):
+        """``{sku: class}`` for every SKU with revenue in the window and every SKU in ``skus``"""
+        self.advance(today)
+        with self._lock:
+            if self._ranked is None or self._ranked[0] != self.revision:
+                self._ranked = (self.revision, self._rank())
+            classes = dict(self._ranked[1])
+        for sku in skus:
+            classes.setdefault(sku, 'C')
+        return classes
+
+    def _rank(self):
+        """Class per SKU from one sort by revenue; caller holds the lock"""
+        skus = list(self._totals)
+        revenue = np.fromiter(self._totals.values(), dtype=float, count=len(skus))
+        order = np.argsort(-revenue, kind='stable')
+        ranked = revenue[order]
+        # Share of revenue ranked above each SKU
+        above = (np.cumsum(ranked) - ranked) / max(ranked.sum(), 1e-12)
+        codes = np.searchsorted([self.a_share, self.b_share], above, side='right')
+        labels = np.array(CLASSES)[codes]
+        return {skus[i]: str(label) for i, label in zip(order.tolist(), labels)}
+
+    def summary(self, classes):
+        """SKU count and revenue per class"""
+        totals = self.revenue()
+        result = {label: {'count': 0, 'revenue': 0.0} for label in CLASSES}
+        for sku, label in classes.items():
+            result[label]['count'] += 1
+            result[label]['revenue'] += totals.get(sku, 0.0)
+        return result
+
+
+def _add_lines(revenue, items):
+    for item in items:
+        revenue[item['sku']] = revenue.get(item['sku'], 0.0) + item['quantity'] * item['price']
+
+
+def persist(session, model, classes, key='sku', column='abc_classification'):
+    """Write classes to a model's column in one executemany UPDATE
+
+    Reads the current classes with one query and only updates rows whose
+    class changed; returns how many that was. The UPDATE bypasses the ORM,
+    so drop the model from any ModelCache afterwards.
+    """
+    # Only the database-backed app needs SQLAlchemy; app_deploy runs without it
+    from sqlalchemy import bindparam, select
+
+    table = model.__table__
+    current = dict(session.execute(select(table.c[key], table.c[column])).all())
+    changed = [{'match': value, 'label': label} for value, label in classes.items()
+               if value in current and current[value] != label]
+    if changed:
+        statement = (table.update().where(table.c[key] == bindparam('match'))
+                     .values({column: bindparam('label')}))
+        session.execute(statement, changed)
+    return len(changed)
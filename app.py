@@ -9,17 +9,20 @@ LinkedIn: https://www.linkedin.com/in/baroudi-mustapha-2a257a289/
 """
 
 import os
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, jsonify, request
 from datetime import datetime, timedelta
 import json
 import random
 import math
 
+from inventory_store import ProductStore
+from template_cache import CompiledPage
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sims-mustapha-baroudi-2024')
 
 # Sample data for the demo
-products = [
+SAMPLE_PRODUCTS = [
     {
         'id': 1, 
         'name': 'Cotton Fabric - Blue', 
@@ -72,19 +75,31 @@ products = [
     }
 ]
 
+# Product catalog with running dashboard totals
+store = ProductStore(SAMPLE_PRODUCTS)
+
 # Sales data
 sales = []
 next_sale_id = 1
 
+def index_context():
+    """Live dashboard figures for the main page"""
+    totals = store.aggregates
+    return {
+        'total_products': totals.total_products,
+        'inventory_value': f'{totals.inventory_value:,.2f}',
+        'low_stock_count': totals.low_stock_count
+    }
+
 @app.route('/')
 def index():
     """Main application route - serves the interactive demo"""
-    return render_template_string(MAIN_TEMPLATE)
+    return index_page.response(store.version, index_context)
 
 @app.route('/api/products')
 def get_products():
     """API endpoint to get all products"""
-    return jsonify(products)
+    return jsonify(store.all())
 
 @app.route('/health')
 def health_check():
@@ -276,7 +291,7 @@ MAIN_TEMPLATE = '''
                 <div class="col-md-3 mb-4">
                     <div class="card metric-card primary text-white">
                         <div class="card-body text-center">
-                            <h2 class="fw-bold mb-1">5</h2>
+                            <h2 class="fw-bold mb-1">{{ total_products }}</h2>
                             <p class="mb-0 opacity-90">Total Products</p>
                             <small class="opacity-75">Active inventory</small>
                         </div>
@@ -285,7 +300,7 @@ MAIN_TEMPLATE = '''
                 <div class="col-md-3 mb-4">
                     <div class="card metric-card success text-white">
                         <div class="card-body text-center">
-                            <h2 class="fw-bold mb-1">18,840 MAD</h2>
+                            <h2 class="fw-bold mb-1">{{ inventory_value }} MAD</h2>
                             <p class="mb-0 opacity-90">Inventory Value</p>
                             <small class="opacity-75">Total worth</small>
                         </div>
@@ -303,7 +318,7 @@ MAIN_TEMPLATE = '''
                 <div class="col-md-3 mb-4">
                     <div class="card metric-card warning text-white">
                         <div class="card-body text-center">
-                            <h2 class="fw-bold mb-1">2</h2>
+                            <h2 class="fw-bold mb-1">{{ low_stock_count }}</h2>
                             <p class="mb-0 opacity-90">Low Stock</p>
                             <small class="opacity-75">Need attention</small>
                         </div>
@@ -460,6 +475,9 @@ MAIN_TEMPLATE = '''
 </html>
 '''
 
+# Compiled once at startup; re-rendered only when the store version changes
+index_page = CompiledPage(app, MAIN_TEMPLATE)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
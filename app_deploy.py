@@ -9,17 +9,44 @@ LinkedIn: https://www.linkedin.com/in/baroudi-mustapha-2a257a289/
 """
 
 import os
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from datetime import datetime, timedelta
 import json
-import random
-import math
+import numpy as np
+
+from config import Config
+from inventory_store import (ProductStore, DuplicateSKUError, PRODUCT_FIELDS,
+                             encode_cursor, decode_cursor)
+from sales_engine import SaleEngine, SaleError
+from sale_ids import SaleIdAllocator, worker_id
+from sales_ledger import SalesLedger
+from journal import Journal
+from shared_state import SharedState, SharedSalesLedger
+from response_cache import VersionedResponseCache, make_etag
+from template_cache import CompiledPage
+from forecasting import ForecastEngine, DemandForecaster
+from abc_analysis import ABCAnalyzer, CLASSES as ABC_CLASSES
+from replenishment import ReplenishmentEngine
+from stock_alerts import AlertEngine
+from live_events import EventHub, stream as event_stream
+from search_index import SearchIndex
+from ttl_cache import TTLCache
+from catalog_import import CatalogImporter, ImportFormatError, IMPORT_EXTENSIONS, iter_rows
+from exports import (EXPORT_FORMATS, PRODUCT_COLUMNS, SALE_COLUMNS, encode,
+                     iter_products, iter_sales, parse_date_range)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sims-mustapha-baroudi-2024')
+app.config['MAX_CONTENT_LENGTH'] = Config.MAX_CONTENT_LENGTH
+
+# Largest page a client may request from /api/products
+MAX_PAGE_SIZE = 500
+
+# Most entries accepted by one bulk stock adjustment
+MAX_BULK_ADJUSTMENTS = 10000
 
 # Sample data for the demo
-products = [
+SAMPLE_PRODUCTS = [
     {
         'id': 1, 
         'name': 'Cotton Fabric - Blue', 
@@ -72,163 +99,517 @@ products = [
     }
 ]
 
-# Sales data
-sales = []
-next_sale_id = 1
+# Product catalog, indexed by id, SKU, category and status
+store = ProductStore(SAMPLE_PRODUCTS)
+
+# Catalog files are imported in chunks through the store's bulk upsert
+catalog_importer = CatalogImporter(store)
+
+if Config.STATE_BACKEND == 'sqlite':
+    # Several workers: every mutation is serialized through one SQLite
+    # database, which also holds the sales, and each worker's store follows
+    # its change feed
+    shared_state = SharedState(Config.SHARED_STATE_PATH, node_id=Config.NODE_ID)
+    sale_engine = SaleEngine(store, SharedSalesLedger(shared_state))
+    shared_state.attach(store, sale_engine)
+else:
+    shared_state = None
+    # Sales are applied all-or-nothing under per-product locks and kept in a
+    # ledger that spills older sales to compressed segments on disk
+    sale_engine = SaleEngine(store, SalesLedger(Config.SALES_LEDGER_DIR, Config.SALES_HOT_LIMIT),
+                             SaleIdAllocator(worker_id(Config.NODE_ID, 0)))
+    # Every product change and sale is journaled before it is acknowledged; a
+    # restart restores the latest snapshot and replays the log written after it
+    journal = Journal(Config.JOURNAL_DIR, store, sale_engine,
+                      snapshot_interval=Config.JOURNAL_SNAPSHOT_INTERVAL,
+                      commit_delay=Config.JOURNAL_COMMIT_DELAY)
+    journal.recover()
+sales = sale_engine.sales
+
+# Holt-Winters demand models per SKU and category: rebuilt from the ledger's
+# recent sales at startup, then updated by each sale
+demand_forecaster = DemandForecaster(horizon_days=Config.FORECAST_PERIODS,
+                                     timezone=Config.business_timezone())
+demand_forecaster.replay(
+    sales.query(datetime.combine(demand_forecaster.business_day() - timedelta(days=Config.FORECAST_REPLAY_DAYS),
+                                 datetime.min.time())),
+    {product['sku']: product['category'] for product in store.all()})
+sale_engine.listeners.append(demand_forecaster.record_sale)
+
+# Revenue per SKU over the ABC window in daily buckets: rebuilt from the
+# ledger in one pass at startup, then moved along by each sale
+abc_analyzer = ABCAnalyzer(Config.ABC_ANALYSIS_PERIODS, Config.ABC_CLASS_A_SHARE,
+                           Config.ABC_CLASS_B_SHARE, timezone=Config.business_timezone())
+# A day of slack for the business timezone; rebuild drops what falls outside
+abc_analyzer.rebuild(sales.query(datetime.combine(abc_analyzer.window_start() - timedelta(days=1),
+                                                  datetime.min.time())))
+sale_engine.listeners.append(abc_analyzer.record_sale)
+
+def sku_demand_rate(product):
+    """Smoothed daily demand of a product's SKU (0 without sales)"""
+    levels, _ = demand_forecaster.demand_rates([DemandForecaster.sku_key(product['sku'])])
+    return float(levels[0])
+
+# Stock level transitions raised by each mutation, and the products below
+# the normal level ordered by days of cover
+alert_engine = AlertEngine(demand_rate=sku_demand_rate)
+alert_engine.attach(store)
+
+# Stock deltas, sales and alert transitions pushed to open dashboards
+event_hub = EventHub(queue_size=Config.SSE_QUEUE_SIZE, max_subscribers=Config.SSE_MAX_STREAMS)
+event_hub.attach(store, sale_engine, alert_engine)
+
+# SKU prefix and accent-insensitive name search, kept current by the store
+search_index = SearchIndex()
+search_index.attach(store)
+
+# EOQ, safety stock and reorder points for the whole catalog in one pass
+replenishment_engine = ReplenishmentEngine(Config.ORDERING_COST, Config.HOLDING_COST_RATE,
+                                           Config.SERVICE_LEVEL_Z, Config.DEFAULT_LEAD_TIME_DAYS,
+                                           Config.DEFAULT_SAFETY_STOCK)
+
+# Serialized forecasts per series, horizon and business date
+forecast_cache = TTLCache(maxsize=1024, ttl=15 * 60)
+
+def invalidate_forecasts(sale, lines):
+    """Sale listener: drop cached forecasts of every series the sale touched"""
+    for product, _ in lines:
+        forecast_cache.invalidate_tag(DemandForecaster.sku_key(product['sku']))
+        forecast_cache.invalidate_tag(DemandForecaster.category_key(product['category']))
+
+sale_engine.listeners.append(invalidate_forecasts)
+
+# Synthetic demand for series without sales; set FORECAST_SEED for reproducible output
+forecast_seed = os.environ.get('FORECAST_SEED')
+forecast_engine = ForecastEngine(horizon_days=Config.FORECAST_PERIODS,
+                                 seed=int(forecast_seed) if forecast_seed else None)
+
+# Serialized /api/products pages for the current store version
+catalog_cache = VersionedResponseCache()
+
+@app.before_request
+def refresh_shared_state():
+    """See the changes other workers committed before answering"""
+    if shared_state is not None:
+        shared_state.refresh()
+
+def index_context():
+    """Live dashboard figures for the main page"""
+    totals = store.aggregates
+    return {
+        'total_products': totals.total_products,
+        'inventory_value': f'{totals.inventory_value:,.2f}',
+        'low_stock_count': totals.low_stock_count
+    }
 
 @app.route('/')
 def index():
     """Main application route - serves the interactive demo"""
-    return render_template_string(MAIN_TEMPLATE)
+    return index_page.response(store.version, index_context)
+
+def _optional_int(args, name):
+    """Read an optional integer query parameter; ValueError if malformed"""
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+
+def _product_page(args):
+    """Build one /api/products page; ValueError on bad parameters"""
+    limit = _optional_int(args, 'limit')
+    if limit is None:
+        limit = Config.ITEMS_PER_PAGE
+    elif limit <= 0:
+        raise ValueError('limit must be positive')
+    limit = min(limit, MAX_PAGE_SIZE)
+    min_stock = _optional_int(args, 'min_stock')
+    max_stock = _optional_int(args, 'max_stock')
+
+    sort = args.get('sort', 'id')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+
+    fields = None
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in PRODUCT_FIELDS]
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+
+    after = None
+    if args.get('cursor'):
+        after = decode_cursor(args['cursor'], sort, descending)
+
+    page, next_key, total = store.query(
+        category=args.get('category'),
+        status=args.get('status'),
+        min_stock=min_stock,
+        max_stock=max_stock,
+        sort=sort,
+        descending=descending,
+        after=after,
+        limit=limit
+    )
+
+    if fields is not None:
+        page = [{f: product[f] for f in fields} for product in page]
+
+    return {
+        'products': page,
+        'count': len(page),
+        'total': total,
+        'next_cursor': encode_cursor(sort, next_key, descending) if next_key else None
+    }
 
 @app.route('/api/products')
 def get_products():
-    """API endpoint to get all products"""
-    return jsonify(products)
+    """API endpoint to list products, one cursor page at a time
+
+    Query parameters: category, status, min_stock, max_stock,
+    sort (field name, prefix with '-' for descending), limit, cursor
+    and fields (comma-separated projection).
+
+    Pages are served from pre-serialized, pre-gzipped bytes cached under
+    the store version, with a strong ETag so unchanged pages revalidate
+    with 304 without being rebuilt.
+    """
+    key = tuple(sorted(request.args.items(multi=True)))
+    version = store.version
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = make_etag(store.epoch, version, key)
+    gzip_etag = make_etag(store.epoch, version, key, 'gzip')
+    headers = {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+
+    if etag in request.if_none_match or gzip_etag in request.if_none_match:
+        headers['ETag'] = f'"{gzip_etag if use_gzip else etag}"'
+        return Response(status=304, headers=headers)
+
+    entry = catalog_cache.get(key, version)
+    if entry is None:
+        try:
+            payload = _product_page(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        entry = catalog_cache.put(key, version, body)
+
+    if use_gzip and entry.gzipped is not None:
+        headers['ETag'] = f'"{gzip_etag}"'
+        headers['Content-Encoding'] = 'gzip'
+        return Response(entry.gzipped, mimetype='application/json', headers=headers)
+    headers['ETag'] = f'"{etag}"'
+    return Response(entry.body, mimetype='application/json', headers=headers)
+
+@app.route('/api/products/search')
+def search_products():
+    """API endpoint to search products by SKU prefix or name
+
+    Query parameters: q, page (from 1) and per_page. Exact SKUs come
+    first, then SKU prefixes, then name matches.
+    """
+    query = request.args.get('q', '')
+    try:
+        page = max(1, _optional_int(request.args, 'page') or 1)
+        per_page = _optional_int(request.args, 'per_page') or Config.ITEMS_PER_PAGE
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+
+    total, matches = search_index.search(query, offset=(page - 1) * per_page, limit=per_page)
+    products = [store.get(product_id) for _, product_id in matches]
+    return jsonify({
+        'success': True,
+        'query': query,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'products': [product for product in products if product is not None]
+    })
 
 @app.route('/api/products', methods=['POST'])
 def add_product():
     """API endpoint to add a new product"""
-    global products
     data = request.json
+    # Checked before the store is touched: the shared database requires a
+    # category, and must never disagree with the in-memory store
+    if not data.get('sku') or not data.get('name') or not data.get('category'):
+        return jsonify({'success': False, 'error': 'A product needs a name, a SKU and a category'}), 400
     
     new_product = {
-        'id': len(products) + 1,
         'name': data.get('name'),
         'sku': data.get('sku'),
         'category': data.get('category'),
         'stock': int(data.get('stock', 0)),
         'price': float(data.get('price')),
-        'cost': float(data.get('cost')),
-        'status': 'Normal' if int(data.get('stock', 0)) > 10 else 'Low Stock' if int(data.get('stock', 0)) > 0 else 'Out of Stock'
+        'cost': float(data.get('cost'))
     }
+    if data.get('reorder_level') is not None:
+        reorder_level = data['reorder_level']
+        # bool is an int subclass; JSON true is not a level
+        if type(reorder_level) is not int or reorder_level < 0:
+            return jsonify({'success': False, 'error': 'reorder_level must be a non-negative integer'}), 400
+        new_product['reorder_level'] = reorder_level
     
-    products.append(new_product)
+    try:
+        store.add(new_product)
+    except DuplicateSKUError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
     return jsonify({'success': True, 'product': new_product})
 
 @app.route('/api/products/<int:product_id>/stock', methods=['PUT'])
 def update_stock(product_id):
     """API endpoint to update product stock"""
-    global products
     data = request.json
     adjustment = int(data.get('adjustment', 0))
     
-    for product in products:
-        if product['id'] == product_id:
-            product['stock'] = max(0, product['stock'] + adjustment)
-            # Update status
-            if product['stock'] == 0:
-                product['status'] = 'Out of Stock'
-            elif product['stock'] <= 10:
-                product['status'] = 'Low Stock'
-            else:
-                product['status'] = 'Normal'
-            
-            return jsonify({'success': True, 'product': product})
+    product = store.adjust_stock(product_id, adjustment)
+    if product is None:
+        return jsonify({'success': False, 'error': 'Product not found'}), 404
     
-    return jsonify({'success': False, 'error': 'Product not found'}), 404
+    return jsonify({'success': True, 'product': product})
+
+@app.route('/api/products/stock', methods=['PUT'])
+def bulk_update_stock():
+    """API endpoint to apply many stock adjustments in one request
+
+    Body: {"adjustments": [{"product_id": 1, "adjustment": 20},
+                           {"sku": "LED-10W-001", "adjustment": -2}, ...]}
+    """
+    data = request.json
+    adjustments = data.get('adjustments') if isinstance(data, dict) else None
+    if not isinstance(adjustments, list):
+        return jsonify({'success': False, 'error': 'adjustments must be a list'}), 400
+    if len(adjustments) > MAX_BULK_ADJUSTMENTS:
+        return jsonify({'success': False,
+                        'error': f'At most {MAX_BULK_ADJUSTMENTS} adjustments per request'}), 400
+    
+    results = store.bulk_adjust(adjustments)
+    applied = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': True,
+        'applied': applied,
+        'failed': len(results) - applied,
+        'results': results
+    })
+
+@app.route('/api/products/import', methods=['POST'])
+def import_products():
+    """API endpoint to import products from an uploaded CSV or XLSX file
+
+    Rows are upserted by SKU. With ?progress=1 the response streams one
+    NDJSON progress line per chunk; otherwise it returns the final report.
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'success': False, 'error': 'No file uploaded'}), 400
+    extension = upload.filename.rsplit('.', 1)[-1].lower() if '.' in upload.filename else ''
+    if extension not in IMPORT_EXTENSIONS or extension not in Config.ALLOWED_EXTENSIONS:
+        return jsonify({'success': False,
+                        'error': f'Only {", ".join(IMPORT_EXTENSIONS)} files can be imported'}), 400
+    
+    try:
+        progress = catalog_importer.run(iter_rows(upload.stream, extension))
+    except ImportFormatError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if request.args.get('progress'):
+        def generate():
+            try:
+                for event in progress:
+                    yield json.dumps(event) + '\n'
+            except ImportFormatError as e:
+                yield json.dumps({'done': True, 'error': str(e)}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    report = {}
+    try:
+        for report in progress:
+            pass
+    except ImportFormatError as e:
+        return jsonify(dict(report, success=False, error=str(e))), 400
+    return jsonify(dict(report, success=True))
 
 @app.route('/api/sales', methods=['POST'])
 def process_sale():
     """API endpoint to process a sale"""
-    global products, sales, next_sale_id
     data = request.json
     
     sale_items = data.get('items', [])
     customer_name = data.get('customer_name', 'Walk-in Customer')
     
-    # Update product stocks
-    total_amount = 0
-    for item in sale_items:
-        product_id = item['product_id']
-        quantity = item['quantity']
-        
-        for product in products:
-            if product['id'] == product_id:
-                if product['stock'] >= quantity:
-                    product['stock'] -= quantity
-                    total_amount += quantity * product['price']
-                    
-                    # Update status
-                    if product['stock'] == 0:
-                        product['status'] = 'Out of Stock'
-                    elif product['stock'] <= 10:
-                        product['status'] = 'Low Stock'
-                    else:
-                        product['status'] = 'Normal'
-                else:
-                    return jsonify({'success': False, 'error': f'Insufficient stock for {product["name"]}'}), 400
-    
-    # Create sale record
-    sale = {
-        'id': next_sale_id,
-        'sale_number': f'#{datetime.now().strftime("%Y%m%d")}{next_sale_id:03d}',
-        'customer_name': customer_name,
-        'items': sale_items,
-        'total_amount': total_amount,
-        'tax_amount': total_amount * 0.2,  # 20% VAT
-        'final_amount': total_amount * 1.2,
-        'date': datetime.now().isoformat(),
-        'status': 'Paid'
-    }
-    
-    sales.append(sale)
-    next_sale_id += 1
+    try:
+        sale = sale_engine.process(sale_items, customer_name)
+    except SaleError as e:
+        return jsonify({'success': False, 'error': str(e)}), e.status_code
     
     return jsonify({'success': True, 'sale': sale})
 
+def _forecast_response(key, fallback_category):
+    """Fitted forecast for a series key, or synthetic demand if it has no sales
+
+    Responses are cached until the business day rolls over or the series
+    records a new sale.
+    """
+    today = demand_forecaster.business_day()
+    cache_key = (key, Config.FORECAST_PERIODS, today.isoformat(), demand_forecaster.revision(key))
+    body = forecast_cache.get(cache_key)
+    if body is None:
+        if key in demand_forecaster:
+            data = demand_forecaster.forecast(key, today)
+            data['model'] = 'holt-winters'
+        else:
+            data = forecast_engine.forecast(fallback_category, today)
+            data['model'] = 'synthetic'
+        body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        forecast_cache.put(cache_key, body, tags=(key,))
+    return Response(body, mimetype='application/json')
+
+def _export_response(rows, columns, name):
+    """Stream export rows in the requested format as a download"""
+    export_format = request.args.get('format', 'ndjson')
+    extension = 'csv' if export_format == 'csv' else 'ndjson'
+    headers = {'Content-Disposition': f'attachment; filename={name}.{extension}'}
+    return Response(stream_with_context(encode(rows, columns, export_format)),
+                    mimetype=EXPORT_FORMATS[export_format], headers=headers)
+
+@app.route('/api/export/products')
+def export_products():
+    """API endpoint to stream the catalog as NDJSON or CSV (?format=csv)"""
+    if request.args.get('format', 'ndjson') not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+    rows = iter_products(store, request.args.get('category'))
+    return _export_response(rows, PRODUCT_COLUMNS, 'products')
+
+@app.route('/api/export/sales')
+def export_sales():
+    """API endpoint to stream sales as NDJSON or CSV
+
+    Query parameters: from, to (ISO dates or datetimes), category, format.
+    """
+    if request.args.get('format', 'ndjson') not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+    try:
+        start, end = parse_date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    rows = iter_sales(sales, store, start, end, request.args.get('category'))
+    return _export_response(rows, SALE_COLUMNS, 'sales')
+
 @app.route('/api/forecast/<category>')
 def get_forecast_data(category):
-    """API endpoint to get demand forecast data"""
-    # Generate realistic forecast data
-    today = datetime.now()
-    labels = []
-    historical_data = []
-    forecast_data = []
-    confidence_upper = []
-    confidence_lower = []
-
-    # Generate last 30 days (historical)
-    for i in range(29, -1, -1):
-        date = today - timedelta(days=i)
-        labels.append(date.strftime('%b %d'))
-        
-        # Generate realistic historical data with seasonality
-        base_value = 150 if category == 'textiles' else 80 if category == 'electronics' else 120
-        seasonality = math.sin((i / 30) * math.pi * 2) * 20
-        random_variation = (random.random() - 0.5) * 30
-        weekend_effect = -15 if date.weekday() >= 5 else 0
-        
-        historical_data.append(max(0, base_value + seasonality + random_variation + weekend_effect))
+    """API endpoint to get demand forecast data for a category"""
+    return _forecast_response(DemandForecaster.category_key(category), category)
 
-    # Generate next 30 days (forecast)
-    for i in range(1, 31):
-        date = today + timedelta(days=i)
-        labels.append(date.strftime('%b %d'))
-        
-        # Generate forecast with trend
-        last_historical = historical_data[-1]
-        trend = 1.02 if category == 'textiles' else 1.05 if category == 'electronics' else 1.03
-        base_value = last_historical * (trend ** (i / 30))
-        seasonality = math.sin(((30 + i) / 30) * math.pi * 2) * 15
-        random_variation = (random.random() - 0.5) * 10
-        
-        forecast_value = max(0, base_value + seasonality + random_variation)
-        forecast_data.append(forecast_value)
-        
-        # Confidence intervals
-        confidence_width = 10 + (i / 30) * 20
-        confidence_upper.append(forecast_value + confidence_width)
-        confidence_lower.append(max(0, forecast_value - confidence_width))
+@app.route('/api/forecast/sku/<sku>')
+def get_sku_forecast_data(sku):
+    """API endpoint to get demand forecast data for a single SKU"""
+    product = store.get_by_sku(sku)
+    if product is None:
+        return jsonify({'success': False, 'error': 'Product not found'}), 404
+    return _forecast_response(DemandForecaster.sku_key(sku), product['category'])
 
+@app.route('/api/forecast/cache/stats')
+def get_forecast_cache_stats():
+    """API endpoint for forecast cache hit/miss counters"""
+    return jsonify(forecast_cache.stats())
+
+@app.route('/api/analytics/abc')
+def get_abc_classification():
+    """API endpoint for the ABC class of every product (?class=A|B|C to filter)"""
+    wanted = request.args.get('class')
+    if wanted is not None and wanted not in ABC_CLASSES:
+        return jsonify({'success': False, 'error': 'class must be A, B or C'}), 400
+    # Products without a SKU (e.g. from an older import) have no row to rank
+    classes = abc_analyzer.classify(product['sku'] for product in store.all() if product.get('sku'))
+    classes.pop(None, None)
+    revenue = abc_analyzer.revenue()
+    products = sorted(({'sku': sku, 'class': label, 'revenue': round(revenue.get(sku, 0.0), 2)}
+                       for sku, label in classes.items() if wanted in (None, label)),
+                      key=lambda row: (-row['revenue'], row['sku']))
     return jsonify({
-        'labels': labels,
-        'historical': historical_data,
-        'forecast': forecast_data,
-        'confidence_upper': confidence_upper,
-        'confidence_lower': confidence_lower
+        'success': True,
+        'period_days': abc_analyzer.periods,
+        'summary': abc_analyzer.summary(classes),
+        'products': products
     })
 
+@app.route('/api/replenishment')
+def get_replenishment_report():
+    """API endpoint for products at their reorder point, most urgent first
+
+    Query parameters: all=1 to list every product, limit.
+    """
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    if limit is not None and limit < 0:
+        return jsonify({'success': False, 'error': 'limit must not be negative'}), 400
+    products = store.all()
+    skus = [product['sku'] for product in products]
+    demand, demand_std = demand_forecaster.demand_rates([DemandForecaster.sku_key(sku) for sku in skus])
+    columns = {
+        'sku': np.array(skus, dtype=object),
+        'stock': np.fromiter((product['stock'] for product in products), float, len(products)),
+        'cost': np.fromiter((product['cost'] for product in products), float, len(products)),
+        'daily_demand': demand,
+        'demand_std': demand_std,
+    }
+    report = replenishment_engine.report(columns, include_all=request.args.get('all') == '1', limit=limit)
+    return jsonify({'success': True, 'count': len(report), 'products': report})
+
+@app.route('/api/alerts')
+def get_stock_alerts():
+    """API endpoint for products needing attention and recent level changes
+
+    Query parameters: limit (default 50).
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    if limit < 0:
+        return jsonify({'success': False, 'error': 'limit must not be negative'}), 400
+    return jsonify({
+        'success': True,
+        'attention': alert_engine.attention(limit),
+        'recent': alert_engine.recent(limit)
+    })
+
+@app.route('/api/events')
+def stream_events():
+    """Server-Sent Events stream of stock deltas, new sales and stock alerts
+
+    Answers 503 once the worker holds Config.SSE_MAX_STREAMS streams, so
+    open dashboards cannot take every thread; the page then polls.
+    """
+    subscription = event_hub.subscribe()
+    if subscription is None:
+        return jsonify({'success': False, 'error': 'Too many open event streams'}), 503, {'Retry-After': '60'}
+    # Workers sharing state see each other's changes by polling the feed
+    poll = Config.SSE_POLL_INTERVAL if shared_state is not None else None
+    on_poll = shared_state.refresh if shared_state is not None else None
+
+    def events():
+        try:
+            yield from event_stream(subscription, Config.SSE_HEARTBEAT, poll, on_poll)
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/dashboard')
+def api_dashboard():
+    """API endpoint for live dashboard totals"""
+    totals = store.aggregates.as_dict()
+    totals['total_sales'] = len(sales)
+    totals['timestamp'] = datetime.now().isoformat()
+    return jsonify(totals)
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for deployment platforms"""
@@ -443,7 +824,7 @@ MAIN_TEMPLATE = '''
                 <div class="col-md-3 mb-4">
                     <div class="card metric-card primary text-white" onclick="showInfo('products')">
                         <div class="card-body text-center">
-                            <h2 class="fw-bold mb-1">5</h2>
+                            <h2 class="fw-bold mb-1" id="metric-products">{{ total_products }}</h2>
                             <p class="mb-0 opacity-90">Total Products</p>
                             <small class="opacity-75">Active inventory</small>
                         </div>
@@ -452,7 +833,7 @@ MAIN_TEMPLATE = '''
                 <div class="col-md-3 mb-4">
                     <div class="card metric-card success text-white" onclick="showInfo('value')">
                         <div class="card-body text-center">
-                            <h2 class="fw-bold mb-1">18,840 MAD</h2>
+                            <h2 class="fw-bold mb-1" id="metric-value">{{ inventory_value }} MAD</h2>
                             <p class="mb-0 opacity-90">Inventory Value</p>
                             <small class="opacity-75">Total worth</small>
                         </div>
@@ -470,7 +851,7 @@ MAIN_TEMPLATE = '''
                 <div class="col-md-3 mb-4">
                     <div class="card metric-card warning text-white" onclick="showInfo('alerts')">
                         <div class="card-body text-center">
-                            <h2 class="fw-bold mb-1">2</h2>
+                            <h2 class="fw-bold mb-1" id="metric-low-stock">{{ low_stock_count }}</h2>
                             <p class="mb-0 opacity-90">Low Stock</p>
                             <small class="opacity-75">Need attention</small>
                         </div>
@@ -736,10 +1117,10 @@ MAIN_TEMPLATE = '''
 
         function showInfo(type) {
             const messages = {
-                products: 'Total Products: 5 active products across multiple categories including textiles, electronics, and office supplies.',
-                value: 'Inventory Value: 18,840.00 MAD total inventory worth with detailed cost and retail value tracking.',
+                products: 'Total Products: {{ total_products }} active products across multiple categories including textiles, electronics, and office supplies.',
+                value: 'Inventory Value: {{ inventory_value }} MAD total inventory worth with detailed cost and retail value tracking.',
                 sales: 'Recent Sales: 23 transactions in the last 7 days with comprehensive sales analytics.',
-                alerts: 'Low Stock Alerts: 2 products need immediate attention for reordering.'
+                alerts: 'Low Stock Alerts: {{ low_stock_count }} products need immediate attention for reordering.'
             };
             
             showNotification('System Info', messages[type], 'info');
@@ -754,12 +1135,15 @@ MAIN_TEMPLATE = '''
                         <i class="fas fa-info-circle fs-4"></i>
                     </div>
                     <div class="flex-grow-1">
-                        <h6 class="fw-bold mb-1">${title}</h6>
-                        <p class="mb-0">${message}</p>
+                        <h6 class="fw-bold mb-1"></h6>
+                        <p class="mb-0"></p>
                     </div>
                     <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
                 </div>
             `;
+            // Messages carry SKUs and names from the API: never parse them as HTML
+            notification.querySelector('h6').textContent = title;
+            notification.querySelector('p').textContent = message;
             document.body.appendChild(notification);
             
             setTimeout(() => {
@@ -771,6 +1155,42 @@ MAIN_TEMPLATE = '''
             }, 5000);
         }
 
+        // Live updates: refresh the metrics once per burst of changes
+        let metricsTimer = null;
+        function refreshMetrics() {
+            clearTimeout(metricsTimer);
+            metricsTimer = setTimeout(() => {
+                fetch('/api/dashboard').then(response => response.json()).then(totals => {
+                    document.getElementById('metric-products').textContent = totals.total_products;
+                    document.getElementById('metric-value').textContent =
+                        totals.inventory_value.toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2}) + ' MAD';
+                    document.getElementById('metric-low-stock').textContent = totals.low_stock_count;
+                });
+            }, 500);
+        }
+
+        if (window.EventSource) {
+            const events = new EventSource('/api/events');
+            events.addEventListener('stock', refreshMetrics);
+            events.addEventListener('resync', refreshMetrics);
+            events.addEventListener('sale', event => {
+                const sale = JSON.parse(event.data);
+                showNotification('New Sale', `${sale.sale_number}: ${sale.final_amount.toFixed(2)} MAD`, 'success');
+            });
+            events.addEventListener('alert', event => {
+                const alert = JSON.parse(event.data);
+                if (alert.to !== 'normal') {
+                    showNotification('Stock Alert', `${alert.sku} is ${alert.to === 'out' ? 'out of stock' : alert.to} (${alert.stock} left)`, 'warning');
+                }
+            });
+            // Refused (e.g. 503 when the server is at its stream limit): poll instead
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) {
+                    setInterval(refreshMetrics, 30000);
+                }
+            };
+        }
+
         // Welcome message
         document.addEventListener('DOMContentLoaded', function() {
             setTimeout(() => {
@@ -784,6 +1204,9 @@ MAIN_TEMPLATE = '''
 </html>
 '''
 
+# Compiled once at startup; re-rendered only when the store version changes
+index_page = CompiledPage(app, MAIN_TEMPLATE)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+HTTP load benchmark: app_deploy:app under gunicorn, one route at a time
+
+Starts gunicorn with the repository's gunicorn.conf.py on a free local
+port, with the journal, sales ledger and shared state in a temporary
+directory, then loads each route from many threads, each with its own
+keep-alive connection:
+
+- GET /                          the dashboard page
+- GET /api/products              first pages, rotating sort orders
+- POST /api/sales                one-line sales of random products
+- GET /api/forecast/<category>   rotating over the catalog's categories
+
+Products are restocked first so sales do not run out. Each route gets a
+warm-up, then ``--duration`` seconds of measured requests. The report
+gives throughput and p50/p95/p99 latency per route, counting non-2xx
+responses and connection failures as errors, and the run is saved as JSON
+(see timing.py) to compare with later runs.
+
+``--url`` loads a server that is already running instead; it records
+sales and changes stock, so only point it at a disposable instance.
+
+Usage: python benchmarks/load.py [--threads 16] [--duration 10] [--workers N]
+                                 [--state journal|sqlite] [--route /api/sales]
+                                 [--url http://127.0.0.1:5000] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timing import compare, load, print_table, save, summarize  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRODUCT_SORTS = ('id', '-stock', 'price', '-id')
+RESTOCK = 1000000
+
+
+class Client:
+    """One keep-alive connection; reconnects after failures"""
+
+    def __init__(self, host, port, timeout=30):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        """``(status, body)`` of one request; raises OSError or HTTPException on failure"""
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args, data_dir):
+    """Run gunicorn in the background; returns the process and its base URL"""
+    if importlib.util.find_spec('gunicorn') is None:
+        sys.exit('gunicorn is not installed (pip install -r requirements_deploy.txt), or pass --url')
+    port = free_port()
+    env = dict(os.environ,
+               STATE_BACKEND=args.state,
+               JOURNAL_DIR=os.path.join(data_dir, 'journal'),
+               SALES_LEDGER_DIR=os.path.join(data_dir, 'sales'),
+               SHARED_STATE_PATH=os.path.join(data_dir, 'inventory.db'))
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    log = open(os.path.join(data_dir, 'gunicorn.log'), 'wb')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', 'app_deploy:app'],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    client = Client('127.0.0.1', port, timeout=2)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f'gunicorn exited with code {process.returncode}; see {log.name}')
+        try:
+            if client.request('GET', '/health')[0] == 200:
+                return process, url
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    process.terminate()
+    sys.exit(f'gunicorn did not answer /health within 30 s; see {log.name}')
+
+
+def prepare(client):
+    """Restock the catalog; returns its product ids and categories"""
+    status, body = client.request('GET', '/api/products?limit=500&fields=id,category')
+    if status != 200:
+        sys.exit(f'GET /api/products returned {status}')
+    products = json.loads(body)['products']
+    adjustments = [{'product_id': product['id'], 'adjustment': RESTOCK} for product in products]
+    client.request('PUT', '/api/products/stock', {'adjustments': adjustments})
+    return [product['id'] for product in products], sorted({product['category'] for product in products})
+
+
+def scenarios(product_ids, categories):
+    """Request factory per route: ``fn(rng, n) -> (method, path, body)``"""
+    return {
+        'GET /': lambda rng, n: ('GET', '/', None),
+        'GET /api/products': lambda rng, n: (
+            'GET', f'/api/products?sort={PRODUCT_SORTS[n % len(PRODUCT_SORTS)]}', None),
+        'POST /api/sales': lambda rng, n: (
+            'POST', '/api/sales', {'items': [{'product_id': rng.choice(product_ids), 'quantity': 1}]}),
+        'GET /api/forecast/<category>': lambda rng, n: (
+            'GET', f'/api/forecast/{quote(categories[n % len(categories)].lower())}', None),
+    }
+
+
+def route_path(name):
+    """``/api/forecast`` for ``GET /api/forecast/<category>``"""
+    return name.split(' ', 1)[1].split('/<', 1)[0]
+
+
+def run_route(host, port, make_request, threads, duration, warmup):
+    """Load one route from ``threads`` threads; returns its summary"""
+    latencies = [[] for _ in range(threads)]
+    errors = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+    window = {}
+
+    def worker(index):
+        rng = random.Random(index)
+        client = Client(host, port)
+        n = index
+        barrier.wait()
+        while True:
+            now = time.perf_counter()
+            if now >= window['end']:
+                break
+            method, path, body = make_request(rng, n)
+            n += threads
+            try:
+                status, _ = client.request(method, path, body)
+                ok = 200 <= status < 300
+            except (OSError, http.client.HTTPException):
+                ok = False
+            if now >= window['start']:
+                if ok:
+                    latencies[index].append(time.perf_counter() - now)
+                else:
+                    errors[index] += 1
+        client.close()
+
+    pool = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    window['start'] = time.perf_counter() + warmup
+    window['end'] = window['start'] + duration
+    barrier.wait()
+    for thread in pool:
+        thread.join()
+    # Requests still in flight at the end finish after it
+    elapsed = max(duration, time.perf_counter() - window['start'])
+    return summarize([sample for samples in latencies for sample in samples], elapsed, sum(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per route')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds per route')
+    parser.add_argument('--workers', type=int, help='gunicorn workers (WEB_CONCURRENCY)')
+    parser.add_argument('--state', choices=('journal', 'sqlite'), default='journal',
+                        help='STATE_BACKEND of the gunicorn workers')
+    parser.add_argument('--route', action='append', choices=('/', '/api/products', '/api/sales', '/api/forecast'),
+                        help='run only these routes')
+    parser.add_argument('--url', help='load an already running server instead of starting gunicorn')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/load-<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            process, url = start_gunicorn(args, data_dir)
+        try:
+            target = urlsplit(url)
+            host, port = target.hostname, target.port or 80
+            product_ids, categories = prepare(Client(host, port))
+            routes = scenarios(product_ids, categories)
+            selected = [name for name in routes if not args.route or route_path(name) in args.route]
+            results = {}
+            for name in selected:
+                print(f'{name} ...', flush=True)
+                results[name] = run_route(host, port, routes[name], args.threads, args.duration, args.warmup)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    print()
+    print_table(results)
+    settings = {'url': args.url, 'server': 'external' if args.url else 'gunicorn', 'state': args.state,
+                'workers': args.workers, 'threads': args.threads, 'duration': args.duration,
+                'warmup': args.warmup, 'products': len(product_ids)}
+    print(f'\nsaved {save("load", results, settings, args.output)}')
+    if args.compare:
+        compare(results, load(args.compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks: store operations, forecast generation and serialization
+
+Times single operations in-process, without HTTP, over a synthetic catalog:
+
+- store: add, lookup by SKU, stock adjustment, a filtered and sorted page,
+  a 100-line bulk adjustment and a one-line sale through the SaleEngine
+- forecast: a synthetic category forecast, a Holt-Winters SKU forecast and
+  a batch over every SKU with sales
+- serialization: a JSON product page as /api/products sends it, a JSON
+  forecast, and NDJSON and CSV exports of the whole catalog
+
+Reports p50/p95/p99 latency and throughput per operation, and saves the
+run as JSON (see timing.py) so later runs can be compared against it.
+
+Usage: python benchmarks/micro.py [--products 10000] [--iterations 2000]
+                                  [--only store] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timing import compare, load, print_table, save, summarize  # noqa: E402
+
+from exports import PRODUCT_COLUMNS, encode, iter_products  # noqa: E402
+from forecasting import DemandForecaster, ForecastEngine  # noqa: E402
+from inventory_store import ProductStore  # noqa: E402
+from sales_engine import SaleEngine  # noqa: E402
+
+CATEGORIES = ('Textiles', 'Electronics', 'Office Supplies', 'Cosmetics', 'Food',
+              'Handicrafts', 'Woodwork', 'Ceramics')
+
+
+def synthetic_product(i):
+    return {
+        'name': f'Product {i:07d} - {CATEGORIES[i % len(CATEGORIES)]}',
+        'sku': f'SKU-{i:08d}',
+        'category': CATEGORIES[i % len(CATEGORIES)],
+        'stock': (i * 7919) % 400 + 1000,
+        'price': round(5 + (i % 997) * 0.75, 2),
+        'cost': round(3 + (i % 997) * 0.5, 2),
+    }
+
+
+def measure(operation, iterations):
+    """Latency of each of ``iterations`` calls, in seconds"""
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def store_benchmarks(args, rng):
+    store = ProductStore()
+    yield 'store.add', measure(lambda i: store.add(synthetic_product(i)), args.products)
+    yield 'store.get_by_sku', measure(
+        lambda i: store.get_by_sku(f'SKU-{rng.randrange(args.products):08d}'), args.iterations)
+    yield 'store.adjust_stock', measure(
+        lambda i: store.adjust_stock(rng.randrange(1, args.products + 1), rng.choice((-1, 1))), args.iterations)
+    yield 'store.query (category, -stock)', measure(
+        lambda i: store.query(category=CATEGORIES[i % len(CATEGORIES)], sort='stock', descending=True, limit=20),
+        max(1, args.iterations // 10))
+    batch = [{'product_id': product_id, 'adjustment': 1} for product_id in range(1, 101)]
+    yield 'store.bulk_adjust (100 lines)', measure(lambda i: store.bulk_adjust(batch), max(1, args.iterations // 10))
+    engine = SaleEngine(store)
+    yield 'sales.process (1 line)', measure(
+        lambda i: engine.process([{'product_id': rng.randrange(1, args.products + 1), 'quantity': 1}]),
+        args.iterations)
+
+
+def forecast_benchmarks(args, rng):
+    engine = ForecastEngine(seed=1)
+    yield 'forecast.synthetic category', measure(lambda i: engine.forecast(CATEGORIES[i % len(CATEGORIES)]),
+                                                 args.iterations)
+
+    forecaster = DemandForecaster()
+    skus = [DemandForecaster.sku_key(f'SKU-{i:08d}') for i in range(min(args.products, 1000))]
+    start = datetime.now() - timedelta(days=60)
+    for day in range(60):
+        for key in skus:
+            forecaster.record(key, rng.randrange(0, 20), start + timedelta(days=day))
+    yield 'forecast.holt-winters sku', measure(lambda i: forecaster.forecast(skus[i % len(skus)]), args.iterations)
+    yield f'forecast.batch ({len(skus)} skus)', measure(lambda i: forecaster.forecast_batch(skus),
+                                                         max(1, args.iterations // 100))
+
+
+def serialization_benchmarks(args, rng):
+    store = ProductStore(synthetic_product(i) for i in range(args.products))
+    page, _, _ = store.query(limit=20)
+    full_page, _, _ = store.query(limit=500)
+    yield 'json.products page (20)', measure(
+        lambda i: json.dumps({'products': page}, separators=(',', ':')).encode('utf-8'), args.iterations)
+    yield 'json.products page (500)', measure(
+        lambda i: json.dumps({'products': full_page}, separators=(',', ':')).encode('utf-8'),
+        max(1, args.iterations // 10))
+    forecast = ForecastEngine(seed=1).forecast('Textiles')
+    yield 'json.forecast', measure(lambda i: json.dumps(forecast, separators=(',', ':')), args.iterations)
+    for export_format in ('ndjson', 'csv'):
+        yield f'export.{export_format} ({args.products} products)', measure(
+            lambda i: sum(len(chunk) for chunk in encode(iter_products(store), PRODUCT_COLUMNS, export_format)),
+            max(1, args.iterations // 200))
+
+
+SUITES = {
+    'store': store_benchmarks,
+    'forecast': forecast_benchmarks,
+    'serialization': serialization_benchmarks,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=10000, help='catalog size')
+    parser.add_argument('--iterations', type=int, default=2000, help='calls per operation')
+    parser.add_argument('--only', choices=sorted(SUITES), action='append', help='run only these suites')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/micro-<time>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    results = {}
+    for suite in args.only or SUITES:
+        for name, samples in SUITES[suite](args, rng):
+            results[name] = summarize(samples)
+
+    print_table(results)
+    settings = {'products': args.products, 'iterations': args.iterations, 'suites': args.only or list(SUITES)}
+    print(f'\nsaved {save("micro", results, settings, args.output)}')
+    if args.compare:
+        compare(results, load(args.compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: list of product dicts versus the columnar ProductTable
+
+Builds the same synthetic catalog both ways and reports the memory each
+one allocates, measured with tracemalloc (NumPy buffers included), and the
+build time of a separate untraced run.
+
+Usage: python benchmarks/product_memory.py [--count 2000000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory_store import stock_status  # noqa: E402
+from product_table import ProductTable  # noqa: E402
+
+CATEGORIES = ('Textiles', 'Electronics', 'Office Supplies', 'Cosmetics', 'Food',
+              'Handicrafts', 'Woodwork', 'Ceramics')
+
+
+def synthetic_products(count):
+    for i in range(1, count + 1):
+        stock = (i * 7919) % 400
+        yield {
+            'id': i,
+            'name': f'Product {i:07d} - {CATEGORIES[i % len(CATEGORIES)]}',
+            'sku': f'SKU-{i:08d}',
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'stock': stock,
+            'price': round(5 + (i % 997) * 0.75, 2),
+            'cost': round(3 + (i % 997) * 0.5, 2),
+            'status': stock_status(stock),
+        }
+
+
+def measure(build):
+    """Return ``(bytes allocated, seconds)`` for building a catalog"""
+    gc.collect()
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=200000, help='number of products')
+    args = parser.parse_args()
+
+    dict_bytes, dict_seconds = measure(lambda: list(synthetic_products(args.count)))
+    table_bytes, table_seconds = measure(lambda: ProductTable(synthetic_products(args.count),
+                                                              capacity=args.count))
+
+    print(f'{args.count} products')
+    print(f'{"layout":<14}{"total MiB":>12}{"bytes/SKU":>12}{"build s":>10}')
+    for label, size, seconds in (('dict list', dict_bytes, dict_seconds),
+                                 ('ProductTable', table_bytes, table_seconds)):
+        print(f'{label:<14}{size / 2 ** 20:>12.1f}{size / args.count:>12.0f}{seconds:>10.2f}')
+    print(f'ratio: {dict_bytes / table_bytes:.1f}x smaller')
+
+
+if __name__ == '__main__':
+    main()
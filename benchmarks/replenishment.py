@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Replenishment benchmark: per-product EOQ calls versus one vectorized plan
+
+Computes EOQ, safety stock and reorder points for a synthetic catalog once
+with a plain Python loop (the shape of a per-model ``calculate_eoq``) and
+once with ReplenishmentEngine, then times the sorted reorder report.
+
+Usage: python benchmarks/replenishment.py [--count 100000]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replenishment import DAYS_PER_YEAR, ReplenishmentEngine  # noqa: E402
+
+
+def synthetic_columns(count):
+    rng = np.random.default_rng(7)
+    return {
+        'sku': np.array([f'SKU-{i:08d}' for i in range(count)], dtype=object),
+        'stock': rng.integers(0, 400, count).astype(float),
+        'cost': rng.uniform(3, 500, count),
+        'daily_demand': rng.gamma(2.0, 3.0, count),
+        'demand_std': np.where(rng.random(count) < 0.2, np.nan, rng.uniform(0.5, 4, count)),
+        'lead_time_days': np.where(rng.random(count) < 0.3, np.nan, rng.integers(2, 30, count)),
+    }
+
+
+def loop_plan(engine, columns):
+    """One Python call per product"""
+    rows = []
+    for sku, stock, cost, demand, std, lead_time in zip(*(columns[name].tolist() for name in (
+            'sku', 'stock', 'cost', 'daily_demand', 'demand_std', 'lead_time_days'))):
+        lead_time = engine.lead_time_days if math.isnan(lead_time) else lead_time
+        holding = cost * engine.holding_rate
+        eoq = math.sqrt(2 * demand * DAYS_PER_YEAR * engine.ordering_cost / holding) if holding > 0 else 0
+        safety = engine.safety_stock if math.isnan(std) else engine.service_z * std * math.sqrt(lead_time)
+        rows.append((sku, eoq, safety, demand * lead_time + safety))
+    return rows
+
+
+def timed(function, repeat=3):
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000, help='number of products')
+    args = parser.parse_args()
+
+    engine = ReplenishmentEngine()
+    columns = synthetic_columns(args.count)
+    loop = timed(lambda: loop_plan(engine, columns))
+    vectorized = timed(lambda: engine.plan(columns))
+    report = timed(lambda: engine.report(columns))
+
+    print(f'{args.count} products, {int(engine.plan(columns)["reorder"].sum())} to reorder')
+    print(f'{"method":<18}{"ms":>10}')
+    for label, seconds in (('python loop', loop), ('vectorized plan', vectorized),
+                           ('sorted report', report)):
+        print(f'{label:<18}{seconds * 1000:>10.1f}')
+    print(f'speedup: {loop / vectorized:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
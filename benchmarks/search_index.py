@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Search benchmark: SKU prefix and name queries over a synthetic catalog
+
+Builds a SearchIndex over generated products with French and Arabic
+names, times a set of typical queries (median of many runs each) against
+a linear scan of the normalized names, and the cost of indexing products
+added one at a time.
+
+Usage: python benchmarks/search_index.py [--count 1000000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex, normalize  # noqa: E402
+
+PREFIXES = ['CTN', 'SLK', 'LIN', 'OIL', 'TEA', 'BOX', 'RUG', 'LMP']
+WORDS = ['Coton', 'Soie', 'Lin', 'Écharpe', 'Crème', 'Thé', 'Épices', 'Céramique', 'Tapis', 'Lampe',
+         'Huile', 'Argan', 'Bleu', 'Rouge', 'Brodé', 'Tissé', 'زيت', 'أرغان', 'شاي', 'سجاد',
+         'مصباح', 'قماش', 'حرير', 'كتان']
+SYLLABLES = ['ka', 'ra', 'mo', 'li', 'sa', 'ne', 'to', 'ba', 'di', 'fu', 'ze', 'ou', 'ja', 'pe', 'ri', 'go']
+QUERIES = ['CTN-', 'CTN-00042', 'SLK-0004217', 'argan', 'echarpe brod', 'ceramique bleu',
+           'ارغان', 'زيت', 'lampe tisse rouge', 'kamoli', 'rito ze', 'zz-none']
+
+
+def vocabulary(rng, size=5000):
+    """The fixed words above plus generated ones, most frequent first"""
+    generated = {''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).capitalize() for _ in range(size)}
+    return WORDS + sorted(generated)
+
+
+def synthetic_products(count):
+    """Products named with three words drawn with Zipf-like frequencies"""
+    rng = random.Random(7)
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    for i in range(count):
+        name = ' '.join(rng.choices(words, weights, k=3)) + f' {rng.randrange(1000)}'
+        yield {'id': i + 1, 'sku': f'{PREFIXES[i % len(PREFIXES)]}-{i:07d}', 'name': name}
+
+
+def median_ms(function, repeat=50):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000000, help='number of products')
+    args = parser.parse_args()
+
+    products = list(synthetic_products(args.count))
+    index = SearchIndex()
+    started = time.perf_counter()
+    index.rebuild(products)
+    print(f'{args.count} products indexed in {time.perf_counter() - started:.1f} s')
+
+    added = [{'id': args.count + i + 1, 'sku': f'NEW-{i:07d}', 'name': 'Nouveau Tapis Brodé'}
+             for i in range(10000)]
+    started = time.perf_counter()
+    for product in added:
+        index.update(product)
+    print(f'incremental add: {(time.perf_counter() - started) / len(added) * 1e6:.1f} us per product')
+
+    names = [normalize(product['name']) for product in products[:100000]]
+    scan = median_ms(lambda: [name for name in names if 'argan' in name], repeat=5) * args.count / len(names)
+    print(f'{"query":<22}{"matches":>10}{"ms":>10}')
+    for query in QUERIES:
+        total, _ = index.search(query)
+        print(f'{query:<22}{total:>10}{median_ms(lambda: index.search(query)):>10.3f}')
+    print(f'{"(linear name scan)":<22}{"":>10}{scan:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Sale/SaleItem write and read throughput, default vs tuned SQLite
+
+Runs the same workload against a SQLite file twice, once with SQLAlchemy's
+defaults and once with the performance profile from config.py
+(``SQLITE_PRAGMAS`` applied through sqlite_tuning, pooled engine):
+
+- writes: concurrent threads each committing one sale with its items per
+  transaction, as the sales endpoint does
+- reads: concurrent threads loading a sale with its items by id and
+  listing a day of sales, while one writer keeps committing
+
+Usage: python benchmarks/sqlite_sales.py [--sales 2000] [--threads 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import ForeignKey, String, create_engine, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship, selectinload
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from sqlite_tuning import enable_sqlite_performance, read_pragmas  # noqa: E402
+
+ITEMS_PER_SALE = 3
+START = datetime(2024, 1, 1)
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Sale(Base):
+    __tablename__ = 'sales'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sale_number: Mapped[str] = mapped_column(String(20), index=True)
+    customer_name: Mapped[str] = mapped_column(String(100))
+    total_amount: Mapped[float]
+    tax_amount: Mapped[float]
+    final_amount: Mapped[float]
+    date: Mapped[datetime] = mapped_column(index=True)
+    status: Mapped[str] = mapped_column(String(20))
+    items: Mapped[list['SaleItem']] = relationship(back_populates='sale')
+
+
+class SaleItem(Base):
+    __tablename__ = 'sale_items'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sale_id: Mapped[int] = mapped_column(ForeignKey('sales.id'), index=True)
+    product_id: Mapped[int]
+    quantity: Mapped[int]
+    unit_price: Mapped[float]
+    sale: Mapped[Sale] = relationship(back_populates='items')
+
+
+def make_engine(path, tuned):
+    url = f'sqlite:///{path}'
+    if not tuned:
+        return create_engine(url)
+    engine = create_engine(url, **Config.SQLALCHEMY_ENGINE_OPTIONS)
+    enable_sqlite_performance(Config.SQLITE_PRAGMAS, engine)
+    return engine
+
+
+def write_sale(engine, n):
+    """Commit one sale and its items in its own transaction, retrying when locked"""
+    rng = random.Random(n)
+    items = [SaleItem(product_id=rng.randint(1, 500), quantity=rng.randint(1, 5),
+                      unit_price=round(rng.uniform(5, 300), 2)) for _ in range(ITEMS_PER_SALE)]
+    total = sum(item.quantity * item.unit_price for item in items)
+    while True:
+        try:
+            with Session(engine) as session:
+                session.add(Sale(sale_number=f'#{n:09d}', customer_name='Walk-in Customer',
+                                 total_amount=total, tax_amount=total * 0.2,
+                                 final_amount=total * 1.2, status='Paid',
+                                 date=START + timedelta(minutes=n), items=items))
+                session.commit()
+            return
+        except OperationalError:
+            # "database is locked": the untuned engine has no busy timeout
+            time.sleep(0.001)
+
+
+def run_threads(threads, work):
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def benchmark(tuned, sales, threads):
+    directory = tempfile.mkdtemp(prefix='sims-sqlite-')
+    engine = make_engine(os.path.join(directory, 'bench.db'), tuned)
+    Base.metadata.create_all(engine)
+    pragmas = read_pragmas(engine, ('journal_mode', 'synchronous'))
+
+    per_thread = sales // threads
+    write_seconds = run_threads(threads, lambda t: [write_sale(engine, t * per_thread + i)
+                                                    for i in range(per_thread)])
+    written = per_thread * threads
+
+    stop = threading.Event()
+    reads = [0] * threads
+
+    def background_writer():
+        n = written
+        while not stop.is_set():
+            write_sale(engine, n)
+            n += 1
+
+    def reader(t):
+        rng = random.Random(t)
+        deadline = time.perf_counter() + 2.0
+        with Session(engine) as session:
+            while time.perf_counter() < deadline:
+                sale_id = rng.randint(1, written)
+                session.scalars(select(Sale).options(selectinload(Sale.items))
+                                .where(Sale.id == sale_id)).one()
+                day = START + timedelta(days=rng.randint(0, max(1, written // 1440)))
+                session.scalars(select(Sale).where(Sale.date >= day,
+                                                   Sale.date < day + timedelta(days=1))).all()
+                session.expunge_all()
+                session.rollback()
+                reads[t] += 2
+
+    writer = threading.Thread(target=background_writer)
+    writer.start()
+    read_seconds = run_threads(threads, reader)
+    stop.set()
+    writer.join()
+    engine.dispose()
+    return {
+        'pragmas': pragmas,
+        'writes_per_second': written / write_seconds,
+        'reads_per_second': sum(reads) / read_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sales', type=int, default=2000, help='sales written per run')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent writers and readers')
+    args = parser.parse_args()
+
+    results = {label: benchmark(tuned, args.sales, args.threads)
+               for label, tuned in (('default', False), ('tuned', True))}
+    print(f'{args.sales} sales x {ITEMS_PER_SALE} items, {args.threads} threads')
+    print(f'{"profile":<10}{"journal":>10}{"sync":>6}{"writes/s":>12}{"reads/s":>12}')
+    for label, result in results.items():
+        pragmas = result['pragmas']
+        print(f'{label:<10}{pragmas["journal_mode"]:>10}{pragmas["synchronous"]:>6}'
+              f'{result["writes_per_second"]:>12.0f}{result["reads_per_second"]:>12.0f}')
+    default, tuned = results['default'], results['tuned']
+    print(f'writes: {tuned["writes_per_second"] / default["writes_per_second"]:.1f}x, '
+          f'reads: {tuned["reads_per_second"] / default["reads_per_second"]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Shared helpers for the benchmark suite: latency summaries and JSON results
+
+Each benchmark is summarized as a count, throughput and p50/p95/p99
+latencies in milliseconds. A run is saved as one JSON file under
+``benchmarks/results/`` (with the machine, Python version and settings it
+ran with), and ``compare`` prints how each figure moved against an
+earlier file.
+"""
+
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Figures a comparison reports, and whether a larger value is better
+COMPARED = (('throughput', True), ('p50_ms', False), ('p95_ms', False), ('p99_ms', False))
+
+
+def summarize(samples, elapsed=None, errors=0):
+    """Summary of per-operation latencies in seconds
+
+    Throughput is operations per second over ``elapsed`` (wall time, which
+    differs from the sum of latencies when operations run concurrently);
+    without it, the latencies are taken to be back to back.
+    """
+    latencies = np.asarray(samples, dtype=float) * 1000
+    if elapsed is None:
+        elapsed = latencies.sum() / 1000
+    summary = {'count': len(latencies), 'errors': errors,
+               'throughput': round(len(latencies) / elapsed, 1) if elapsed else 0.0}
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, (50, 95, 99))
+        summary.update(mean_ms=round(float(latencies.mean()), 4), p50_ms=round(float(p50), 4),
+                       p95_ms=round(float(p95), 4), p99_ms=round(float(p99), 4),
+                       max_ms=round(float(latencies.max()), 4))
+    return summary
+
+
+def environment():
+    """Where a run happened, so results from different machines are not mixed up"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(RESULTS_DIR), timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'commit': commit or None,
+    }
+
+
+def save(suite, results, settings, path=None):
+    """Write a run to ``path`` (default: a timestamped file in RESULTS_DIR)"""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f'{suite}-{datetime.now():%Y%m%d-%H%M%S}.json')
+    run = {
+        'suite': suite,
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'settings': settings,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+        f.write('\n')
+    return path
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_table(results):
+    print(f'{"benchmark":<34}{"count":>8}{"ops/s":>12}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"errors":>8}')
+    for name, summary in results.items():
+        print(f'{name:<34}{summary["count"]:>8}{summary["throughput"]:>12.1f}'
+              f'{summary.get("p50_ms", 0):>10.3f}{summary.get("p95_ms", 0):>10.3f}'
+              f'{summary.get("p99_ms", 0):>10.3f}{summary["errors"]:>8}')
+
+
+def compare(results, previous):
+    """Print each figure's change against an earlier run (positive: better)"""
+    earlier = previous['results']
+    print(f'\nversus {previous["started"]} ({previous["environment"].get("commit") or "unknown commit"})')
+    print(f'{"benchmark":<34}' + ''.join(f'{figure:>14}' for figure, _ in COMPARED))
+    for name, summary in results.items():
+        if name not in earlier:
+            continue
+        cells = []
+        for figure, higher_is_better in COMPARED:
+            old, new = earlier[name].get(figure), summary.get(figure)
+            if not old or new is None:
+                cells.append(f'{"-":>14}')
+                continue
+            change = (new - old) / old * 100
+            cells.append(f'{change if higher_is_better else -change:>+13.1f}%')
+        print(f'{name:<34}' + ''.join(cells))
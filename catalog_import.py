@@ -0,0 +1,186 @@
+"""
+Streaming catalog import from CSV and XLSX files
+
+Rows are read lazily from the uploaded file, validated and upserted by SKU
+one chunk at a time, so neither the file nor the parsed rows are ever held
+in memory as a whole. Progress is reported after each chunk and row-level
+errors are collected up to a fixed limit.
+
+Expected columns (case-insensitive): sku, name, category, stock, price, cost.
+"""
+
+import csv
+import io
+import math
+from itertools import islice
+
+IMPORT_EXTENSIONS = ('csv', 'xlsx')
+REQUIRED_COLUMNS = ('sku', 'name', 'category', 'stock', 'price', 'cost')
+
+# Row errors kept in the report; later ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(ValueError):
+    """Raised when an upload cannot be read as a catalog file"""
+
+
+def iter_csv_rows(stream):
+    """Rows of a binary CSV stream as ``(row_number, row_dict)`` pairs
+
+    The header is checked immediately; data rows are read lazily.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        header = next(reader, None)
+    except (UnicodeDecodeError, csv.Error):
+        raise ImportFormatError('The file is not a UTF-8 CSV file')
+    if header is None:
+        raise ImportFormatError('The file is empty')
+    columns = _normalize_header(header)
+
+    def rows():
+        try:
+            for row_number, values in enumerate(reader, start=2):
+                if any(value.strip() for value in values):
+                    yield row_number, dict(zip(columns, values))
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise ImportFormatError(f'Unreadable CSV data after row {reader.line_num - 1}: {e}')
+    return rows()
+
+
+def iter_xlsx_rows(stream):
+    """Rows of the first sheet of an XLSX stream as ``(row_number, row_dict)`` pairs
+
+    The header is checked immediately; data rows are read lazily.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('XLSX import requires the openpyxl package')
+
+    # read_only mode parses the sheet lazily instead of loading every cell
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception:
+        raise ImportFormatError('The file is not a valid XLSX workbook')
+    sheet_rows = workbook.worksheets[0].iter_rows(values_only=True)
+    header = next(sheet_rows, None)
+    if header is None:
+        workbook.close()
+        raise ImportFormatError('The file is empty')
+    try:
+        columns = _normalize_header(['' if cell is None else str(cell) for cell in header])
+    except ImportFormatError:
+        workbook.close()
+        raise
+
+    def rows():
+        try:
+            for row_number, values in enumerate(sheet_rows, start=2):
+                if any(value not in (None, '') for value in values):
+                    yield row_number, dict(zip(columns, values))
+        finally:
+            workbook.close()
+    return rows()
+
+
+def _normalize_header(header):
+    columns = [str(name).strip().lower() for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFormatError(f'Missing columns: {", ".join(missing)}')
+    return columns
+
+
+def iter_rows(stream, extension):
+    """Row iterator for a file of the given extension"""
+    if extension == 'csv':
+        return iter_csv_rows(stream)
+    if extension == 'xlsx':
+        return iter_xlsx_rows(stream)
+    raise ImportFormatError(f'Unsupported file type: {extension}')
+
+
+def validate_row(row):
+    """Return ``(product_dict, None)`` for a valid row or ``(None, error)``"""
+    values = {name: row.get(name) for name in REQUIRED_COLUMNS}
+    for name in ('sku', 'name', 'category'):
+        value = values[name]
+        values[name] = '' if value is None else str(value).strip()
+        if not values[name]:
+            return None, f'{name} is required'
+
+    try:
+        stock = float(values['stock'])
+    except (TypeError, ValueError):
+        return None, 'stock must be a whole number'
+    if not math.isfinite(stock) or stock != int(stock) or stock < 0:
+        return None, 'stock must be a whole number'
+
+    prices = {}
+    for name in ('price', 'cost'):
+        try:
+            prices[name] = float(values[name])
+        except (TypeError, ValueError):
+            return None, f'{name} must be a number'
+        if not math.isfinite(prices[name]):
+            return None, f'{name} must be a number'
+        if prices[name] < 0:
+            return None, f'{name} cannot be negative'
+
+    return {
+        'name': values['name'],
+        'sku': values['sku'],
+        'category': values['category'],
+        'stock': int(stock),
+        'price': prices['price'],
+        'cost': prices['cost']
+    }, None
+
+
+class CatalogImporter:
+    """Validates and upserts catalog rows into a ProductStore chunk by chunk"""
+
+    def __init__(self, store, chunk_size=500):
+        self.store = store
+        self.chunk_size = chunk_size
+
+    def run(self, rows):
+        """Import ``(row_number, row_dict)`` pairs, yielding progress per chunk
+
+        Each progress dict has running ``rows``, ``created``, ``updated``
+        and ``failed`` counts and the row ``errors`` of that chunk. The last
+        dict has ``done`` set and carries every reported error.
+        """
+        totals = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0}
+        reported = []
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+
+            valid = []
+            errors = []
+            for row_number, row in chunk:
+                product, error = validate_row(row)
+                if error is None:
+                    valid.append(product)
+                    continue
+                totals['failed'] += 1
+                if len(reported) + len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': row_number, 'error': error})
+
+            outcomes = self.store.bulk_upsert(valid)
+            for action, _ in outcomes:
+                totals[action] += 1
+            # Rows repeating a SKU within the chunk overwrite the earlier row
+            totals['updated'] += len(valid) - len(outcomes)
+            totals['rows'] += len(chunk)
+            reported.extend(errors)
+            yield dict(totals, errors=errors, done=False)
+
+        yield dict(totals, errors=reported, done=True,
+                   errors_truncated=totals['failed'] > len(reported))
@@ -3,6 +3,7 @@ Configuration settings for the Smart Inventory Management System (SIMS)
 """
 import os
 from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 class Config:
     """Base configuration class"""
@@ -14,6 +15,32 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///sims.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # SQLite performance profile, applied to every connection (see sqlite_tuning.py)
+    SQLITE_PERFORMANCE = os.environ.get('SQLITE_PERFORMANCE', '1') != '0'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,  # Milliseconds a writer waits for the lock
+        'cache_size': -20000,  # Negative means KiB: 20 MB page cache
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    }
+    # Connection pool of each gunicorn worker
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('SQLITE_POOL_SIZE', 5)),
+        'max_overflow': 5,
+        'pool_timeout': 30,
+    }
+    
+    # Read-through model cache (see model_cache.py): seconds per model
+    MODEL_CACHE_TTLS = {
+        'Product': 60,  # Stock changes often
+        'Category': 3600,
+        'Supplier': 3600,
+    }
+    MODEL_CACHE_SIZE = 4096
+    
     # Application settings
     APP_NAME = "Smart Inventory Management System"
     APP_VERSION = "1.0.0"
@@ -28,9 +55,14 @@ class Config:
     DEFAULT_SAFETY_STOCK = 5
     DEFAULT_LEAD_TIME_DAYS = 7
     
-    # Alert settings
-    LOW_STOCK_THRESHOLD = 0.2  # 20% of reorder level
-    CRITICAL_STOCK_THRESHOLD = 0.1  # 10% of reorder level
+    # Replenishment planning (see replenishment.py)
+    ORDERING_COST = 100.0  # MAD per purchase order
+    HOLDING_COST_RATE = 0.25  # Yearly holding cost as a share of unit cost
+    SERVICE_LEVEL_Z = 1.65  # ~95% cycle service level
+    
+    # Alert settings: stock levels as fractions of a product's reorder level
+    LOW_STOCK_THRESHOLD = 1.0  # Low at or below the reorder level
+    CRITICAL_STOCK_THRESHOLD = 0.5  # Critical at or below half of it
     
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
@@ -43,13 +75,52 @@ class Config:
     # Pagination
     ITEMS_PER_PAGE = 20
     
+    # Sales ledger: sales kept in memory before older ones spill to disk
+    SALES_HOT_LIMIT = 10000
+    SALES_LEDGER_DIR = os.environ.get('SALES_LEDGER_DIR') or os.path.join('data', 'sales')
+    
+    # Where worker state lives: 'journal' keeps it in the process (run a
+    # single worker); 'sqlite' shares it between all workers
+    STATE_BACKEND = os.environ.get('STATE_BACKEND', 'journal')
+    SHARED_STATE_PATH = os.environ.get('SHARED_STATE_PATH') or os.path.join('data', 'inventory.db')
+    # Distinct per node (0-7) when several nodes take sales; part of every sale id
+    NODE_ID = int(os.environ.get('NODE_ID', 0))
+    
+    # Write-ahead journal: products and sales survive restarts
+    JOURNAL_DIR = os.environ.get('JOURNAL_DIR') or os.path.join('data', 'journal')
+    JOURNAL_SNAPSHOT_INTERVAL = 100000  # Logged records between snapshots
+    JOURNAL_COMMIT_DELAY = 0.0  # Seconds a flush waits for more writers to join
+    
+    # Live dashboard events (Server-Sent Events, see live_events.py)
+    SSE_HEARTBEAT = 15.0  # Seconds between keep-alives on an idle stream
+    SSE_QUEUE_SIZE = 256  # Pending events per client before it must resync
+    SSE_POLL_INTERVAL = 1.0  # Seconds between change feed polls with STATE_BACKEND=sqlite
+    # Open streams per worker. Each holds one of the worker's GUNICORN_THREADS
+    # threads, so at most half of them may stream; later dashboards poll
+    SSE_MAX_STREAMS = min(int(os.environ.get('SSE_MAX_STREAMS', 16)),
+                          int(os.environ.get('GUNICORN_THREADS', 64)) // 2)
+    
     # Analytics settings
     FORECAST_PERIODS = 30  # Days to forecast
+    FORECAST_REPLAY_DAYS = 90  # Days of ledger sales replayed into the demand models at startup
     ABC_ANALYSIS_PERIODS = 90  # Days to analyze for ABC classification
+    ABC_CLASS_A_SHARE = 0.8  # Revenue share covered by class A
+    ABC_CLASS_B_SHARE = 0.95  # Revenue share covered by classes A and B
     
     @staticmethod
     def init_app(app):
-        pass
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        if app.config.get('SQLITE_PERFORMANCE') and uri.startswith('sqlite'):
+            from sqlite_tuning import enable_sqlite_performance
+            enable_sqlite_performance(app.config['SQLITE_PRAGMAS'])
+    
+    @classmethod
+    def business_timezone(cls):
+        """tzinfo for TIMEZONE, or None (server local time) if tz data is missing"""
+        try:
+            return ZoneInfo(cls.TIMEZONE)
+        except ZoneInfoNotFoundError:
+            return None
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -60,6 +131,8 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-memory databases use a single-connection pool
+    SQLALCHEMY_ENGINE_OPTIONS = {}
     WTF_CSRF_ENABLED = False
 
 class ProductionConfig(Config):
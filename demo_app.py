@@ -3,9 +3,12 @@
 SIMS Demo - Simplified version to showcase the system
 """
 
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, jsonify
 from datetime import datetime
 
+from inventory_store import InventoryAggregates, stock_status
+from template_cache import CompiledPage
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'demo-secret-key'
 
@@ -401,29 +404,44 @@ DASHBOARD_TEMPLATE = """
 </html>
 """
 
+def demo_status(product):
+    """Stock status of a demo product relative to its reorder level"""
+    return stock_status(product['current_stock'], product['reorder_level'])
+
+# Running dashboard totals, maintained as products are added
+totals = InventoryAggregates()
+for product in SAMPLE_PRODUCTS:
+    totals.add(product['category'], product['current_stock'], product['cost_price'],
+               product['unit_price'], demo_status(product))
+
+# Compiled once at startup; re-rendered only when the totals change
+dashboard_page = CompiledPage(app, DASHBOARD_TEMPLATE)
+
+def dashboard_context():
+    """Template inputs for the dashboard page"""
+    recent_sales = 23  # Demo value
+    
+    return dict(products=SAMPLE_PRODUCTS,
+                total_products=totals.total_products,
+                inventory_value=f"{totals.inventory_value:,.2f}",
+                low_stock_count=totals.low_stock_count + totals.out_of_stock_count,
+                recent_sales=recent_sales)
+
 @app.route('/')
 def dashboard():
     """Main dashboard route"""
-    # Calculate metrics
-    total_products = len(SAMPLE_PRODUCTS)
-    inventory_value = sum(p['current_stock'] * p['cost_price'] for p in SAMPLE_PRODUCTS)
-    low_stock_count = sum(1 for p in SAMPLE_PRODUCTS if p['current_stock'] <= p['reorder_level'])
-    recent_sales = 23  # Demo value
-    
-    return render_template_string(DASHBOARD_TEMPLATE, 
-                                products=SAMPLE_PRODUCTS,
-                                total_products=total_products,
-                                inventory_value=f"{inventory_value:,.2f}",
-                                low_stock_count=low_stock_count,
-                                recent_sales=recent_sales)
+    return dashboard_page.response(totals.version, dashboard_context)
 
 @app.route('/api/dashboard')
 def api_dashboard():
     """API endpoint for dashboard data"""
     return jsonify({
-        'total_products': len(SAMPLE_PRODUCTS),
-        'inventory_value': sum(p['current_stock'] * p['cost_price'] for p in SAMPLE_PRODUCTS),
-        'low_stock_count': sum(1 for p in SAMPLE_PRODUCTS if p['current_stock'] <= p['reorder_level']),
+        'total_products': totals.total_products,
+        'inventory_value': round(totals.inventory_value, 2),
+        'retail_value': round(totals.retail_value, 2),
+        'low_stock_count': totals.low_stock_count + totals.out_of_stock_count,
+        'out_of_stock_count': totals.out_of_stock_count,
+        'categories': totals.as_dict()['categories'],
         'recent_sales': 23,
         'status': 'demo_active',
         'timestamp': datetime.now().isoformat()
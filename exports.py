@@ -0,0 +1,117 @@
+"""
+Streaming NDJSON and CSV exports of products and sales
+
+Rows are produced by generators and encoded in small batches, so a response
+of any length is written out in constant memory instead of being built as
+one list or string first.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, time
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+PRODUCT_COLUMNS = ('id', 'sku', 'name', 'category', 'stock', 'price', 'cost', 'status')
+SALE_COLUMNS = ('id', 'sale_number', 'date', 'customer_name', 'items', 'total_amount',
+                'tax_amount', 'final_amount', 'status')
+
+# Rows encoded per yielded chunk
+BATCH_SIZE = 500
+
+
+def parse_date_range(start, end):
+    """Parse optional ISO ``from``/``to`` bounds into datetimes
+
+    A bare date as the upper bound includes that whole day. Raises
+    ValueError on malformed input.
+    """
+    def parse(value, upper):
+        if not value:
+            return None
+        try:
+            if len(value) == 10:
+                day = datetime.fromisoformat(value).date()
+                return datetime.combine(day, time.max if upper else time.min)
+            when = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f'Invalid date: {value}')
+        if when.tzinfo is not None:
+            # Sale dates are naive server local time
+            when = when.astimezone().replace(tzinfo=None)
+        return when
+
+    return parse(start, False), parse(end, True)
+
+
+def iter_products(store, category=None):
+    """Yield product rows, optionally for one category
+
+    Only references to the products are snapshotted; each row is built
+    as it is written.
+    """
+    products = store.in_category(category) if category else store.all()
+    for product in products:
+        yield {column: product[column] for column in PRODUCT_COLUMNS}
+
+
+def iter_sales(ledger, store, start=None, end=None, category=None):
+    """Yield sale rows within a date range, optionally touching a category
+
+    Rows come straight from the ledger's query, which only reads the
+    on-disk blocks overlapping the range.
+    """
+    for sale in ledger.query(start, end):
+        if category and not _sale_in_category(sale, store, category):
+            continue
+        row = {column: sale[column] for column in SALE_COLUMNS}
+        row['items'] = sum(item['quantity'] for item in sale['items'])
+        yield row
+
+
+def _sale_in_category(sale, store, category):
+    for item in sale['items']:
+        product = store.get(item['product_id'])
+        if product is not None and product['category'] == category:
+            return True
+    return False
+
+
+def encode_ndjson(rows):
+    """Encode rows as newline-delimited JSON, one batch per chunk"""
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+        if len(batch) >= BATCH_SIZE:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def encode_csv(rows, columns):
+    """Encode rows as CSV with a header line, one batch per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+        count += 1
+        if count >= BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue()
+
+
+def encode(rows, columns, export_format):
+    """Encode rows in an export format ('ndjson' or 'csv')"""
+    if export_format == 'csv':
+        return encode_csv(rows, columns)
+    return encode_ndjson(rows)
@@ -0,0 +1,312 @@
+"""
+Demand forecasting for the SIMS dashboard
+
+``DemandForecaster`` fits an additive Holt-Winters model (level, trend and
+weekly seasonality) per SKU and per category from recorded sales. Sales
+accumulate into the current day's bucket and each closed day updates the
+model state in O(1), so reading a forecast never refits over the history.
+
+``ForecastEngine`` produces synthetic demand for series that have no sales
+yet. Both build history, forecast and confidence bands for many series in
+one batched NumPy pass, and a seed makes the synthetic output reproducible.
+"""
+
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+
+HISTORY_DAYS = 30
+HORIZON_DAYS = 30
+SEASON_LENGTH = 7  # Weekly seasonality
+
+# Holt-Winters smoothing factors for level, trend, season and error variance
+ALPHA = 0.3
+BETA = 0.05
+GAMMA = 0.15
+VARIANCE_SMOOTHING = 0.1
+Z_95 = 1.96
+
+# Baseline daily demand and 30-day growth per category
+CATEGORY_PROFILES = {
+    'textiles': (150.0, 1.02),
+    'electronics': (80.0, 1.05),
+}
+DEFAULT_PROFILE = (120.0, 1.03)
+
+
+def category_profile(category):
+    """Return ``(base_demand, trend)`` for a category name"""
+    return CATEGORY_PROFILES.get(category.lower(), DEFAULT_PROFILE)
+
+
+@lru_cache(maxsize=8)
+def date_axis(today, history_days=HISTORY_DAYS, horizon_days=HORIZON_DAYS):
+    """Chart labels and weekend mask for the days around ``today``
+
+    Cached per date, so labels are formatted once a day rather than once
+    per point per request.
+    """
+    days = [today + timedelta(days=offset)
+            for offset in range(-(history_days - 1), horizon_days + 1)]
+    labels = tuple(day.strftime('%b %d') for day in days)
+    weekend = np.array([day.weekday() >= 5 for day in days[:history_days]])
+    weekend.flags.writeable = False
+    return labels, weekend
+
+
+class ForecastEngine:
+    """Batched forecast generator over any number of series"""
+
+    def __init__(self, history_days=HISTORY_DAYS, horizon_days=HORIZON_DAYS, seed=None):
+        self.history_days = history_days
+        self.horizon_days = horizon_days
+        self.seed = seed
+
+    def _rng(self):
+        # A fresh generator per call keeps seeded output independent of call order
+        return np.random.default_rng(self.seed)
+
+    def forecast_batch(self, categories, today=None):
+        """Forecast every category in one pass
+
+        Returns a dict with ``labels`` (shared by all series) and 2-D arrays
+        ``historical``, ``forecast``, ``confidence_upper`` and
+        ``confidence_lower`` with one row per category.
+        """
+        today = today or datetime.now()
+        if isinstance(today, datetime):
+            today = today.date()
+        labels, weekend = date_axis(today, self.history_days, self.horizon_days)
+        h, f = self.history_days, self.horizon_days
+        rng = self._rng()
+
+        profiles = np.array([category_profile(c) for c in categories], dtype=float).reshape(-1, 2)
+        base = profiles[:, :1]
+        trend = profiles[:, 1:]
+
+        # History: days_ago runs h-1 .. 0, oldest first
+        days_ago = np.arange(h - 1, -1, -1, dtype=float)
+        seasonality = np.sin(days_ago / h * 2 * np.pi) * 20
+        noise = (rng.random((len(categories), h)) - 0.5) * 30
+        historical = np.maximum(0, base + seasonality + noise - 15 * weekend)
+
+        # Forecast: compound the trend from the last observed day
+        ahead = np.arange(1, f + 1, dtype=float)
+        growth = trend ** (ahead / f)
+        seasonality = np.sin((h + ahead) / h * 2 * np.pi) * 15
+        noise = (rng.random((len(categories), f)) - 0.5) * 10
+        forecast = np.maximum(0, historical[:, -1:] * growth + seasonality + noise)
+
+        width = 10 + ahead / f * 20
+        return {
+            'labels': list(labels),
+            'historical': historical,
+            'forecast': forecast,
+            'confidence_upper': forecast + width,
+            'confidence_lower': np.maximum(0, forecast - width),
+        }
+
+    def forecast(self, category, today=None):
+        """Forecast a single category in the /api/forecast JSON shape"""
+        batch = self.forecast_batch([category], today)
+        return series_payload(batch, 0)
+
+
+class HoltWintersSeries:
+    """Additive Holt-Winters state for one daily demand series"""
+
+    __slots__ = ('level', 'trend', 'season', 'variance', 'days_fitted',
+                 'open_day', 'open_total', 'recent', 'revision')
+
+    def __init__(self, first_day, history_days=HISTORY_DAYS):
+        self.level = 0.0
+        self.trend = 0.0
+        self.season = [0.0] * SEASON_LENGTH
+        self.variance = 0.0
+        self.days_fitted = 0
+        self.open_day = first_day
+        self.open_total = 0.0
+        # Closed daily totals for the history chart, newest last
+        self.recent = deque(maxlen=history_days)
+        # Number of recorded demand events, for keying derived caches
+        self.revision = 0
+
+    def record(self, day, quantity):
+        """Add demand on a day; closes any earlier open days first"""
+        self.advance(day)
+        self.open_total += quantity
+        self.revision += 1
+
+    def advance(self, day):
+        """Close every day before ``day``, treating missing days as zero demand"""
+        while self.open_day < day:
+            self._observe(self.open_total, self.open_day)
+            self.open_day += timedelta(days=1)
+            self.open_total = 0.0
+
+    def _observe(self, demand, day):
+        self.recent.append(demand)
+        s = day.toordinal() % SEASON_LENGTH
+        if self.days_fitted == 0:
+            self.level = demand
+        else:
+            expected = self.level + self.trend + self.season[s]
+            error = demand - expected
+            self.variance = (1 - VARIANCE_SMOOTHING) * self.variance + VARIANCE_SMOOTHING * error * error
+            previous_level = self.level
+            self.level = ALPHA * (demand - self.season[s]) + (1 - ALPHA) * (self.level + self.trend)
+            self.trend = BETA * (self.level - previous_level) + (1 - BETA) * self.trend
+            self.season[s] = GAMMA * (demand - self.level) + (1 - GAMMA) * self.season[s]
+        self.days_fitted += 1
+
+
+class DemandForecaster:
+    """Holt-Winters models per SKU and per category, fed by recorded sales"""
+
+    def __init__(self, history_days=HISTORY_DAYS, horizon_days=HORIZON_DAYS, timezone=None):
+        self.history_days = history_days
+        self.horizon_days = horizon_days
+        # Days are business days in this timezone (server local time if None)
+        self.timezone = timezone
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def sku_key(sku):
+        return f'sku:{sku}'
+
+    @staticmethod
+    def category_key(category):
+        return f'category:{(category or "").lower()}'
+
+    def __contains__(self, key):
+        return key in self._series
+
+    def revision(self, key):
+        """How many demand events a series has received (0 if unknown)"""
+        series = self._series.get(key)
+        return 0 if series is None else series.revision
+
+    def business_day(self, when=None):
+        """Business date of a point in time; naive times are server local time"""
+        if when is None:
+            return datetime.now(self.timezone).date()
+        if self.timezone is not None:
+            when = when.astimezone(self.timezone)
+        return when.date()
+
+    def record(self, key, quantity, when=None):
+        """Record demand for a series key at a point in time"""
+        day = self.business_day(when)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = HoltWintersSeries(day, self.history_days)
+            series.record(day, quantity)
+
+    def record_sale(self, sale, lines):
+        """Sale listener: update the SKU and category series of each line"""
+        when = datetime.fromisoformat(sale['date'])
+        for product, quantity in lines:
+            self.record(self.sku_key(product['sku']), quantity, when)
+            self.record(self.category_key(product['category']), quantity, when)
+
+    def replay(self, sales, categories):
+        """Record ledger sales, oldest first, e.g. to rebuild the models at startup
+
+        Ledger lines carry the SKU only; ``categories`` maps SKUs to their
+        category, and lines of SKUs missing from it update the SKU series only.
+        """
+        for sale in sales:
+            when = datetime.fromisoformat(sale['date'])
+            for line in sale['items']:
+                self.record(self.sku_key(line['sku']), line['quantity'], when)
+                category = categories.get(line['sku'])
+                if category is not None:
+                    self.record(self.category_key(category), line['quantity'], when)
+
+    def forecast_batch(self, keys, today=None):
+        """Forecast every known series key in one vectorized pass
+
+        Returns the same structure as ``ForecastEngine.forecast_batch``.
+        Unknown keys raise KeyError. ``today`` may be a date or datetime.
+        """
+        if today is None or isinstance(today, datetime):
+            today = self.business_day(today)
+        labels, _ = date_axis(today, self.history_days, self.horizon_days)
+        h, f = self.history_days, self.horizon_days
+        n = len(keys)
+
+        levels = np.empty((n, 1))
+        trends = np.empty((n, 1))
+        seasons = np.empty((n, SEASON_LENGTH))
+        sigmas = np.empty((n, 1))
+        historical = np.zeros((n, h))
+        with self._lock:
+            for row, key in enumerate(keys):
+                series = self._series[key]
+                series.advance(today)
+                levels[row] = series.level
+                trends[row] = series.trend
+                seasons[row] = series.season
+                sigmas[row] = np.sqrt(series.variance)
+                recent = list(series.recent)[-(h - 1):] + [series.open_total]
+                historical[row, h - len(recent):] = recent
+
+        # Steps are counted from the last closed day (yesterday)
+        ahead = np.arange(1, f + 1)
+        steps = ahead + 1
+        season_index = (today.toordinal() + ahead) % SEASON_LENGTH
+        forecast = np.maximum(0, levels + trends * steps + seasons[:, season_index])
+        width = Z_95 * sigmas * np.sqrt(steps)
+        return {
+            'labels': list(labels),
+            'historical': historical,
+            'forecast': forecast,
+            'confidence_upper': forecast + width,
+            'confidence_lower': np.maximum(0, forecast - width),
+        }
+
+    def demand_rates(self, keys, today=None):
+        """Daily demand level and its standard deviation per series key
+
+        Returns two arrays aligned with ``keys``. Unknown keys have zero
+        demand; the deviation is NaN until a series has been fitted over a
+        full season, as its error variance means little before that.
+        """
+        if today is None or isinstance(today, datetime):
+            today = self.business_day(today)
+        levels = np.zeros(len(keys))
+        sigmas = np.full(len(keys), np.nan)
+        with self._lock:
+            for row, key in enumerate(keys):
+                series = self._series.get(key)
+                if series is None:
+                    continue
+                series.advance(today)
+                if series.days_fitted == 0:
+                    # Only today's open total so far
+                    levels[row] = series.open_total
+                else:
+                    levels[row] = max(series.level, 0.0)
+                if series.days_fitted >= SEASON_LENGTH:
+                    sigmas[row] = np.sqrt(series.variance)
+        return levels, sigmas
+
+    def forecast(self, key, today=None):
+        """Forecast a single series key in the /api/forecast JSON shape"""
+        return series_payload(self.forecast_batch([key], today), 0)
+
+
+def series_payload(batch, row):
+    """Extract one series of a batch as JSON-ready lists"""
+    return {
+        'labels': batch['labels'],
+        'historical': batch['historical'][row].tolist(),
+        'forecast': batch['forecast'][row].tolist(),
+        'confidence_upper': batch['confidence_upper'][row].tolist(),
+        'confidence_lower': batch['confidence_lower'][row].tolist(),
+    }
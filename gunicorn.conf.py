@@ -0,0 +1,26 @@
+"""
+Gunicorn settings, read automatically by the Procfile's ``gunicorn app_deploy:app``
+
+Workers only agree on stock and sale ids when the inventory state is shared
+through SQLite (STATE_BACKEND=sqlite), so that mode runs one worker per
+core and the default in-process state runs a single worker.
+WEB_CONCURRENCY overrides either.
+
+Workers are threaded so that open /api/events streams, which mostly sit
+waiting, hold a thread each rather than a whole worker process.
+GUNICORN_THREADS sets the threads per worker; SSE_MAX_STREAMS (see
+config.py) keeps at least half of them for ordinary requests.
+"""
+
+import multiprocessing
+import os
+
+if os.environ.get('WEB_CONCURRENCY'):
+    workers = int(os.environ['WEB_CONCURRENCY'])
+elif os.environ.get('STATE_BACKEND') == 'sqlite':
+    workers = multiprocessing.cpu_count()
+else:
+    workers = 1
+
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 64))
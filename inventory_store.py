@@ -0,0 +1,589 @@
+"""
+Indexed in-memory product store for the SIMS deployment app
+
+Products are kept as plain dicts (the same shape the API returns) and are
+reachable through hash indexes by id and SKU, plus secondary indexes by
+category and stock status, so lookups never scan the catalog. Each product
+also has its own lock so that writers touching different SKUs do not
+serialize behind one global lock.
+
+A product's status follows from its stock and its reorder level (the
+optional ``reorder_level`` field, else ``Config.DEFAULT_REORDER_LEVEL``);
+``stock_level`` is the one place that rule lives. Listeners registered in
+``listeners`` see every product change as it happens, e.g. to raise
+stock alerts; a listener that raises is logged and skipped, since the
+change it was told about has already been applied.
+
+Every mutation bumps a monotonically increasing ``version`` so that
+derived data (serialized responses, rendered pages) can tell when it is
+stale without comparing contents. Dashboard totals are kept as running
+aggregates updated in O(1) by each mutation instead of being summed over
+the catalog on every request.
+"""
+
+import base64
+import heapq
+import json
+import logging
+import secrets
+import threading
+from contextlib import ExitStack, nullcontext
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REORDER_LEVEL = Config.DEFAULT_REORDER_LEVEL
+# Fractions of the reorder level at or below which stock is low or critical
+LOW_STOCK_THRESHOLD = Config.LOW_STOCK_THRESHOLD
+CRITICAL_STOCK_THRESHOLD = Config.CRITICAL_STOCK_THRESHOLD
+# Stock level at or below which a product without its own reorder level is low
+LOW_STOCK_LEVEL = DEFAULT_REORDER_LEVEL * LOW_STOCK_THRESHOLD
+
+LEVEL_NORMAL = 'normal'
+LEVEL_LOW = 'low'
+LEVEL_CRITICAL = 'critical'
+LEVEL_OUT = 'out'
+# Most urgent last
+LEVELS = (LEVEL_NORMAL, LEVEL_LOW, LEVEL_CRITICAL, LEVEL_OUT)
+
+STATUS_NORMAL = 'Normal'
+STATUS_LOW = 'Low Stock'
+STATUS_OUT = 'Out of Stock'
+
+# Catalog status per level; critical products are listed as low stock
+LEVEL_STATUS = {
+    LEVEL_NORMAL: STATUS_NORMAL,
+    LEVEL_LOW: STATUS_LOW,
+    LEVEL_CRITICAL: STATUS_LOW,
+    LEVEL_OUT: STATUS_OUT,
+}
+
+
+def stock_level(stock, reorder_level=None):
+    """Return the alert level of a stock quantity against a reorder level"""
+    if reorder_level is None:
+        reorder_level = DEFAULT_REORDER_LEVEL
+    if stock <= 0:
+        return LEVEL_OUT
+    if stock <= reorder_level * CRITICAL_STOCK_THRESHOLD:
+        return LEVEL_CRITICAL
+    if stock <= reorder_level * LOW_STOCK_THRESHOLD:
+        return LEVEL_LOW
+    return LEVEL_NORMAL
+
+
+def stock_status(stock, reorder_level=None):
+    """Return the status label for a stock quantity"""
+    return LEVEL_STATUS[stock_level(stock, reorder_level)]
+
+
+# Fields a catalog listing can be sorted on or projected to
+SORT_FIELDS = ('id', 'name', 'sku', 'category', 'stock', 'price', 'cost')
+PRODUCT_FIELDS = SORT_FIELDS + ('status',)
+NUMERIC_FIELDS = ('id', 'stock', 'price', 'cost')
+
+
+def encode_cursor(sort, key, descending=False):
+    """Encode a listing sort key as an opaque URL-safe cursor
+
+    The sort field and direction are recorded as ``stock`` or ``-stock``,
+    so the cursor only resumes a listing in the same order.
+    """
+    raw = json.dumps([_signed(sort, descending)] + list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, descending=False):
+    """Decode a cursor for the given sort field and direction; ValueError if it does not fit"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, list) or len(key) != 4 or key[0] != _signed(sort, descending):
+        raise ValueError('Invalid cursor')
+    # The key must compare with ``query``'s sort keys: (is None, value, id)
+    _, missing, value, product_id = key
+    if missing is True:
+        valid_value = value == ''
+    elif sort in NUMERIC_FIELDS:
+        valid_value = _is_number(value)
+    else:
+        valid_value = isinstance(value, str)
+    if not isinstance(missing, bool) or not valid_value or type(product_id) is not int:
+        raise ValueError('Invalid cursor')
+    return tuple(key[1:])
+
+
+def _signed(sort, descending):
+    return f'-{sort}' if descending else sort
+
+
+def _is_number(value):
+    # JSON true and false decode to bools, which are ints to isinstance
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _whole_number(value):
+    """``value`` as an int if it is a whole number (or a string of one), else None"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class InventoryAggregates:
+    """Running inventory totals, overall and per category
+
+    Callers report each product once through ``add`` and every stock
+    change through ``update``; reads never touch the products themselves.
+    Products without a category are totalled under the empty string, so
+    the category names always sort and serialize together.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.total_products = 0
+        self.total_units = 0
+        self.inventory_value = 0.0
+        self.retail_value = 0.0
+        self.status_counts = {}
+        self.categories = {}
+
+    def add(self, category, stock, cost, price, status):
+        """Account for a new product"""
+        self.total_products += 1
+        totals = self.categories.setdefault(category or '', {
+            'products': 0, 'units': 0, 'inventory_value': 0.0, 'retail_value': 0.0
+        })
+        totals['products'] += 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        self._apply(totals, stock, cost, price)
+
+    def remove(self, category, stock, cost, price, status):
+        """Withdraw a product's contribution (e.g. before its details change)"""
+        self.total_products -= 1
+        totals = self.categories[category or '']
+        totals['products'] -= 1
+        self.status_counts[status] -= 1
+        self._apply(totals, -stock, cost, price)
+        if not totals['products']:
+            del self.categories[category or '']
+
+    def update(self, category, cost, price, old_stock, new_stock, old_status, new_status):
+        """Account for a product's stock moving from old_stock to new_stock"""
+        if old_status != new_status:
+            self.status_counts[old_status] -= 1
+            self.status_counts[new_status] = self.status_counts.get(new_status, 0) + 1
+        self._apply(self.categories[category or ''], new_stock - old_stock, cost, price)
+
+    def _apply(self, totals, units, cost, price):
+        self.total_units += units
+        self.inventory_value += units * cost
+        self.retail_value += units * price
+        totals['units'] += units
+        totals['inventory_value'] += units * cost
+        totals['retail_value'] += units * price
+        self.version += 1
+
+    @property
+    def low_stock_count(self):
+        return self.status_counts.get(STATUS_LOW, 0)
+
+    @property
+    def out_of_stock_count(self):
+        return self.status_counts.get(STATUS_OUT, 0)
+
+    def as_dict(self):
+        """Current totals, rounded for display"""
+        return {
+            'total_products': self.total_products,
+            'total_units': self.total_units,
+            'inventory_value': round(self.inventory_value, 2),
+            'retail_value': round(self.retail_value, 2),
+            'low_stock_count': self.low_stock_count,
+            'out_of_stock_count': self.out_of_stock_count,
+            'categories': {
+                name: {
+                    'products': totals['products'],
+                    'units': totals['units'],
+                    'inventory_value': round(totals['inventory_value'], 2),
+                    'retail_value': round(totals['retail_value'], 2)
+                }
+                for name, totals in self.categories.items()
+            }
+        }
+
+
+class DuplicateSKUError(ValueError):
+    """Raised when a product is added with a SKU that already exists"""
+
+
+class ProductStore:
+    """In-memory product catalog with id, SKU, category and status indexes"""
+
+    def __init__(self, products=()):
+        self._lock = threading.RLock()
+        self._product_locks = {}
+        self._by_id = {}
+        self._by_sku = {}
+        self._by_category = {}
+        self._by_status = {}
+        self._next_id = 1
+        # Distinguishes versions of this store from those of a previous process
+        self.epoch = secrets.token_hex(4)
+        self.version = 0
+        self.aggregates = InventoryAggregates()
+        # Optional write-ahead log receiving every mutation (see journal.py)
+        self.journal = None
+        # Called as fn(product) after a product is added or changed, while
+        # the mutation's locks are held; must be quick and must not call
+        # back into the store
+        self.listeners = []
+        for product in products:
+            self.add(dict(product))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, product_id):
+        return product_id in self._by_id
+
+    def all(self):
+        """Return every product in insertion order"""
+        return list(self._by_id.values())
+
+    def get(self, product_id):
+        """Return the product with the given id, or None"""
+        return self._by_id.get(product_id)
+
+    def get_by_sku(self, sku):
+        """Return the product with the given SKU, or None"""
+        return self._by_sku.get(sku)
+
+    def in_category(self, category):
+        """Return the products of a category"""
+        return list(self._by_category.get(category, {}).values())
+
+    def with_status(self, status):
+        """Return the products currently in the given stock status"""
+        return list(self._by_status.get(status, {}).values())
+
+    def query(self, category=None, status=None, min_stock=None, max_stock=None,
+              sort='id', descending=False, after=None, limit=20):
+        """Return one page of a filtered, sorted catalog listing
+
+        Candidates come from the narrowest matching index and only the
+        ``limit`` products following the ``after`` cursor key are kept, so
+        a page costs O(k log limit) for k candidates rather than a full
+        sort. Returns ``(page, next_key, total)`` where ``next_key`` is the
+        sort key to resume from, or None on the last page.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f'Cannot sort by {sort}')
+
+        if category is not None and status is not None:
+            by_category = self._by_category.get(category, {})
+            by_status = self._by_status.get(status, {})
+            if len(by_category) <= len(by_status):
+                candidates = [p for p in list(by_category.values()) if p['status'] == status]
+            else:
+                candidates = [p for p in list(by_status.values()) if p['category'] == category]
+        elif category is not None:
+            candidates = list(self._by_category.get(category, {}).values())
+        elif status is not None:
+            candidates = list(self._by_status.get(status, {}).values())
+        else:
+            candidates = list(self._by_id.values())
+
+        if min_stock is not None or max_stock is not None:
+            low = float('-inf') if min_stock is None else min_stock
+            high = float('inf') if max_stock is None else max_stock
+            candidates = [p for p in candidates if low <= p['stock'] <= high]
+        total = len(candidates)
+
+        def sort_key(product):
+            value = product[sort]
+            return (value is None, '' if value is None else value, product['id'])
+
+        if after is not None:
+            after = tuple(after)
+            if descending:
+                candidates = [p for p in candidates if sort_key(p) < after]
+            else:
+                candidates = [p for p in candidates if sort_key(p) > after]
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        page = select(limit + 1, candidates, key=sort_key)
+        next_key = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_key = list(sort_key(page[-1]))
+        return page, next_key, total
+
+    def lock_for(self, product_id):
+        """Return the lock guarding a product's stock"""
+        return self._product_locks[product_id]
+
+    def categories(self):
+        """Return the names of all categories that hold products"""
+        return list(self._by_category)
+
+    def add(self, product):
+        """Insert a product dict, assigning an id if it has none"""
+        with self.transaction(), self._lock:
+            self._insert(product)
+            lsn = self._log({'op': 'product', 'product': dict(product)})
+        self._sync(lsn)
+        return product
+
+    def restore(self, product):
+        """Insert a product, or overwrite the one with the same id
+
+        Used to apply snapshot and journal records; the product is not
+        journaled again.
+        """
+        existing = self._by_id.get(product['id'])
+        if existing is None:
+            with self._lock:
+                return self._insert(dict(product))
+        with self._product_locks[existing['id']]:
+            with self._lock:
+                return self._replace(existing, product)
+
+    def load(self, products):
+        """Replace the whole catalog, e.g. with the products of a snapshot"""
+        with self._lock:
+            self._product_locks = {}
+            self._by_id = {}
+            self._by_sku = {}
+            self._by_category = {}
+            self._by_status = {}
+            self._next_id = 1
+            self.aggregates = InventoryAggregates()
+            for product in products:
+                self._insert(dict(product))
+            self.version += 1
+
+    def _insert(self, product):
+        """Index a new product; caller holds the index lock"""
+        sku = product.get('sku')
+        if sku is not None and sku in self._by_sku:
+            raise DuplicateSKUError(f'SKU {sku} already exists')
+
+        if product.get('id') is None:
+            product['id'] = self._next_id
+        self._next_id = max(self._next_id, product['id'] + 1)
+        product['status'] = stock_status(product['stock'], product.get('reorder_level'))
+
+        self._product_locks[product['id']] = threading.Lock()
+        self._by_id[product['id']] = product
+        if sku is not None:
+            self._by_sku[sku] = product
+        self._index(self._by_category, product['category'], product)
+        self._index(self._by_status, product['status'], product)
+        self.aggregates.add(product['category'], product['stock'], product['cost'],
+                            product['price'], product['status'])
+        self.version += 1
+        self._notify(product)
+        return product
+
+    def set_stock(self, product, stock):
+        """Set a product's stock and move it to the matching status index
+
+        The caller must hold the product's lock (see ``lock_for``).
+        """
+        old_stock = product['stock']
+        old_status = product['status']
+        status = stock_status(stock, product.get('reorder_level'))
+        with self._lock:
+            product['stock'] = stock
+            if status != old_status:
+                self._unindex(self._by_status, old_status, product)
+                product['status'] = status
+                self._index(self._by_status, status, product)
+            self.aggregates.update(product['category'], product['cost'], product['price'],
+                                   old_stock, stock, old_status, status)
+            self.version += 1
+            self._notify(product)
+        return product
+
+    def adjust_stock(self, product_id, adjustment):
+        """Apply a stock adjustment, clamping at zero; None if not found"""
+        with self.transaction():
+            product = self._by_id.get(product_id)
+            if product is None:
+                return None
+            with self._product_locks[product_id]:
+                self.set_stock(product, max(0, product['stock'] + adjustment))
+                lsn = self._log({'op': 'stock', 'stock': [[product_id, product['stock']]]})
+        self._sync(lsn)
+        return product
+
+    def bulk_upsert(self, records):
+        """Insert or update many products by SKU in one pass
+
+        ``records`` are complete product dicts without ids. Existing SKUs
+        have their details and stock replaced; new SKUs are added. The
+        affected product locks are taken together and the index lock is
+        held once. Returns ``(action, product)`` per distinct SKU, where
+        action is 'created' or 'updated'; when a SKU repeats the last
+        record wins.
+        """
+        pending = {record['sku']: record for record in records}
+        outcomes = []
+        lsn = 0
+        with self.transaction():
+            while pending:
+                retry = {}
+                locked = {self._by_sku[sku]['id'] for sku in pending if sku in self._by_sku}
+                with ExitStack() as locks:
+                    for product_id in sorted(locked):
+                        locks.enter_context(self._product_locks[product_id])
+                    with self._lock:
+                        for sku, record in pending.items():
+                            product = self._by_sku.get(sku)
+                            if product is None:
+                                action, product = 'created', self._insert(dict(record))
+                            elif product['id'] in locked:
+                                action, product = 'updated', self._replace(product, record)
+                            else:
+                                # Added by another writer after the locks were chosen
+                                retry[sku] = record
+                                continue
+                            outcomes.append((action, product))
+                            lsn = self._log({'op': 'product', 'product': dict(product)})
+                pending = retry
+        self._sync(lsn)
+        return outcomes
+
+    def _replace(self, product, record):
+        """Overwrite a product's details; caller holds its lock and the index lock"""
+        self.aggregates.remove(product['category'], product['stock'], product['cost'],
+                               product['price'], product['status'])
+        self._unindex(self._by_category, product['category'], product)
+        self._unindex(self._by_status, product['status'], product)
+        for field in ('name', 'category', 'stock', 'price', 'cost'):
+            product[field] = record[field]
+        if 'reorder_level' in record:
+            product['reorder_level'] = record['reorder_level']
+        product['status'] = stock_status(product['stock'], product.get('reorder_level'))
+        self._index(self._by_category, product['category'], product)
+        self._index(self._by_status, product['status'], product)
+        self.aggregates.add(product['category'], product['stock'], product['cost'],
+                            product['price'], product['status'])
+        self.version += 1
+        self._notify(product)
+        return product
+
+    def bulk_adjust(self, adjustments):
+        """Apply many ``{product_id | sku, adjustment}`` entries in one pass
+
+        Entries are resolved first and summed per product, so each product's
+        stock, status and aggregates change once however often it appears.
+        The product locks are taken together in ascending id order and the
+        index lock is held once for the whole batch. Returns one result dict
+        per entry, in request order.
+        """
+        results = []
+        totals = {}
+        with self.transaction():
+            for index, entry in enumerate(adjustments):
+                result = {'index': index, 'success': False}
+                results.append(result)
+                if not isinstance(entry, dict):
+                    result['error'] = 'Entry must be an object'
+                    continue
+                if entry.get('product_id') is not None:
+                    result['product_id'] = entry['product_id']
+                    if type(entry['product_id']) is not int:
+                        result['error'] = 'product_id must be an integer'
+                        continue
+                    product = self._by_id.get(entry['product_id'])
+                else:
+                    result['sku'] = entry.get('sku')
+                    if not isinstance(entry.get('sku'), str):
+                        result['error'] = 'sku must be a string'
+                        continue
+                    product = self._by_sku.get(entry['sku'])
+                adjustment = _whole_number(entry.get('adjustment', 0))
+                if adjustment is None:
+                    result['error'] = 'Adjustment must be an integer'
+                    continue
+                if product is None:
+                    result['error'] = 'Product not found'
+                    continue
+                result['product_id'] = product['id']
+                totals[product['id']] = totals.get(product['id'], 0) + adjustment
+
+            lsn = 0
+            with ExitStack() as locks:
+                for product_id in sorted(totals):
+                    locks.enter_context(self._product_locks[product_id])
+                with self._lock:
+                    stock = []
+                    for product_id, adjustment in totals.items():
+                        product = self._by_id[product_id]
+                        self.set_stock(product, max(0, product['stock'] + adjustment))
+                        stock.append([product_id, product['stock']])
+                    if stock:
+                        lsn = self._log({'op': 'stock', 'stock': stock})
+        self._sync(lsn)
+
+        for result in results:
+            if 'error' not in result:
+                product = self._by_id[result['product_id']]
+                result.update(success=True, sku=product['sku'],
+                              stock=product['stock'], status=product['status'])
+        return results
+
+    def transaction(self):
+        """Scope of one mutation, from reading current stock to logging it
+
+        A shared journal (see shared_state.py) serializes these across
+        processes and brings the store up to date before the scope starts;
+        otherwise it is a no-op.
+        """
+        if self.journal is None:
+            return nullcontext()
+        return self.journal.transaction()
+
+    def _log(self, record):
+        """Append a mutation to the journal while its locks are still held
+
+        Returns the record's sequence number, or 0 without a journal.
+        """
+        if self.journal is None:
+            return 0
+        return self.journal.append(record)
+
+    def _sync(self, lsn):
+        """Wait until a journaled mutation is durable; call after releasing locks"""
+        if lsn and self.journal is not None:
+            self.journal.wait(lsn)
+
+    def _notify(self, product):
+        """Call the listeners; one failing cannot undo or block the mutation"""
+        for listener in self.listeners:
+            try:
+                listener(product)
+            except Exception:
+                logger.exception('Store listener %r failed for product %s', listener, product.get('id'))
+
+    @staticmethod
+    def _index(index, key, product):
+        index.setdefault(key, {})[product['id']] = product
+
+    @staticmethod
+    def _unindex(index, key, product):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(product['id'], None)
+            if not bucket:
+                del index[key]
@@ -0,0 +1,385 @@
+"""
+Write-ahead journal and snapshots for the in-memory store
+
+Every product change and sale is appended to a log before the request that
+made it is answered, and every ``snapshot_interval`` records a compact
+snapshot of the catalog and the in-memory sales window is written in the
+background. A restart loads the newest snapshot and replays only the log
+records that follow it, so recovery time depends on the snapshot interval
+rather than on the length of the sales history.
+
+Concurrent writers share fsyncs (group commit): the first writer waiting
+for durability writes and syncs everything buffered so far, and writers
+arriving meanwhile wait for that flush instead of issuing their own.
+
+Records carry absolute stock levels rather than deltas and are appended
+while the product locks are held, so the log orders each product's changes
+the way they were applied and replaying a record twice is harmless. That
+lets snapshots be taken without pausing writers.
+
+The journal is also the sale engine's source of sale number blocks: each
+lease is logged, and the counters are part of every snapshot, so numbers
+handed out before a restart are not handed out again.
+
+Log lines are ``<crc32> <lsn> <json>``. A torn tail left by a crash is cut
+off when the log is reopened.
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import nullcontext
+
+from sale_ids import NumberBlocks
+
+LOG_PREFIX = 'wal-'
+LOG_SUFFIX = '.log'
+SNAPSHOT_PREFIX = 'snapshot-'
+SNAPSHOT_SUFFIX = '.ndjson.gz'
+
+
+class JournalError(Exception):
+    """Raised when a mutation cannot be made durable"""
+
+
+def _encode(lsn, payload):
+    body = f'{lsn} {payload}'
+    return f'{zlib.crc32(body.encode("utf-8")):08x} {body}\n'
+
+
+def _decode(line):
+    """Return ``(lsn, record)`` for an intact log line, else None"""
+    try:
+        text = line.decode('utf-8')
+        if not text.endswith('\n'):
+            return None
+        crc, body = text[:-1].split(' ', 1)
+        if int(crc, 16) != zlib.crc32(body.encode('utf-8')):
+            return None
+        lsn, payload = body.split(' ', 1)
+        return int(lsn), json.loads(payload)
+    except ValueError:
+        return None
+
+
+def _numbered(directory, prefix, suffix):
+    """Sorted ``(number, path)`` pairs of the files named prefix<number>suffix"""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            try:
+                number = int(name[len(prefix):-len(suffix)])
+            except ValueError:
+                continue
+            found.append((number, os.path.join(directory, name)))
+    return sorted(found)
+
+
+def apply_record(store, record):
+    """Apply a logged mutation to a store without logging it again
+
+    Returns the sale of a sale record, else None. Sale number leases do
+    not touch the store and are skipped.
+    """
+    if record['op'] == 'numbers':
+        return None
+    if record['op'] == 'product':
+        store.restore(record['product'])
+        return None
+    for product_id, stock in record['stock']:
+        product = store.get(product_id)
+        if product is not None:
+            with store.lock_for(product_id):
+                store.set_stock(product, stock)
+    return record.get('sale')
+
+
+class WriteAheadLog:
+    """Append-only record log split into files named by their first sequence number
+
+    Files are only created once there is something to write.
+    """
+
+    def __init__(self, directory, commit_delay=0.0):
+        self.directory = directory
+        # Seconds a flush leader waits for more records to join its batch
+        self.commit_delay = commit_delay
+        self._cond = threading.Condition()
+        self._pending = []
+        self._flushing = False
+        self._error = None
+        self._file = None
+        self.last_lsn = self._truncate_tail()
+        self.durable_lsn = self.last_lsn
+
+    def _truncate_tail(self):
+        """Cut a torn tail off the newest log file; return its last sequence number"""
+        files = _numbered(self.directory, LOG_PREFIX, LOG_SUFFIX)
+        if not files:
+            return 0
+        start, path = files[-1]
+        last = start - 1
+        valid_end = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                decoded = _decode(line)
+                if decoded is None:
+                    break
+                last = decoded[0]
+                valid_end += len(line)
+        if valid_end < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(valid_end)
+        return last
+
+    def resume_after(self, lsn):
+        """Number new records after ``lsn``, e.g. that of a snapshot whose log was deleted"""
+        with self._cond:
+            if lsn > self.last_lsn:
+                self.last_lsn = self.durable_lsn = lsn
+
+    def append(self, record):
+        """Buffer a record and return its sequence number; see ``wait``"""
+        payload = json.dumps(record, separators=(',', ':'))
+        with self._cond:
+            self.last_lsn += 1
+            self._pending.append(_encode(self.last_lsn, payload))
+            return self.last_lsn
+
+    def wait(self, lsn):
+        """Block until record ``lsn`` is on disk
+
+        The first waiter becomes the flush leader and syncs every buffered
+        record at once; waiters arriving during its flush are covered by
+        it or by the next leader.
+        """
+        with self._cond:
+            while self.durable_lsn < lsn:
+                if self._error is not None:
+                    raise JournalError(f'Journal write failed: {self._error}')
+                if not self._flushing:
+                    self._flushing = True
+                    break
+                self._cond.wait()
+            else:
+                return
+        if self.commit_delay:
+            time.sleep(self.commit_delay)
+        self._flush()
+
+    def rotate(self):
+        """Flush buffered records and start a new file with the next one"""
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            self._flushing = True
+        self._flush(close=True)
+
+    def close(self):
+        self.rotate()
+
+    def _flush(self, close=False):
+        """Write and sync the buffered records; the caller holds the flush claim"""
+        with self._cond:
+            batch, self._pending = self._pending, []
+            target = self.last_lsn
+        try:
+            if batch:
+                if self._file is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    name = f'{LOG_PREFIX}{self.durable_lsn + 1:016d}{LOG_SUFFIX}'
+                    self._file = open(os.path.join(self.directory, name), 'ab')
+                self._file.write(''.join(batch).encode('utf-8'))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            if close and self._file is not None:
+                self._file.close()
+                self._file = None
+        except OSError as e:
+            with self._cond:
+                self._error = e
+            raise JournalError(f'Journal write failed: {e}')
+        finally:
+            with self._cond:
+                self._flushing = False
+                if self._error is None:
+                    self.durable_lsn = target
+                self._cond.notify_all()
+
+    def replay(self, after_lsn=0):
+        """Yield ``(lsn, record)`` for every logged record after ``after_lsn``"""
+        files = _numbered(self.directory, LOG_PREFIX, LOG_SUFFIX)
+        for i, (start, path) in enumerate(files):
+            if i + 1 < len(files) and files[i + 1][0] - 1 <= after_lsn:
+                continue
+            with open(path, 'rb') as f:
+                for line in f:
+                    decoded = _decode(line)
+                    if decoded is None:
+                        return
+                    if decoded[0] > after_lsn:
+                        yield decoded
+
+    def discard_through(self, lsn):
+        """Delete the closed log files holding only records up to ``lsn``"""
+        files = _numbered(self.directory, LOG_PREFIX, LOG_SUFFIX)
+        open_path = self._file.name if self._file is not None else None
+        for i, (_, path) in enumerate(files):
+            if i + 1 < len(files):
+                end = files[i + 1][0] - 1
+            elif path != open_path:
+                # A closed last file ends at or before the durable position
+                end = self.durable_lsn
+            else:
+                continue
+            if end <= lsn:
+                os.remove(path)
+
+
+class Journal:
+    """Makes a ProductStore and its SaleEngine durable with a log and snapshots
+
+    Call ``recover`` once at startup; it restores the saved state and
+    attaches the journal to the store, after which the store and the sale
+    engine journal their own mutations.
+    """
+
+    def __init__(self, directory, store, sale_engine, snapshot_interval=100000, commit_delay=0.0):
+        self.directory = directory
+        self.store = store
+        self.sale_engine = sale_engine
+        self.snapshot_interval = snapshot_interval
+        self.wal = WriteAheadLog(directory, commit_delay)
+        self.snapshot_lsn = 0
+        self.numbers = NumberBlocks()
+        self._since_snapshot = 0
+        self._checkpoint_lock = threading.Lock()
+
+    def append(self, record):
+        """Log a mutation and return its sequence number"""
+        lsn = self.wal.append(record)
+        self._since_snapshot += 1
+        if (self.snapshot_interval and self._since_snapshot >= self.snapshot_interval
+                and not self._checkpoint_lock.locked()):
+            threading.Thread(target=self._background_checkpoint, name='journal-checkpoint',
+                             daemon=True).start()
+        return lsn
+
+    def wait(self, lsn):
+        """Block until a logged mutation is durable"""
+        self.wal.wait(lsn)
+
+    def transaction(self):
+        """Mutations need no scope beyond their product locks in one process"""
+        return nullcontext()
+
+    def lease(self, day, size):
+        """Reserve ``size`` sale numbers of ``day``; returns the first once the lease is durable"""
+        start = self.numbers.lease(day, size)
+        self.wait(self.append({'op': 'numbers', 'day': day, 'next': start + size}))
+        return start
+
+    def recover(self):
+        """Load the newest snapshot and replay the log records after it
+
+        Returns a summary with the snapshot's sequence number and the number
+        of records replayed.
+        """
+        sales = {}
+        snapshots = _numbered(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX)
+        if snapshots:
+            self.snapshot_lsn, path = snapshots[-1]
+            products = []
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if 'product' in entry:
+                        products.append(entry['product'])
+                    elif 'numbers' in entry:
+                        self.numbers = NumberBlocks(entry['numbers'])
+                    else:
+                        sales[entry['sale']['id']] = entry['sale']
+            self.store.load(products)
+
+        replayed = 0
+        for _, record in self.wal.replay(self.snapshot_lsn):
+            self._apply(record, sales)
+            replayed += 1
+        self.wal.resume_after(self.snapshot_lsn)
+        self._restore_sales(sales)
+
+        self._since_snapshot = replayed
+        self.store.journal = self
+        return {'snapshot_lsn': self.snapshot_lsn, 'replayed': replayed}
+
+    def _apply(self, record, sales):
+        if record['op'] == 'numbers':
+            self.numbers.advance(record['day'], record['next'])
+            return
+        sale = apply_record(self.store, record)
+        if sale is not None:
+            sales[sale['id']] = sale
+
+    def _restore_sales(self, sales):
+        """Put recovered sales back in the ledger, skipping those already spilled"""
+        ledger = self.sale_engine.sales
+        if sales:
+            spilled = ledger.spilled_ids(min(sales))
+            for sale_id in sorted(sales):
+                if sale_id not in spilled:
+                    ledger.append(sales[sale_id])
+        self.sale_engine.reserve_ids_through(ledger.last_id)
+
+    def checkpoint(self):
+        """Write a snapshot of the current state and delete the log it covers
+
+        Returns the sequence number the snapshot covers.
+        """
+        with self._checkpoint_lock:
+            return self._checkpoint()
+
+    def _background_checkpoint(self):
+        if self._checkpoint_lock.acquire(blocking=False):
+            try:
+                self._checkpoint()
+            finally:
+                self._checkpoint_lock.release()
+
+    def _checkpoint(self):
+        self._since_snapshot = 0
+        # Every record up to here is already applied in memory; later ones
+        # may or may not be in the snapshot and are replayed either way
+        lsn = self.wal.last_lsn
+        self.wal.rotate()
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{SNAPSHOT_PREFIX}{lsn:016d}{SNAPSHOT_SUFFIX}')
+        with open(path + '.tmp', 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as f:
+                f.write(_line({'numbers': self.numbers.state()}))
+                for product in self.store.all():
+                    f.write(_line({'product': dict(product)}))
+                for sale in self.sale_engine.sales.recent():
+                    f.write(_line({'sale': sale}))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(path + '.tmp', path)
+
+        for old_lsn, old_path in _numbered(self.directory, SNAPSHOT_PREFIX, SNAPSHOT_SUFFIX):
+            if old_lsn < lsn:
+                os.remove(old_path)
+        self.wal.discard_through(lsn)
+        self.snapshot_lsn = lsn
+        return lsn
+
+    def close(self):
+        self.wal.close()
+
+
+def _line(entry):
+    return (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
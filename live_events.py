@@ -0,0 +1,192 @@
+"""
+Live change events for dashboards, delivered as Server-Sent Events
+
+The EventHub turns store changes, sales and stock alerts into compact
+events and fans them out to subscribers. Each subscriber has a bounded
+queue keyed by what an event is about, so a client that falls behind gets
+a summary rather than a backlog:
+
+- stock events for the same product merge into one, with the deltas
+  summed and the latest stock level
+- alert events for the same product merge into one, from the first level
+  to the latest
+- sale events are kept individually
+
+When a queue still outgrows its bound, it is replaced by a single
+``resync`` event telling the client to reload. Publishing never blocks,
+so a slow client cannot hold up the request that changed the stock.
+
+An idle stream costs one waiting thread and a heartbeat comment every
+``heartbeat`` seconds, which also lets proxies and the server notice
+closed connections. Because a threaded server has a fixed number of
+threads, the hub admits at most ``max_subscribers`` streams, and
+``subscribe`` returns None beyond that.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+# Pending events per subscriber before it is asked to resync
+QUEUE_SIZE = 256
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT = 15.0
+
+
+class Subscription:
+    """One client's bounded, coalescing event queue"""
+
+    def __init__(self, maxsize=QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._pending = OrderedDict()
+        self._resync = False
+        self._cond = threading.Condition()
+
+    def offer(self, kind, key, data):
+        """Queue an event, merging it with a pending one about the same thing"""
+        with self._cond:
+            if self._resync:
+                return
+            slot = (kind, key)
+            pending = self._pending.get(slot)
+            if pending is not None:
+                _merge(kind, pending, data)
+            elif len(self._pending) >= self.maxsize:
+                self._pending.clear()
+                self._resync = True
+            else:
+                self._pending[slot] = dict(data)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for events; returns ``[(kind, data), ...]``, empty on timeout"""
+        with self._cond:
+            if not self._pending and not self._resync:
+                self._cond.wait(timeout)
+            if self._resync:
+                self._resync = False
+                return [('resync', {})]
+            events = [(kind, data) for (kind, _), data in self._pending.items()]
+            self._pending.clear()
+            return events
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending) + self._resync
+
+
+def _merge(kind, pending, data):
+    if kind == 'stock':
+        delta = pending['delta'] + data['delta']
+        pending.update(data)
+        pending['delta'] = delta
+    elif kind == 'alert':
+        pending.update(data, **{'from': pending['from']})
+    else:
+        pending.update(data)
+
+
+class EventHub:
+    """Fans out change events to every subscriber"""
+
+    def __init__(self, queue_size=QUEUE_SIZE, max_subscribers=None):
+        self.queue_size = queue_size
+        # None: no limit
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        # Last stock seen per product, to publish deltas
+        self._stock = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """A new subscription, or None when the hub is full"""
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def publish(self, kind, key, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(kind, key, data)
+
+    def attach(self, store, sale_engine=None, alert_engine=None):
+        """Publish the changes of a store, and the sales and alerts of its engines"""
+        with self._lock:
+            self._stock = {product['id']: product['stock'] for product in store.all()}
+        store.listeners.append(self.product_changed)
+        if sale_engine is not None:
+            sale_engine.listeners.append(self.sale_recorded)
+        if alert_engine is not None:
+            alert_engine.listeners.append(self.alert_raised)
+
+    def product_changed(self, product):
+        """Store listener: publish a stock delta"""
+        with self._lock:
+            previous = self._stock.get(product['id'])
+            self._stock[product['id']] = product['stock']
+        if previous is None:
+            previous = 0
+        if product['stock'] != previous:
+            self.publish('stock', product['id'], {
+                'product_id': product['id'],
+                'sku': product['sku'],
+                'stock': product['stock'],
+                'delta': product['stock'] - previous,
+                'status': product['status'],
+            })
+
+    def sale_recorded(self, sale, lines):
+        """Sale listener: publish the sale's headline figures"""
+        self.publish('sale', sale['id'], {
+            'id': sale['id'],
+            'sale_number': sale['sale_number'],
+            'items': sum(item['quantity'] for item in sale['items']),
+            'final_amount': sale['final_amount'],
+            'date': sale['date'],
+        })
+
+    def alert_raised(self, transition):
+        """Alert listener: publish a level transition"""
+        self.publish('alert', transition['product_id'], {
+            key: transition[key] for key in ('product_id', 'sku', 'from', 'to', 'stock')
+        })
+
+
+def format_event(kind, data):
+    """One SSE message"""
+    return f'event: {kind}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def stream(subscription, heartbeat=HEARTBEAT, poll=None, on_poll=None):
+    """Yield SSE messages for a subscription until the client goes away
+
+    With ``poll``, ``on_poll`` is called at least that often (e.g. to pick
+    up changes other worker processes made).
+    """
+    yield 'retry: 3000\n\n'
+    wait = min(heartbeat, poll) if poll else heartbeat
+    idle = 0.0
+    while True:
+        if on_poll is not None:
+            on_poll()
+        events = subscription.get(wait)
+        if events:
+            idle = 0.0
+            yield ''.join(format_event(kind, data) for kind, data in events)
+        else:
+            idle += wait
+            if idle >= heartbeat:
+                idle = 0.0
+                yield ': heartbeat\n\n'
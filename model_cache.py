@@ -0,0 +1,155 @@
+"""
+Read-through cache in front of SQLAlchemy models
+
+Single entities (by primary key or by a unique column such as ``sku`` or
+``name``) and named list queries are served from a TTLCache, with a
+time-to-live per model (``Config.MODEL_CACHE_TTLS``). Entries hold plain
+column values rather than ORM instances, and hits are turned back into
+instances merged into the caller's session without loading, so a hot
+catalog read issues no SQL at all.
+
+Once ``install`` has registered the session events, every committed
+insert, update or delete drops the cached entries of the rows it touched
+and every cached list of that model. Changes that are rolled back leave
+the cache alone.
+
+Only column attributes are cached; relationships load lazily as usual.
+"""
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ttl_cache import TTLCache
+
+_PENDING = 'model_cache_pending'
+
+
+class ModelCache:
+    """Caches model rows and list queries, invalidated on commit"""
+
+    def __init__(self, ttls=None, default_ttl=300, maxsize=4096, cache=None):
+        self.ttls = dict(ttls or {})
+        self.cache = cache if cache is not None else TTLCache(maxsize=maxsize, ttl=default_ttl)
+
+    def install(self, target=Session):
+        """Listen for commits on a Session class, sessionmaker or scoped session"""
+        event.listen(target, 'after_flush', self._collect)
+        event.listen(target, 'after_commit', self._invalidate_pending)
+        event.listen(target, 'after_soft_rollback', self._discard_pending)
+
+    def get(self, session, model, ident):
+        """Instance by primary key, or None"""
+        key = ('id', model.__name__, ident)
+        values = self.cache.get(key)
+        if values is None:
+            instance = session.get(model, ident)
+            if instance is None:
+                return None
+            values = self._put(key, instance)
+        return self._materialize(session, model, values)
+
+    def get_by(self, session, model, **filters):
+        """First instance matching unique column values, e.g. ``sku='X'``, or None"""
+        key = ('by', model.__name__) + tuple(sorted(filters.items()))
+        values = self.cache.get(key)
+        if values is None:
+            instance = session.scalars(select(model).filter_by(**filters).limit(1)).first()
+            if instance is None:
+                return None
+            values = self._put(key, instance)
+        return self._materialize(session, model, values)
+
+    def query(self, session, model, name, statement):
+        """Cached results of a named list query over ``model``
+
+        ``name`` identifies the query (include its parameters); the
+        statement only runs on a miss.
+        """
+        key = ('list', model.__name__, name)
+        rows = self.cache.get(key)
+        if rows is None:
+            instances = session.scalars(statement).all()
+            rows = [_column_values(instance) for instance in instances]
+            tags = [_model_tag(model), _list_tag(model)]
+            tags += [_row_tag(model, _identity(instance)) for instance in instances]
+            self.cache.put(key, rows, tags=tags, ttl=self.ttls.get(model.__name__))
+        return [self._materialize(session, model, values) for values in rows]
+
+    def invalidate(self, model, ident=None):
+        """Drop a cached row, or every cached entry of a model"""
+        if ident is None:
+            self.cache.invalidate_tag(_model_tag(model))
+        else:
+            self.cache.invalidate_tag(_row_tag(model, ident))
+            # Any list may gain, lose or reorder rows
+            self.cache.invalidate_tag(_list_tag(model))
+
+    def stats(self):
+        return self.cache.stats()
+
+    def _put(self, key, instance):
+        model = type(instance)
+        values = _column_values(instance)
+        self.cache.put(key, values, tags=[_row_tag(model, _identity(instance)), _model_tag(model)],
+                       ttl=self.ttls.get(model.__name__))
+        return values
+
+    @staticmethod
+    def _materialize(session, model, values):
+        """An instance for cached values, merged into the session without SQL
+
+        An instance the session already holds is returned as is, so its
+        unflushed changes are never overwritten by cached values.
+        """
+        mapper = inspect(model)
+        instance = mapper.class_manager.new_instance()
+        for name, value in values.items():
+            set_committed_value(instance, name, value)
+        existing = session.identity_map.get(mapper.identity_key_from_instance(instance))
+        if existing is not None:
+            return existing
+        make_transient_to_detached(instance)
+        return session.merge(instance, load=False)
+
+    # Session events: remember what each flush touched, act on commit
+
+    def _collect(self, session, flush_context):
+        pending = session.info.setdefault(_PENDING, set())
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+            pending.add((type(instance), _identity(instance)))
+
+    def _invalidate_pending(self, session):
+        for model, ident in session.info.pop(_PENDING, ()):
+            self.invalidate(model, ident)
+
+    def _discard_pending(self, session, previous_transaction):
+        if previous_transaction.parent is None:
+            session.info.pop(_PENDING, None)
+
+
+def _column_values(instance):
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+
+
+def _identity(instance):
+    """Primary key of an instance (a tuple for composite keys)"""
+    state = inspect(instance)
+    if state.key is not None:
+        key = state.key[1]
+    else:
+        # Just inserted: the key is assigned but not registered yet
+        key = tuple(state.mapper.primary_key_from_instance(instance))
+    return key[0] if len(key) == 1 else key
+
+
+def _row_tag(model, ident):
+    return ('row', model.__name__, ident)
+
+
+def _list_tag(model):
+    return ('list', model.__name__)
+
+
+def _model_tag(model):
+    return ('model', model.__name__)
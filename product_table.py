@@ -0,0 +1,314 @@
+"""
+Columnar product table for very large catalogs
+
+A catalog of plain product dicts costs several hundred bytes per SKU: the
+dict itself, boxed ints and floats, a status string reference and the key
+slots. ProductTable keeps the same data in parallel NumPy columns instead:
+ids, stock, price, cost and reorder level as fixed-width numbers, the
+stock status as a one-byte code, categories as indexes into an interned list and names
+packed as UTF-8 into one growable buffer. Only SKUs stay Python strings,
+since they key the lookup dict.
+
+``row(i)`` and ``get(id)`` return lightweight ProductRow views that read
+and write the columns in place and serialize to the same JSON shape as the
+dict products (see ``PRODUCT_FIELDS``).
+
+Products are append-only and ids must increase with insertion order (the
+store assigns them that way), so an id lookup is a binary search over the
+id column rather than another dict.
+"""
+
+from collections.abc import Mapping
+from itertools import islice
+
+import numpy as np
+
+from inventory_store import (DEFAULT_REORDER_LEVEL, DuplicateSKUError, PRODUCT_FIELDS,
+                             STATUS_LOW, STATUS_NORMAL, STATUS_OUT, stock_status)
+
+# Status label per status code
+STATUS_LABELS = (STATUS_NORMAL, STATUS_LOW, STATUS_OUT)
+STATUS_CODES = {label: code for code, label in enumerate(STATUS_LABELS)}
+
+_NUMERIC_COLUMNS = ('stock', 'price', 'cost')
+
+# Products buffered per column write by ``extend``
+EXTEND_CHUNK = 4096
+
+
+def status_codes(stock, reorder_levels):
+    """``stock_status`` codes of many products, so the table follows the store's rule"""
+    stock, reorder_levels = np.asarray(stock).tolist(), np.asarray(reorder_levels).tolist()
+    return np.fromiter((STATUS_CODES[stock_status(units, level)] for units, level in zip(stock, reorder_levels)),
+                       dtype=np.int8, count=len(stock))
+
+
+def _grow(column, capacity):
+    grown = np.zeros(capacity, dtype=column.dtype)
+    grown[:len(column)] = column
+    return grown
+
+
+class PackedStrings:
+    """Strings stored back to back as UTF-8 with offset and length columns
+
+    Replacing a value appends the new bytes; the old ones are only
+    reclaimed by ``compact``.
+    """
+
+    def __init__(self, capacity=1024):
+        self._data = bytearray()
+        self._offsets = np.zeros(capacity, dtype=np.int64)
+        self._lengths = np.zeros(capacity, dtype=np.int32)
+
+    def reserve(self, capacity):
+        if capacity > len(self._offsets):
+            self._offsets = _grow(self._offsets, capacity)
+            self._lengths = _grow(self._lengths, capacity)
+
+    def __getitem__(self, row):
+        offset = self._offsets[row]
+        return self._data[offset:offset + self._lengths[row]].decode('utf-8')
+
+    def __setitem__(self, row, value):
+        encoded = value.encode('utf-8')
+        self._offsets[row] = len(self._data)
+        self._lengths[row] = len(encoded)
+        self._data += encoded
+
+    def extend(self, start, values):
+        """Set consecutive rows from ``start`` in one buffer append"""
+        encoded = [value.encode('utf-8') for value in values]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        end = start + len(encoded)
+        self._lengths[start:end] = lengths
+        self._offsets[start:end] = len(self._data) + np.cumsum(lengths) - lengths
+        self._data += b''.join(encoded)
+
+    def compact(self, size):
+        """Rewrite the buffer keeping only the live values of the first ``size`` rows"""
+        data = bytearray()
+        for row in range(size):
+            offset = self._offsets[row]
+            self._offsets[row] = len(data)
+            data += self._data[offset:offset + self._lengths[row]]
+        self._data = data
+
+    def nbytes(self):
+        return len(self._data) + self._offsets.nbytes + self._lengths.nbytes
+
+
+class ProductRow(Mapping):
+    """A view of one table row that reads and writes the columns in place"""
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field):
+        return self._table.value(self._row, field)
+
+    def __setitem__(self, field, value):
+        self._table.set_value(self._row, field, value)
+
+    def __iter__(self):
+        return iter(PRODUCT_FIELDS)
+
+    def __len__(self):
+        return len(PRODUCT_FIELDS)
+
+    def as_dict(self):
+        """The row as a plain product dict, ready for ``jsonify``"""
+        return {field: self._table.value(self._row, field) for field in PRODUCT_FIELDS}
+
+    def __repr__(self):
+        return f'ProductRow({self.as_dict()!r})'
+
+
+class ProductTable:
+    """Append-only columnar store of products"""
+
+    def __init__(self, products=(), capacity=1024):
+        self._size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.stock = np.zeros(capacity, dtype=np.int32)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.cost = np.zeros(capacity, dtype=np.float64)
+        # Products without their own reorder level get the default one
+        self.reorder_level = np.zeros(capacity, dtype=np.int32)
+        self.status = np.zeros(capacity, dtype=np.int8)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.categories = []
+        self._category_codes = {}
+        self._names = PackedStrings(capacity)
+        self._skus = []
+        self._row_by_sku = {}
+        self.extend(products)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return (ProductRow(self, row) for row in range(self._size))
+
+    def append(self, product):
+        """Add a product dict and return its row view
+
+        An id is assigned when the product has none; explicit ids must be
+        higher than every id already in the table.
+        """
+        self.extend([product])
+        return ProductRow(self, self._size - 1)
+
+    def extend(self, products):
+        """Append many products, writing the numeric columns a chunk at a time"""
+        products = iter(products)
+        while True:
+            chunk = list(islice(products, EXTEND_CHUNK))
+            if not chunk:
+                return
+            start = self._size
+            last_id = int(self.ids[start - 1]) if start else 0
+            ids = []
+            for product in chunk:
+                product_id = product.get('id')
+                if product_id is None:
+                    product_id = last_id + 1
+                elif product_id <= last_id:
+                    raise ValueError(f'Product id {product_id} is not above {last_id}')
+                ids.append(product_id)
+                last_id = product_id
+            skus = [product.get('sku') for product in chunk]
+            if len(set(skus)) < len(skus) or any(sku in self._row_by_sku for sku in skus):
+                duplicate = next(sku for i, sku in enumerate(skus)
+                                 if sku in self._row_by_sku or sku in skus[:i])
+                raise DuplicateSKUError(f'SKU {duplicate} already exists')
+
+            end = start + len(chunk)
+            if end > len(self.ids):
+                self._reserve(max(1024, 2 * len(self.ids), end))
+            self.ids[start:end] = ids
+            self.stock[start:end] = [product['stock'] for product in chunk]
+            self.reorder_level[start:end] = [product.get('reorder_level', DEFAULT_REORDER_LEVEL)
+                                             for product in chunk]
+            self.status[start:end] = status_codes(self.stock[start:end], self.reorder_level[start:end])
+            self.price[start:end] = [product['price'] for product in chunk]
+            self.cost[start:end] = [product['cost'] for product in chunk]
+            self.category[start:end] = [self._intern(product['category']) for product in chunk]
+            self._names.extend(start, [product['name'] for product in chunk])
+            self._row_by_sku.update(zip(skus, range(start, end)))
+            self._skus.extend(skus)
+            self._size = end
+
+    def _reserve(self, capacity):
+        for name in ('ids', 'stock', 'price', 'cost', 'reorder_level', 'status', 'category'):
+            setattr(self, name, _grow(getattr(self, name), capacity))
+        self._names.reserve(capacity)
+
+    def _intern(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def row(self, row):
+        """View of the row at a position"""
+        if not 0 <= row < self._size:
+            raise IndexError(row)
+        return ProductRow(self, row)
+
+    def row_of(self, product_id):
+        """Position of a product id, or None"""
+        row = int(np.searchsorted(self.ids[:self._size], product_id))
+        if row < self._size and self.ids[row] == product_id:
+            return row
+        return None
+
+    def get(self, product_id):
+        """View of the product with the given id, or None"""
+        row = self.row_of(product_id)
+        return None if row is None else ProductRow(self, row)
+
+    def get_by_sku(self, sku):
+        """View of the product with the given SKU, or None"""
+        row = self._row_by_sku.get(sku)
+        return None if row is None else ProductRow(self, row)
+
+    def value(self, row, field):
+        """One field of a row as a plain Python value"""
+        if field == 'id':
+            return int(self.ids[row])
+        if field == 'name':
+            return self._names[row]
+        if field == 'sku':
+            return self._skus[row]
+        if field == 'category':
+            return self.categories[self.category[row]]
+        if field in ('stock', 'reorder_level'):
+            return int(getattr(self, field)[row])
+        if field in ('price', 'cost'):
+            return float(getattr(self, field)[row])
+        if field == 'status':
+            return STATUS_LABELS[self.status[row]]
+        raise KeyError(field)
+
+    def set_value(self, row, field, value):
+        """Overwrite one field of a row; the status follows the stock and reorder level"""
+        if field in ('stock', 'reorder_level'):
+            getattr(self, field)[row] = value
+            self.status[row] = STATUS_CODES[stock_status(int(self.stock[row]), int(self.reorder_level[row]))]
+        elif field in _NUMERIC_COLUMNS:
+            getattr(self, field)[row] = value
+        elif field == 'name':
+            self._names[row] = value
+        elif field == 'category':
+            self.category[row] = self._intern(value)
+        else:
+            raise KeyError(f'{field} cannot be changed')
+
+    def adjust_stock(self, rows, adjustments):
+        """Apply many stock adjustments at once, clamping at zero"""
+        rows = np.asarray(rows, dtype=np.int64)
+        stock = np.maximum(0, self.stock[rows].astype(np.int64) + np.asarray(adjustments))
+        self.stock[rows] = stock
+        self.status[rows] = status_codes(stock, self.reorder_level[rows])
+
+    def totals(self):
+        """Dashboard totals computed over the columns"""
+        size = self._size
+        stock = self.stock[:size].astype(np.float64)
+        counts = np.bincount(self.status[:size], minlength=len(STATUS_LABELS))
+        return {
+            'total_products': size,
+            'total_units': int(self.stock[:size].sum(dtype=np.int64)),
+            'inventory_value': float(stock @ self.cost[:size]),
+            'retail_value': float(stock @ self.price[:size]),
+            'low_stock_count': int(counts[STATUS_CODES[STATUS_LOW]]),
+            'out_of_stock_count': int(counts[STATUS_CODES[STATUS_OUT]]),
+        }
+
+    def with_status(self, status):
+        """Views of the products currently in a stock status"""
+        rows = np.flatnonzero(self.status[:self._size] == STATUS_CODES[status])
+        return [ProductRow(self, int(row)) for row in rows]
+
+    def in_category(self, category):
+        """Views of the products of a category"""
+        code = self._category_codes.get(category)
+        if code is None:
+            return []
+        rows = np.flatnonzero(self.category[:self._size] == code)
+        return [ProductRow(self, int(row)) for row in rows]
+
+    def compact(self):
+        """Reclaim name bytes left behind by renamed products"""
+        self._names.compact(self._size)
+
+    def nbytes(self):
+        """Bytes held by the columns and packed names (SKU strings excluded)"""
+        columns = sum(getattr(self, name).nbytes
+                      for name in ('ids', 'stock', 'price', 'cost', 'reorder_level', 'status', 'category'))
+        return columns + self._names.nbytes()
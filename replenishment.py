@@ -0,0 +1,134 @@
+"""
+Batch replenishment planning: EOQ, safety stock and reorder points
+
+Plans the whole catalog in one vectorized NumPy pass over column arrays
+(one element per SKU) instead of one Python call per product:
+
+- EOQ = sqrt(2 * D * S / H), with D the annual demand, S the cost of
+  placing an order and H the yearly holding cost of a unit (its cost times
+  the holding rate)
+- safety stock = z * daily demand deviation * sqrt(lead time), or
+  ``Config.DEFAULT_SAFETY_STOCK`` where the deviation is unknown
+- reorder point = daily demand * lead time + safety stock
+
+Missing lead times fall back to ``Config.DEFAULT_LEAD_TIME_DAYS``. Missing
+values are NaN in the columns, which is what NULLs become when the
+columns are read with ``load_columns``, so a database-backed catalog needs
+one query for the whole run.
+
+The report lists the products at or below their reorder point, most
+urgent first (fewest days of demand covered by stock on hand).
+"""
+
+import math
+
+import numpy as np
+
+DAYS_PER_YEAR = 365
+
+# Columns a plan reads; the last two are optional
+COLUMNS = ('sku', 'stock', 'cost', 'daily_demand', 'demand_std', 'lead_time_days')
+
+
+def columns_from_rows(rows, names=COLUMNS):
+    """Column arrays from result rows holding ``names`` in order; None becomes NaN"""
+    rows = list(rows)
+    columns = {}
+    for i, name in enumerate(names):
+        values = [row[i] for row in rows]
+        if name == 'sku':
+            columns[name] = np.array(values, dtype=object)
+        else:
+            columns[name] = np.array([np.nan if value is None else value for value in values], dtype=float)
+    return columns
+
+
+def load_columns(session, statement, names=COLUMNS):
+    """Run one query selecting ``names`` in order and return its columns"""
+    return columns_from_rows(session.execute(statement), names)
+
+
+class ReplenishmentEngine:
+    """EOQ, safety stock and reorder points for a catalog at once"""
+
+    def __init__(self, ordering_cost=100.0, holding_rate=0.25, service_z=1.65,
+                 lead_time_days=7, safety_stock=5):
+        self.ordering_cost = ordering_cost
+        self.holding_rate = holding_rate
+        # Standard normal quantile of the cycle service level (1.65 ~ 95%)
+        self.service_z = service_z
+        self.lead_time_days = lead_time_days
+        self.safety_stock = safety_stock
+
+    def plan(self, columns):
+        """Add ``eoq``, ``safety_stock``, ``reorder_point``, ``order_quantity``,
+        ``days_of_cover`` and a boolean ``reorder`` array to a copy of the columns
+        """
+        stock = np.asarray(columns['stock'], dtype=float)
+        cost = np.asarray(columns['cost'], dtype=float)
+        demand = np.nan_to_num(np.asarray(columns['daily_demand'], dtype=float))
+        n = len(stock)
+        std = np.asarray(columns.get('demand_std', np.full(n, np.nan)), dtype=float)
+        lead_time = np.asarray(columns.get('lead_time_days', np.full(n, np.nan)), dtype=float)
+        lead_time = np.where(np.isnan(lead_time), self.lead_time_days, lead_time)
+
+        holding = cost * self.holding_rate
+        annual = demand * DAYS_PER_YEAR
+        # Products without a holding cost get no EOQ; they reorder the shortfall
+        eoq = np.sqrt(np.divide(2 * annual * self.ordering_cost, holding,
+                                out=np.zeros(n), where=holding > 0))
+        safety = np.where(np.isnan(std), self.safety_stock,
+                          self.service_z * np.nan_to_num(std) * np.sqrt(lead_time))
+        reorder_point = demand * lead_time + safety
+        days_of_cover = np.divide(stock, demand, out=np.full(n, np.inf), where=demand > 0)
+
+        plan = dict(columns)
+        plan.update(
+            sku=np.asarray(columns['sku'], dtype=object),
+            stock=stock,
+            daily_demand=demand,
+            lead_time_days=lead_time,
+            eoq=eoq,
+            safety_stock=safety,
+            reorder_point=reorder_point,
+            order_quantity=np.ceil(np.maximum(eoq, reorder_point - stock)),
+            days_of_cover=days_of_cover,
+            reorder=stock <= reorder_point,
+        )
+        return plan
+
+    def report(self, columns, include_all=False, limit=None):
+        """Rows of products to reorder (or every product), most urgent first"""
+        plan = self.plan(columns)
+        rows = np.arange(len(plan['stock'])) if include_all else np.flatnonzero(plan['reorder'])
+        # Fewest days of cover first; ties (e.g. no demand) by lowest stock
+        order = rows[np.lexsort((plan['stock'][rows], plan['days_of_cover'][rows]))]
+        if limit is not None:
+            order = order[:limit]
+        cover = plan['days_of_cover'][order]
+        columns = zip(
+            plan['sku'][order].tolist(),
+            plan['stock'][order].astype(int).tolist(),
+            np.round(plan['daily_demand'][order], 2).tolist(),
+            np.where(np.isinf(cover), np.nan, np.round(cover, 1)).tolist(),
+            np.ceil(plan['safety_stock'][order]).astype(int).tolist(),
+            np.ceil(plan['reorder_point'][order]).astype(int).tolist(),
+            np.ceil(plan['eoq'][order]).astype(int).tolist(),
+            plan['order_quantity'][order].astype(int).tolist(),
+            plan['reorder'][order].tolist(),
+        )
+        return [
+            {
+                'sku': sku,
+                'stock': stock,
+                'daily_demand': demand,
+                # No demand: stock lasts indefinitely
+                'days_of_cover': None if math.isnan(days) else days,
+                'safety_stock': safety,
+                'reorder_point': point,
+                'eoq': eoq,
+                'order_quantity': quantity,
+                'reorder': reorder,
+            }
+            for sku, stock, demand, days, safety, point, eoq, quantity, reorder in columns
+        ]
@@ -0,0 +1,83 @@
+"""
+Pre-serialized response cache keyed by store version
+
+Catalog reads far outnumber writes, so the JSON bytes of each distinct
+listing are kept together with a gzip-compressed copy. Entries are tagged
+with the store version they were built from; any write bumps the version,
+which makes every older entry unreachable.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class CachedResponse:
+    """Serialized response body with its precompressed form"""
+
+    __slots__ = ('body', 'gzipped')
+
+    def __init__(self, body, compresslevel=6):
+        self.body = body
+        gzipped = gzip.compress(body, compresslevel=compresslevel, mtime=0)
+        # Tiny bodies can grow when compressed; only keep a useful copy
+        self.gzipped = gzipped if len(gzipped) < len(body) else None
+
+
+def make_etag(epoch, version, key, encoding=None):
+    """Strong (unquoted) ETag for a cache key at a store version
+
+    The tag is derived from the version alone, so a conditional request can
+    be answered without looking at (or rebuilding) the cached body.
+    """
+    digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).hexdigest()
+    tag = f'{epoch}.{version}.{digest}'
+    if encoding:
+        tag += f'-{encoding}'
+    return tag
+
+
+class VersionedResponseCache:
+    """Bounded LRU of serialized responses for the current store version"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        """Return the cached response for key at version, or None"""
+        with self._lock:
+            if version != self._version:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body):
+        """Cache a serialized body for key at version and return the entry"""
+        entry = CachedResponse(body)
+        with self._lock:
+            if self._version is None or version > self._version:
+                # A newer version invalidates everything built before it
+                self._entries.clear()
+                self._version = version
+            elif version < self._version:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
@@ -0,0 +1,180 @@
+"""
+Cluster-unique, time-ordered sale ids and daily sale numbers
+
+Sale ids are laid out like Snowflake ids: seconds since ``EPOCH``, a worker
+id and a per-second sequence. Each worker generates its ids alone, so they
+are unique across workers and nodes as long as worker ids are, and they
+sort by the second they were issued in. The ids fit in 53 bits, so they
+survive a round trip through JavaScript numbers.
+
+A worker id combines the node (``Config.NODE_ID``) with the worker's slot
+on that node: slot 0 for a single worker, or a slot leased from the shared
+database when several workers share state.
+
+The human-readable ``#YYYYMMDDnnn`` sale number counts the day's sales.
+Workers lease numbers in blocks from a block source (the journal, the
+shared database, or a process-local counter) and hand them out locally, so
+numbering costs one shared write per block rather than one per sale.
+Numbers increase within a worker but interleave between workers, and a
+block a worker does not use up leaves a gap.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+EPOCH_SECONDS = int(EPOCH.timestamp())
+
+TIME_BITS = 31
+NODE_BITS = 3
+SLOT_BITS = 7
+WORKER_BITS = NODE_BITS + SLOT_BITS
+SEQUENCE_BITS = 12
+
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SLOTS = 1 << SLOT_BITS
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Sale numbers a worker leases at a time
+NUMBER_BLOCK_SIZE = 100
+# Days a number block source keeps counters for
+NUMBER_DAYS_KEPT = 7
+
+
+def worker_id(node_id, slot):
+    """Worker id of a slot on a node"""
+    if not 0 <= node_id <= MAX_NODE_ID:
+        raise ValueError(f'Node id must be between 0 and {MAX_NODE_ID}')
+    if not 0 <= slot < MAX_SLOTS:
+        raise ValueError(f'Worker slot must be between 0 and {MAX_SLOTS - 1}')
+    return node_id << SLOT_BITS | slot
+
+
+def split_id(sale_id):
+    """``(seconds since EPOCH, worker id, sequence)`` of a sale id"""
+    return (sale_id >> (WORKER_BITS + SEQUENCE_BITS),
+            sale_id >> SEQUENCE_BITS & MAX_WORKER_ID,
+            sale_id & MAX_SEQUENCE)
+
+
+def issued_at(sale_id):
+    """UTC datetime of the second a sale id was issued in"""
+    return datetime.fromtimestamp(EPOCH_SECONDS + split_id(sale_id)[0], timezone.utc)
+
+
+def format_sale_number(day, number):
+    """``#YYYYMMDDnnn`` for the ``number``-th sale of ``day`` ('YYYYMMDD')"""
+    return f'#{day}{number:03d}'
+
+
+class NumberBlocks:
+    """Per-day sale number counters handing out blocks
+
+    The block source of a single process, and the bookkeeping the journal
+    persists for it.
+    """
+
+    def __init__(self, counters=None):
+        # Next unleased number per day
+        self.counters = dict(counters or {})
+        self._lock = threading.Lock()
+
+    def lease(self, day, size):
+        """Reserve ``size`` numbers of ``day`` and return the first"""
+        with self._lock:
+            start = self.counters.get(day, 1)
+            self._set(day, start + size)
+            return start
+
+    def advance(self, day, next_number):
+        """Never hand out numbers of ``day`` below ``next_number`` again"""
+        with self._lock:
+            if next_number > self.counters.get(day, 1):
+                self._set(day, next_number)
+
+    def state(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def _set(self, day, next_number):
+        self.counters[day] = next_number
+        if len(self.counters) > NUMBER_DAYS_KEPT:
+            for old in sorted(self.counters)[:-NUMBER_DAYS_KEPT]:
+                del self.counters[old]
+
+
+class SaleIdAllocator:
+    """Issues one worker's sale ids and sale numbers without coordination"""
+
+    def __init__(self, worker_id=0, block_size=NUMBER_BLOCK_SIZE, clock=time.time):
+        self.worker_id = worker_id
+        self.block_size = block_size
+        self.clock = clock
+        self.local_blocks = NumberBlocks()
+        self._id_lock = threading.Lock()
+        self._tick = 0
+        self._sequence = 0
+        self._number_lock = threading.Lock()
+        self._day = None
+        self._number = 0
+        self._block_end = 0
+
+    @property
+    def worker_id(self):
+        return self._worker_id
+
+    @worker_id.setter
+    def worker_id(self, value):
+        if not 0 <= value <= MAX_WORKER_ID:
+            raise ValueError(f'Worker id must be between 0 and {MAX_WORKER_ID}')
+        self._worker_id = value
+
+    def next_id(self):
+        """A new sale id, greater than every id this allocator issued before"""
+        tick = int(self.clock()) - EPOCH_SECONDS
+        with self._id_lock:
+            if tick > self._tick:
+                self._tick = tick
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                # Same second, or the clock stepped back: keep counting
+                self._sequence += 1
+            else:
+                # Sequence exhausted: borrow the next second rather than wait
+                self._tick += 1
+                self._sequence = 0
+            return (self._tick << (WORKER_BITS + SEQUENCE_BITS)
+                    | self._worker_id << SEQUENCE_BITS | self._sequence)
+
+    def reserve_ids_through(self, sale_id):
+        """Issue later ids from no earlier second than ``sale_id``, e.g. after recovery"""
+        tick, _, sequence = split_id(sale_id)
+        with self._id_lock:
+            if (tick, sequence) > (self._tick, self._sequence):
+                self._tick = tick
+                self._sequence = sequence
+
+    def next_number(self, day, blocks=None):
+        """Next sale number of ``day``, leasing a block from ``blocks`` when needed
+
+        ``blocks`` is any object with ``lease(day, size)``; the allocator's
+        own process-local counters are used when it is None.
+        """
+        with self._number_lock:
+            if day != self._day or self._number >= self._block_end:
+                source = blocks if blocks is not None else self.local_blocks
+                start = source.lease(day, self.block_size)
+                self._day = day
+                self._number = start
+                self._block_end = start + self.block_size
+            number = self._number
+            self._number += 1
+            return number
+
+    def discard_numbers(self):
+        """Drop the current block, e.g. when the transaction that leased it rolled back"""
+        with self._number_lock:
+            self._day = None
+            self._number = self._block_end = 0
@@ -0,0 +1,154 @@
+"""
+Transactional sale processing for the SIMS deployment app
+
+A sale is applied all-or-nothing: every line is validated while holding the
+locks of the products involved, and stock is only decremented once all lines
+are known to be satisfiable. Locks are always taken in ascending product id
+order, so concurrent sales cannot deadlock and sales touching disjoint SKUs
+run in parallel.
+
+Sales are recorded in a SalesLedger with compact, normalized lines rather
+than the raw request payload. When the store has a journal, each sale is
+logged as one record with the resulting stock levels before it is
+acknowledged. Sale ids and numbers come from a SaleIdAllocator (see
+sale_ids.py), which needs no lock shared between workers. Committed sales
+are passed to registered listeners, e.g. the demand forecaster, together
+with the resolved ``(product, quantity)`` lines. A listener that raises is
+logged and skipped, since the sale has already been committed.
+"""
+
+import logging
+from contextlib import ExitStack
+from datetime import datetime
+
+from sale_ids import SaleIdAllocator, format_sale_number
+from sales_ledger import SalesLedger
+
+logger = logging.getLogger(__name__)
+
+VAT_RATE = 0.2  # 20% VAT
+
+
+class SaleError(Exception):
+    """Base class for sales that cannot be processed"""
+    status_code = 400
+
+
+class InvalidSaleItem(SaleError):
+    """Raised when a sale line is malformed"""
+
+
+class ProductNotFound(SaleError):
+    """Raised when a sale line references an unknown product"""
+    status_code = 404
+
+
+class InsufficientStock(SaleError):
+    """Raised when a product does not have enough stock for a sale"""
+
+
+class SaleEngine:
+    """Validates, reserves and commits sales against a ProductStore"""
+
+    def __init__(self, store, ledger=None, ids=None):
+        self.store = store
+        self.sales = ledger if ledger is not None else SalesLedger()
+        self.listeners = []
+        self.ids = ids if ids is not None else SaleIdAllocator()
+        self.ids.reserve_ids_through(self.sales.last_id)
+
+    def process(self, items, customer_name='Walk-in Customer'):
+        """Apply a sale atomically and return the recorded sale dict
+
+        Raises a SaleError subclass, leaving stock untouched, if any line
+        is invalid or cannot be fulfilled.
+        """
+        quantities = self._merge_lines(items)
+        lsn = 0
+        with self.store.transaction():
+            products = {}
+            for product_id in quantities:
+                product = self.store.get(product_id)
+                if product is None:
+                    raise ProductNotFound(f'Product {product_id} not found')
+                products[product_id] = product
+
+            total_amount = 0
+            sale_lines = []
+            stock = []
+            with ExitStack() as locks:
+                for product_id in sorted(products):
+                    locks.enter_context(self.store.lock_for(product_id))
+
+                # Reserve: every line must be satisfiable before anything changes
+                for product_id, quantity in quantities.items():
+                    product = products[product_id]
+                    if product['stock'] < quantity:
+                        raise InsufficientStock(f'Insufficient stock for {product["name"]}')
+
+                # Commit
+                for product_id, quantity in quantities.items():
+                    product = products[product_id]
+                    self.store.set_stock(product, product['stock'] - quantity)
+                    stock.append([product_id, product['stock']])
+                    total_amount += quantity * product['price']
+                    sale_lines.append({'product_id': product_id, 'sku': product['sku'],
+                                       'quantity': quantity, 'price': product['price']})
+
+                journal = self.store.journal
+                now = datetime.now()
+                day = now.strftime('%Y%m%d')
+                sale = {
+                    'id': self.ids.next_id(),
+                    'sale_number': format_sale_number(day, self.ids.next_number(day, journal)),
+                    'customer_name': customer_name,
+                    'items': sale_lines,
+                    'total_amount': total_amount,
+                    'tax_amount': total_amount * VAT_RATE,
+                    'final_amount': total_amount * (1 + VAT_RATE),
+                    'date': now.isoformat(),
+                    'status': 'Paid'
+                }
+                self.sales.append(sale)
+                # Journaled under the product locks so the log orders stock
+                # changes the same way they were applied
+                if journal is not None:
+                    lsn = journal.append({'op': 'sale', 'sale': sale, 'stock': stock})
+
+        if lsn:
+            journal.wait(lsn)
+
+        self.notify(sale, [(products[product_id], quantity) for product_id, quantity in quantities.items()])
+        return sale
+
+    def notify(self, sale, lines):
+        """Call the listeners; the sale is committed, so one failing is logged and skipped"""
+        for listener in self.listeners:
+            try:
+                listener(sale, lines)
+            except Exception:
+                logger.exception('Sale listener %r failed for sale %s', listener, sale.get('id'))
+
+    def reserve_ids_through(self, sale_id):
+        """Make sure later sales get ids above ``sale_id``, e.g. after recovery"""
+        self.ids.reserve_ids_through(sale_id)
+
+    @staticmethod
+    def _merge_lines(items):
+        """Validate sale lines and sum quantities per product"""
+        if not isinstance(items, list):
+            raise InvalidSaleItem('items must be a list')
+        if not items:
+            raise InvalidSaleItem('A sale needs at least one item')
+
+        quantities = {}
+        for item in items:
+            try:
+                product_id = int(item['product_id'])
+                quantity = int(item['quantity'])
+            except (KeyError, TypeError, ValueError):
+                raise InvalidSaleItem('Each item needs a product_id and a quantity')
+            if quantity <= 0:
+                raise InvalidSaleItem(f'Invalid quantity for product {product_id}')
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        return quantities
@@ -0,0 +1,180 @@
+"""
+Bounded sales ledger with spill-to-disk segments
+
+The most recent sales stay in memory as a hot window. When the window
+outgrows its limit, its oldest half is written to an append-only segment
+file and dropped from memory. A segment is a sequence of independently
+gzip-compressed blocks, and a small JSON index next to it records each
+block's offset and time range, so historical queries only decompress the
+blocks that overlap the requested period.
+
+Without a directory the ledger never spills and behaves like a list.
+"""
+
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+
+# Sales per independently compressed block inside a segment
+BLOCK_SIZE = 256
+
+SEGMENT_SUFFIX = '.ndjson.gz'
+INDEX_SUFFIX = '.idx.json'
+
+
+class Segment:
+    """An immutable on-disk run of sales with its block time index"""
+
+    def __init__(self, path, index):
+        self.path = path
+        self.count = index['count']
+        self.first_id = index['first_id']
+        self.last_id = index['last_id']
+        self.start = datetime.fromisoformat(index['start'])
+        self.end = datetime.fromisoformat(index['end'])
+        # [offset, length, start, end] per block
+        self.blocks = [(offset, length, datetime.fromisoformat(start), datetime.fromisoformat(end))
+                       for offset, length, start, end in index['blocks']]
+
+    @classmethod
+    def write(cls, directory, sales):
+        """Write sales to a new segment file and return the Segment"""
+        name = f'sales-{sales[0]["id"]:016d}'
+        path = os.path.join(directory, name + SEGMENT_SUFFIX)
+        blocks = []
+        offset = 0
+        with open(path + '.tmp', 'wb') as f:
+            for i in range(0, len(sales), BLOCK_SIZE):
+                block = sales[i:i + BLOCK_SIZE]
+                lines = ''.join(json.dumps(sale, separators=(',', ':')) + '\n' for sale in block)
+                data = gzip.compress(lines.encode('utf-8'), mtime=0)
+                f.write(data)
+                dates = [sale['date'] for sale in block]
+                blocks.append([offset, len(data), min(dates), max(dates)])
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+        index = {
+            'count': len(sales),
+            'first_id': min(sale['id'] for sale in sales),
+            'last_id': max(sale['id'] for sale in sales),
+            'start': min(block[2] for block in blocks),
+            'end': max(block[3] for block in blocks),
+            'blocks': blocks,
+        }
+        index_path = os.path.join(directory, name + INDEX_SUFFIX)
+        with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(index_path + '.tmp', index_path)
+        return cls(path, index)
+
+    def read(self, start=None, end=None):
+        """Yield the segment's sales, decompressing only overlapping blocks"""
+        if (start and self.end < start) or (end and self.start > end):
+            return
+        with open(self.path, 'rb') as f:
+            for offset, length, block_start, block_end in self.blocks:
+                if (start and block_end < start) or (end and block_start > end):
+                    continue
+                f.seek(offset)
+                for line in gzip.decompress(f.read(length)).splitlines():
+                    yield json.loads(line)
+
+
+class SalesLedger:
+    """Append-only sales history with a bounded in-memory window"""
+
+    def __init__(self, directory=None, hot_limit=10000):
+        self.directory = directory
+        self.hot_limit = hot_limit
+        self._hot = []
+        self._segments = []
+        self._spilled = 0
+        self._lock = threading.Lock()
+        if directory and os.path.isdir(directory):
+            self._load_segments()
+
+    def _load_segments(self):
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(INDEX_SUFFIX):
+                continue
+            base = name[:-len(INDEX_SUFFIX)]
+            path = os.path.join(self.directory, base + SEGMENT_SUFFIX)
+            if not os.path.exists(path):
+                continue
+            with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                segment = Segment(path, json.load(f))
+            self._segments.append(segment)
+            self._spilled += segment.count
+        # Names of older segments may be padded to a different width
+        self._segments.sort(key=lambda segment: segment.first_id)
+
+    def __len__(self):
+        return self._spilled + len(self._hot)
+
+    @property
+    def last_id(self):
+        """Highest sale id recorded so far (0 if none)"""
+        with self._lock:
+            ids = [segment.last_id for segment in self._segments] + [sale['id'] for sale in self._hot]
+        return max(ids, default=0)
+
+    def __iter__(self):
+        return self.query()
+
+    def append(self, sale):
+        """Record a sale, spilling the oldest half of the window when full"""
+        with self._lock:
+            self._hot.append(sale)
+            if self.directory and len(self._hot) > self.hot_limit:
+                self._spill()
+
+    def _spill(self):
+        cut = len(self._hot) // 2
+        os.makedirs(self.directory, exist_ok=True)
+        segment = Segment.write(self.directory, self._hot[:cut])
+        self._segments.append(segment)
+        self._spilled += segment.count
+        del self._hot[:cut]
+
+    def recent(self, limit=None):
+        """The newest in-memory sales, oldest first"""
+        with self._lock:
+            return list(self._hot[-limit:] if limit else self._hot)
+
+    def query(self, start=None, end=None):
+        """Yield sales recorded between two datetimes (inclusive), oldest first
+
+        Segments and the hot window are snapshotted together, so a spill
+        during the query neither repeats nor skips sales.
+        """
+        with self._lock:
+            segments = list(self._segments)
+            hot = list(self._hot)
+        for segment in segments:
+            for sale in segment.read(start, end):
+                if _in_range(sale, start, end):
+                    yield sale
+        for sale in hot:
+            if _in_range(sale, start, end):
+                yield sale
+
+    def spilled_ids(self, since_id):
+        """Ids of on-disk sales from segments holding ids of ``since_id`` or more"""
+        with self._lock:
+            segments = [segment for segment in self._segments if segment.last_id >= since_id]
+        return {sale['id'] for segment in segments for sale in segment.read()}
+
+    def segment_count(self):
+        return len(self._segments)
+
+
+def _in_range(sale, start, end):
+    if start is None and end is None:
+        return True
+    when = datetime.fromisoformat(sale['date'])
+    return not ((start and when < start) or (end and when > end))
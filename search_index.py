@@ -0,0 +1,270 @@
+"""
+In-memory product search by SKU prefix and name
+
+Two indexes follow the ProductStore through its listeners, so adds and
+updates are searchable as soon as they are made:
+
+- SKUs, upper-cased, in a sorted list searched by bisection, which makes
+  a prefix query such as ``CTN-`` a range lookup whose matches are already
+  in order. New SKUs go to a small sorted buffer that is merged into the
+  main list once it fills up, so bulk imports do not shift a million
+  entries per product.
+- Names, normalized to be accent- and case-insensitive (Latin diacritics,
+  Arabic harakat, hamza carriers and letter variants fold away), as
+  sorted trigram posting lists of product ids, four bytes per entry. A
+  name matches when it holds every trigram of the query words: the
+  candidates from the rarest trigram are looked up in the other posting
+  lists with NumPy, starting with the rarest trigram of each word, until
+  few enough are left to check against their names. A query costs about
+  the number of candidates rather than the size of the catalog.
+
+Query words shorter than three letters match the start of a name word;
+single letters are ignored. Exact SKUs rank first, then SKU prefixes in
+SKU order, then names where every query word starts a name word, then
+other name matches. Name matches are ordered by length, shortest first,
+and only the requested page is ranked.
+"""
+
+import bisect
+import heapq
+import itertools
+import re
+import threading
+import unicodedata
+from array import array
+
+import numpy as np
+
+# New SKUs buffered before being merged into the sorted SKU list
+SKU_BUFFER = 4096
+# Candidates few enough to check against their names rather than posting lists
+SCAN_LIMIT = 512
+
+_WORD = re.compile(r'\w+')
+# Arabic letter variants folded to their base letter; tatweel removed
+_ARABIC = str.maketrans({'ٱ': 'ا', 'ة': 'ه', 'ى': 'ي', 'ـ': None})
+_NONE = np.zeros(0, dtype=np.int32)
+
+RANK_EXACT_SKU = 0
+RANK_SKU_PREFIX = 1
+RANK_NAME_WORDS = 2
+RANK_NAME = 3
+
+
+def normalize(text):
+    """Lower-case words without accents, separated by single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    bare = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(_WORD.findall(bare.translate(_ARABIC).casefold()))
+
+
+def _trigrams(normalized):
+    padded = f' {normalized} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_trigrams(word):
+    """Trigrams a name must hold to match a query word"""
+    if len(word) < 3:
+        word = ' ' + word
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class SearchIndex:
+    """SKU prefix and name trigram index over a ProductStore"""
+
+    def __init__(self):
+        self.store = None
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._names = {}
+        self._postings = {}
+        # Normalized name length per product id, for ranking
+        self._lengths = np.zeros(1024, dtype=np.int64)
+        self._skus = {}
+        self._sku_ids = {}
+        self._sorted = []
+        self._buffer = []
+
+    def attach(self, store):
+        """Index the store's products and follow its changes"""
+        self.store = store
+        self.rebuild(store.all())
+        store.listeners.append(self.update)
+
+    def rebuild(self, products):
+        """Index a whole catalog at once"""
+        with self._lock:
+            self._clear()
+            for product in products:
+                self._index_name(product['id'], normalize(product.get('name') or ''))
+                sku = product.get('sku')
+                if sku:
+                    self._skus[product['id']] = sku.upper()
+                    self._sku_ids[sku.upper()] = product['id']
+            self._sorted = sorted(self._sku_ids)
+
+    def update(self, product):
+        """Store listener: index a new product, a new name or a new SKU
+
+        Products without a name or SKU are indexed under the empty string,
+        which no query matches.
+        """
+        product_id = product['id']
+        name = normalize(product.get('name') or '')
+        sku = (product.get('sku') or '').upper()
+        with self._lock:
+            if name != self._names.get(product_id):
+                self._index_name(product_id, name)
+            previous = self._skus.get(product_id)
+            if sku == previous or (not sku and previous is None):
+                return
+            if previous is not None:
+                # Reloaded catalogs can give an id to another product
+                self._unindex_sku(previous)
+                del self._skus[product_id]
+            if not sku:
+                return
+            self._skus[product_id] = sku
+            self._sku_ids[sku] = product_id
+            bisect.insort(self._buffer, sku)
+            if len(self._buffer) >= SKU_BUFFER:
+                # Two sorted runs: the sort merges them in linear time
+                self._sorted = sorted(self._sorted + self._buffer)
+                self._buffer = []
+
+    def _index_name(self, product_id, name):
+        previous = self._names.get(product_id)
+        if previous is not None:
+            for trigram in _trigrams(previous):
+                posting = self._postings[trigram]
+                del posting[bisect.bisect_left(posting, product_id)]
+                if not posting:
+                    del self._postings[trigram]
+        self._names[product_id] = name
+        for trigram in _trigrams(name):
+            posting = self._postings.get(trigram)
+            if posting is None:
+                posting = self._postings[trigram] = array('i')
+            if posting and posting[-1] > product_id:
+                posting.insert(bisect.bisect_left(posting, product_id), product_id)
+            else:
+                posting.append(product_id)
+        if product_id >= len(self._lengths):
+            self._lengths = np.resize(self._lengths, max(product_id + 1, 2 * len(self._lengths)))
+        self._lengths[product_id] = len(name)
+
+    def _unindex_sku(self, sku):
+        del self._sku_ids[sku]
+        for skus in (self._sorted, self._buffer):
+            i = bisect.bisect_left(skus, sku)
+            if i < len(skus) and skus[i] == sku:
+                del skus[i]
+
+    def __len__(self):
+        return len(self._names)
+
+    def search(self, query, offset=0, limit=20):
+        """``(total, [(rank, product_id), ...])`` for one page of matches, best first"""
+        prefix = query.strip().upper()
+        end = offset + limit
+        with self._lock:
+            ranges = self._sku_ranges(prefix)
+            sku_total = sum(hi - lo for _, lo, hi in ranges)
+            starts, others = self._match_names(normalize(query))
+            if sku_total and (len(starts) or len(others)):
+                # Products matched by SKU are listed with the SKU matches only
+                if sku_total < len(starts) + len(others):
+                    matched = np.fromiter((self._sku_ids[sku] for skus, lo, hi in ranges for sku in skus[lo:hi]),
+                                          dtype=np.int32, count=sku_total)
+                    starts = starts[~np.isin(starts, matched)]
+                    others = others[~np.isin(others, matched)]
+                else:
+                    starts = starts[[not self._skus.get(i, '').startswith(prefix) for i in starts.tolist()]]
+                    others = others[[not self._skus.get(i, '').startswith(prefix) for i in others.tolist()]]
+
+            page = []
+            if offset < sku_total:
+                merged = heapq.merge(*(skus[lo:min(hi, lo + end)] for skus, lo, hi in ranges))
+                for sku in itertools.islice(merged, offset, end):
+                    page.append((RANK_EXACT_SKU if sku == prefix else RANK_SKU_PREFIX, self._sku_ids[sku]))
+            before = sku_total
+            for rank, ids in ((RANK_NAME_WORDS, starts), (RANK_NAME, others)):
+                if len(page) < limit and offset < before + len(ids):
+                    first = max(0, offset - before)
+                    top = self._shortest(ids, first + limit - len(page))
+                    page.extend((rank, product_id) for product_id in top[first:])
+                before += len(ids)
+        return before, page
+
+    def _sku_ranges(self, prefix):
+        """``(skus, lo, hi)`` slices of the sorted SKU lists starting with prefix"""
+        if not prefix:
+            return []
+        ranges = []
+        for skus in (self._sorted, self._buffer):
+            lo = bisect.bisect_left(skus, prefix)
+            # Every string with the prefix sorts before prefix + U+10FFFF
+            hi = bisect.bisect_left(skus, prefix + '\U0010ffff', lo)
+            if hi > lo:
+                ranges.append((skus, lo, hi))
+        return ranges
+
+    def _match_names(self, normalized):
+        """Arrays of products whose names match every query word at a word start, and elsewhere"""
+        words = [word for word in normalized.split() if len(word) > 1]
+        if not words:
+            return _NONE, _NONE
+        trigrams = set().union(*(_query_trigrams(word) for word in words))
+        start_trigrams = {' ' + word[:2] for word in words}
+        if any(trigram not in self._postings for trigram in trigrams):
+            return _NONE, _NONE
+
+        def size(trigram):
+            return len(self._postings[trigram])
+
+        # A word's trigrams mostly share their products: start from the
+        # rarest trigram of each word, which filter each other the most
+        firsts = sorted({min(_query_trigrams(word), key=size) for word in words}, key=size)
+        remaining = firsts + sorted(trigrams.difference(firsts), key=size)
+        matched = np.frombuffer(self._postings[remaining.pop(0)], dtype=np.int32).copy()
+        while remaining and len(matched) > SCAN_LIMIT:
+            matched = matched[self._contains(remaining.pop(0), matched)]
+
+        if len(matched) <= SCAN_LIMIT:
+            # A name holds a trigram exactly when its id is in the posting list
+            starts, others = [], []
+            for product_id in matched.tolist():
+                padded = f' {self._names[product_id]} '
+                if all(trigram in padded for trigram in remaining):
+                    at_start = all(trigram in padded for trigram in start_trigrams)
+                    (starts if at_start else others).append(product_id)
+            return np.array(starts, dtype=np.int32), np.array(others, dtype=np.int32)
+
+        word_start = np.ones(len(matched), dtype=bool)
+        for trigram in start_trigrams:
+            if trigram not in self._postings:
+                return _NONE, matched
+            word_start &= self._contains(trigram, matched)
+        return matched[word_start], matched[~word_start]
+
+    def _contains(self, trigram, ids):
+        """Boolean array, true for the ids (sorted) whose names hold a trigram"""
+        posting = np.frombuffer(self._postings[trigram], dtype=np.int32)
+        if len(ids) > len(posting) // 8 + len(self._lengths) // 512:
+            # Many ids: marking the posting list beats a binary search per id
+            marks = np.zeros(len(self._lengths), dtype=bool)
+            marks[posting] = True
+            return marks[ids]
+        found = np.searchsorted(posting, ids)
+        return posting[np.minimum(found, len(posting) - 1)] == ids
+
+    def _shortest(self, ids, count):
+        """Up to ``count`` ids with the shortest names, in order"""
+        keys = (self._lengths[ids] << 32) | ids
+        if count < len(keys):
+            keys = keys[np.argpartition(keys, count - 1)[:count]]
+        keys.sort()
+        return (keys & 0xffffffff).tolist()
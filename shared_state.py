@@ -0,0 +1,374 @@
+"""
+Inventory state shared by all worker processes through SQLite
+
+Under gunicorn each worker process has its own ProductStore. In this mode
+one SQLite database in WAL mode is the source of truth and the stores are
+kept consistent with it:
+
+- Every mutation runs in a ``BEGIN IMMEDIATE`` transaction, which SQLite
+  grants to one connection at a time across all processes. The
+  transaction first applies what other workers committed since this
+  process last looked, so stock is validated against the current values,
+  and then writes the mutation's records to a change feed together with
+  the product and sale rows they touch.
+- Before each request a worker applies new change feed entries (a single
+  indexed read when nothing changed), so reads see other workers' writes.
+- Sales are stored in the shared ``sales`` table. Each worker leases a
+  slot in the ``workers`` table at startup, which makes its sale ids
+  unique without further coordination, and leases blocks of sale numbers
+  from the ``counters`` table (see sale_ids.py).
+
+The change feed uses the journal's record format and only keeps the most
+recent ``retention`` records; a worker that falls further behind reloads
+the products table instead.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from journal import apply_record
+from sale_ids import MAX_SLOTS, NUMBER_DAYS_KEPT, worker_id
+
+# Change feed records kept for workers catching up
+FEED_RETENTION = 100000
+# Commits between prunes of the change feed
+PRUNE_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    sku TEXT UNIQUE,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    stock INTEGER NOT NULL,
+    price REAL NOT NULL,
+    cost REAL NOT NULL,
+    reorder_level INTEGER
+);
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sales_date ON sales (date);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    slot INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL
+);
+"""
+
+_PRODUCT_COLUMNS = ('id', 'sku', 'name', 'category', 'stock', 'price', 'cost', 'reorder_level')
+
+
+class SharedState:
+    """Keeps the ProductStore and SaleEngine of each process in step through SQLite
+
+    Create it, build the SaleEngine with a SharedSalesLedger over it, then
+    call ``attach``.
+    """
+
+    def __init__(self, path, retention=FEED_RETENTION, busy_timeout=30.0, node_id=0):
+        self.path = path
+        self.retention = retention
+        self.busy_timeout = busy_timeout
+        self.node_id = node_id
+        self.store = None
+        self.sale_engine = None
+        # Last change feed entry reflected in this process' store
+        self.seen = 0
+        self._local = threading.local()
+        # Held while applying the feed or running a write transaction
+        self._feed_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self.connection()
+        connection.executescript(SCHEMA)
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(products)')}
+        if 'reorder_level' not in columns:
+            # Databases created before products had their own reorder level
+            connection.execute('ALTER TABLE products ADD COLUMN reorder_level INTEGER')
+
+    def connection(self):
+        """This thread's connection, in autocommit mode"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # New thread, or a connection inherited across fork
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                         isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            local.connection = connection
+            local.pid = os.getpid()
+            local.depth = 0
+        return local.connection
+
+    def attach(self, store, sale_engine):
+        """Seed an empty database from the store, then load the shared state into it"""
+        self.store = store
+        self.sale_engine = sale_engine
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if connection.execute('SELECT 1 FROM products LIMIT 1').fetchone() is None:
+                for product in store.all():
+                    self._put_product(connection, product)
+            sale_engine.ids.worker_id = worker_id(self.node_id, self._claim_slot(connection))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        with self._feed_lock:
+            connection.execute('BEGIN')
+            try:
+                self._reload(connection)
+            finally:
+                connection.execute('COMMIT')
+        store.journal = self
+
+    @staticmethod
+    def _claim_slot(connection):
+        """Lease a worker slot that no live process on this host holds; caller holds a transaction"""
+        host = socket.gethostname()
+        owners = {slot: (owner_host, pid) for slot, owner_host, pid
+                  in connection.execute('SELECT slot, host, pid FROM workers')}
+        for slot in range(MAX_SLOTS):
+            owner = owners.get(slot)
+            # Slots of other hosts are never reclaimed: their processes cannot be checked
+            if owner is None or (owner[0] == host and not _process_alive(owner[1])):
+                connection.execute('INSERT OR REPLACE INTO workers (slot, host, pid) VALUES (?, ?, ?)',
+                                   (slot, host, os.getpid()))
+                return slot
+        raise RuntimeError(f'All {MAX_SLOTS} worker slots are held by running processes')
+
+    def _reload(self, connection):
+        """Replace the store with the products table; caller holds a transaction"""
+        rows = connection.execute(f'SELECT {", ".join(_PRODUCT_COLUMNS)} FROM products ORDER BY id')
+        self.store.load(_product(row) for row in rows)
+        self.seen = _last_seq(connection)
+        last_sale = connection.execute('SELECT max(id) FROM sales').fetchone()[0]
+        self.sale_engine.reserve_ids_through(last_sale or 0)
+
+    # Journal interface used by ProductStore and SaleEngine
+
+    @contextmanager
+    def transaction(self):
+        """Serialize a mutation across processes, after catching up with the feed"""
+        connection = self.connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield
+            finally:
+                local.depth -= 1
+            return
+
+        connection.execute('BEGIN IMMEDIATE')
+        self._feed_lock.acquire()
+        local.depth = 1
+        local.last_seq = None
+        local.leased = False
+        try:
+            self._apply_feed(connection)
+            yield
+            if local.last_seq is not None and local.last_seq % PRUNE_EVERY == 0:
+                connection.execute('DELETE FROM changes WHERE seq <= ?',
+                                   (local.last_seq - self.retention,))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            if local.leased:
+                # The rolled back lease may be handed out again by another worker
+                self.sale_engine.ids.discard_numbers()
+            if local.last_seq is not None:
+                # The store already holds the failed mutation; start over
+                connection.execute('BEGIN')
+                try:
+                    self._reload(connection)
+                finally:
+                    connection.execute('COMMIT')
+            raise
+        else:
+            if local.last_seq is not None:
+                self.seen = local.last_seq
+        finally:
+            local.depth = 0
+            self._feed_lock.release()
+
+    def append(self, record):
+        """Write a record and the rows it changes inside the current transaction"""
+        if not self._local.depth:
+            raise RuntimeError('Shared state changes must run inside store.transaction()')
+        connection = self.connection()
+        cursor = connection.execute('INSERT INTO changes (record) VALUES (?)',
+                                    (json.dumps(record, separators=(',', ':')),))
+        self._local.last_seq = cursor.lastrowid
+        if record['op'] == 'product':
+            self._put_product(connection, record['product'])
+        else:
+            connection.executemany('UPDATE products SET stock = ? WHERE id = ?',
+                                   [(stock, product_id) for product_id, stock in record['stock']])
+        # Durable at COMMIT, which ends the transaction before the caller waits
+        return 0
+
+    def wait(self, lsn):
+        """Records are durable once their transaction commits"""
+
+    def lease(self, day, size):
+        """Reserve ``size`` sale numbers of ``day`` and return the first"""
+        with self.transaction():
+            self._local.leased = True
+            name = f'sale_numbers:{day}'
+            connection = self.connection()
+            row = connection.execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                # First lease of the day: forget the counters of past days
+                cutoff = datetime.strptime(day, '%Y%m%d') - timedelta(days=NUMBER_DAYS_KEPT)
+                connection.execute("DELETE FROM counters WHERE name > 'sale_numbers:' AND name < ?",
+                                   (f'sale_numbers:{cutoff:%Y%m%d}',))
+            start = row[0] if row else 1
+            connection.execute('INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)',
+                               (name, start + size))
+        return start
+
+    # Catching up with other workers
+
+    def refresh(self):
+        """Apply changes committed by other workers
+
+        Skipped when another thread of this process is already applying
+        the feed or writing.
+        """
+        if not self._feed_lock.acquire(blocking=False):
+            return
+        try:
+            connection = self.connection()
+            if _last_seq(connection) > self.seen:
+                connection.execute('BEGIN')
+                try:
+                    self._apply_feed(connection)
+                finally:
+                    connection.execute('COMMIT')
+        finally:
+            self._feed_lock.release()
+
+    def _apply_feed(self, connection):
+        """Apply feed entries after ``seen``; caller holds the feed lock and a transaction"""
+        rows = connection.execute('SELECT seq, record FROM changes WHERE seq > ? ORDER BY seq',
+                                  (self.seen,)).fetchall()
+        if rows and rows[0][0] > self.seen + 1:
+            # Entries we have not applied were pruned already
+            self._reload(connection)
+            return
+        for seq, record in rows:
+            sale = apply_record(self.store, json.loads(record))
+            if sale is not None:
+                self._notify_sale(sale)
+            self.seen = seq
+
+    def _notify_sale(self, sale):
+        """Hand another worker's sale to this process' sale listeners"""
+        self.sale_engine.reserve_ids_through(sale['id'])
+        lines = [(self.store.get(item['product_id']), item['quantity']) for item in sale['items']]
+        self.sale_engine.notify(sale, lines)
+
+    @staticmethod
+    def _put_product(connection, product):
+        connection.execute(
+            f'INSERT OR REPLACE INTO products ({", ".join(_PRODUCT_COLUMNS)}) '
+            f'VALUES ({", ".join("?" * len(_PRODUCT_COLUMNS))})',
+            [product.get(column) for column in _PRODUCT_COLUMNS])
+
+
+class SharedSalesLedger:
+    """The SalesLedger interface over the shared ``sales`` table"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def __len__(self):
+        row = self.state.connection().execute(
+            "SELECT value FROM counters WHERE name = 'sales'").fetchone()
+        return row[0] if row else 0
+
+    @property
+    def last_id(self):
+        """Highest sale id recorded by any worker (0 if none)"""
+        return self.state.connection().execute('SELECT max(id) FROM sales').fetchone()[0] or 0
+
+    def __iter__(self):
+        return self.query()
+
+    def append(self, sale):
+        """Record a sale; inside a store transaction it commits with the stock change"""
+        connection = self.state.connection()
+        connection.execute('INSERT INTO sales (id, date, body) VALUES (?, ?, ?)',
+                           (sale['id'], sale['date'], json.dumps(sale, separators=(',', ':'))))
+        connection.execute("INSERT INTO counters (name, value) VALUES ('sales', 1) "
+                           "ON CONFLICT (name) DO UPDATE SET value = value + 1")
+
+    def recent(self, limit=None):
+        """The newest sales, oldest first"""
+        rows = self.state.connection().execute(
+            'SELECT body FROM sales ORDER BY id DESC LIMIT ?', (limit or -1,)).fetchall()
+        return [json.loads(body) for body, in reversed(rows)]
+
+    def query(self, start=None, end=None):
+        """Yield sales recorded between two datetimes (inclusive), oldest first
+
+        Runs on its own connection, so the results can be streamed after
+        the request's own transactions have finished.
+        """
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append('date >= ?')
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append('date <= ?')
+            params.append(end.isoformat())
+        where = f'WHERE {" AND ".join(conditions)} ' if conditions else ''
+        connection = sqlite3.connect(self.state.path, timeout=self.state.busy_timeout)
+        try:
+            for body, in connection.execute(f'SELECT body FROM sales {where}ORDER BY id', params):
+                yield json.loads(body)
+        finally:
+            connection.close()
+
+
+def _product(row):
+    """Product dict of a products table row, without unset optional fields"""
+    product = dict(zip(_PRODUCT_COLUMNS, row))
+    if product['reorder_level'] is None:
+        del product['reorder_level']
+    return product
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _last_seq(connection):
+    row = connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,68 @@
+"""
+SQLite performance profile for the SQLAlchemy backend
+
+SQLite's defaults suit a single writer on a laptop: a rollback journal that
+blocks readers while a transaction commits, an fsync on every commit and no
+busy timeout, so a second writer fails at once with "database is locked".
+``enable_sqlite_performance`` registers a SQLAlchemy connect event that
+applies per-connection PRAGMAs (``Config.SQLITE_PRAGMAS``) to every new
+SQLite connection:
+
+- ``journal_mode=WAL``: readers and the writer no longer block each other
+- ``synchronous=NORMAL``: with WAL, commits are only fsynced at
+  checkpoints; a power cut can lose the last commits but never corrupts
+  the database
+- ``mmap_size``: reads are served from memory-mapped pages
+- ``busy_timeout``: writers wait for the lock instead of failing
+- ``cache_size``, ``temp_store`` and ``foreign_keys``
+
+Pooling is configured through ``SQLALCHEMY_ENGINE_OPTIONS``. gunicorn.conf.py
+does not preload the app, so each worker builds its own engine and pool
+when it imports the app and no connection crosses a fork.
+"""
+
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Current listener per target, so re-enabling replaces rather than stacks
+_listeners = {}
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run ``PRAGMA name=value`` for each pragma on a DB-API connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def enable_sqlite_performance(pragmas, target=Engine):
+    """Apply ``pragmas`` to every new SQLite connection of ``target``
+
+    ``target`` is an engine, or the Engine class to cover every engine
+    created afterwards (as Flask-SQLAlchemy creates them lazily). Calling
+    it again for the same target replaces the earlier pragmas. Returns the
+    listener so it can be removed with ``sqlalchemy.event.remove``.
+    """
+    pragmas = dict(pragmas)
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            apply_pragmas(dbapi_connection, pragmas)
+
+    previous = _listeners.pop(target, None)
+    if previous is not None:
+        event.remove(target, 'connect', previous)
+    event.listen(target, 'connect', set_sqlite_pragmas)
+    _listeners[target] = set_sqlite_pragmas
+    return set_sqlite_pragmas
+
+
+def read_pragmas(engine, names):
+    """Current values of some pragmas on a fresh pooled connection"""
+    with engine.connect() as connection:
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
@@ -0,0 +1,127 @@
+"""
+Stock alerts raised as products cross stock levels
+
+The alert engine listens to a ProductStore and classifies every product
+change with ``stock_level`` (normal, low, critical or out of stock against
+the product's reorder level). When the level differs from the last one
+seen for that product it records a transition and hands it to its own
+listeners, so alerts are raised by the mutation that caused them rather
+than found later by scanning the catalog.
+
+Products away from the normal level are kept in a priority queue ordered
+by days of cover (stock divided by daily demand, from ``demand_rate``),
+so "what needs attention" reads the front of a heap. Queue entries are
+replaced rather than updated: a product's newest entry supersedes older
+ones, which are skipped and compacted away. Days of cover are computed
+when the product last changed.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+from collections import deque
+from datetime import datetime
+
+from inventory_store import LEVEL_NORMAL, LEVELS, stock_level
+
+# Transitions kept for the recent alerts listing
+HISTORY = 1000
+
+
+class AlertEngine:
+    """Tracks each product's stock level and the products needing attention"""
+
+    def __init__(self, demand_rate=None, history=HISTORY):
+        # Daily demand of a product, for days of cover (None: unknown)
+        self.demand_rate = demand_rate
+        self.transitions = deque(maxlen=history)
+        # Called as fn(transition) for every level change
+        self.listeners = []
+        self._levels = {}
+        self._heap = []
+        # Newest heap entry per product needing attention
+        self._entries = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def attach(self, store):
+        """Take the store's current levels as the baseline and follow its changes"""
+        with self._lock:
+            for product in store.all():
+                self._levels[product['id']] = stock_level(product['stock'], product.get('reorder_level'))
+                if self._levels[product['id']] != LEVEL_NORMAL:
+                    self._push(product)
+        store.listeners.append(self.observe)
+
+    def observe(self, product):
+        """Store listener: record a transition if the product changed level"""
+        level = stock_level(product['stock'], product.get('reorder_level'))
+        with self._lock:
+            previous = self._levels.get(product['id'], LEVEL_NORMAL)
+            self._levels[product['id']] = level
+            if level == LEVEL_NORMAL:
+                self._entries.pop(product['id'], None)
+            else:
+                self._push(product)
+            if level == previous:
+                return
+            transition = {
+                'product_id': product['id'],
+                'sku': product['sku'],
+                'from': previous,
+                'to': level,
+                'stock': product['stock'],
+                'escalated': LEVELS.index(level) > LEVELS.index(previous),
+                'at': datetime.now().isoformat(),
+            }
+            self.transitions.append(transition)
+        for listener in self.listeners:
+            listener(transition)
+
+    def level(self, product_id):
+        with self._lock:
+            return self._levels.get(product_id, LEVEL_NORMAL)
+
+    def attention(self, limit=None):
+        """Products away from the normal level, fewest days of cover first"""
+        with self._lock:
+            live = (entry for entry in self._heap if self._entries.get(entry[3]) is entry)
+            entries = heapq.nsmallest(limit, live) if limit is not None else sorted(live)
+            return [dict(entry[4]) for entry in entries]
+
+    def most_urgent(self):
+        """The product with the fewest days of cover, or None"""
+        with self._lock:
+            while self._heap and self._entries.get(self._heap[0][3]) is not self._heap[0]:
+                heapq.heappop(self._heap)
+            return dict(self._heap[0][4]) if self._heap else None
+
+    def recent(self, limit=50):
+        """The newest transitions, newest first"""
+        with self._lock:
+            return list(itertools.islice(reversed(self.transitions), limit))
+
+    def _push(self, product):
+        """Queue a product's current state; caller holds the lock"""
+        demand = self.demand_rate(product) if self.demand_rate is not None else None
+        if product['stock'] <= 0:
+            cover = 0.0
+        elif demand:
+            cover = product['stock'] / demand
+        else:
+            cover = math.inf
+        details = {
+            'product_id': product['id'],
+            'sku': product['sku'],
+            'name': product['name'],
+            'level': self._levels[product['id']],
+            'stock': product['stock'],
+            'days_of_cover': None if math.isinf(cover) else round(cover, 1),
+        }
+        entry = (cover, product['stock'], next(self._sequence), product['id'], details)
+        self._entries[product['id']] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [entry for entry in self._heap if self._entries.get(entry[3]) is entry]
+            heapq.heapify(self._heap)
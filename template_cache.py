@@ -0,0 +1,64 @@
+"""
+Compiled template cache for the SIMS pages
+
+``render_template_string`` parses and compiles its template source on every
+call. A CompiledPage compiles the source once with the application's Jinja
+environment and keeps the rendered HTML, plain and gzipped, until the
+version of the data it was rendered from changes.
+"""
+
+import hashlib
+import threading
+
+from flask import Response, request
+
+from response_cache import CachedResponse
+
+
+class CompiledPage:
+    """A template compiled once whose rendered output is cached per data version"""
+
+    def __init__(self, app, source):
+        self.template = app.jinja_env.from_string(source)
+        self._lock = threading.Lock()
+        self._version = None
+        self._entry = None
+        self._etag = None
+
+    def render(self, version=0, context=None):
+        """Return ``(entry, etag)`` for the page at a data version
+
+        ``context`` is a mapping, or a callable returning one, and is only
+        evaluated when the page has to be re-rendered.
+        """
+        with self._lock:
+            if self._entry is not None and self._version == version:
+                return self._entry, self._etag
+
+        if callable(context):
+            context = context()
+        html = self.template.render(**(context or {}))
+        entry = CachedResponse(html.encode('utf-8'))
+        etag = hashlib.blake2b(entry.body, digest_size=12).hexdigest()
+
+        with self._lock:
+            self._version = version
+            self._entry = entry
+            self._etag = etag
+        return entry, etag
+
+    def response(self, version=0, context=None):
+        """Serve the page for the current request, honouring gzip and ETags"""
+        entry, etag = self.render(version, context)
+        headers = {'Vary': 'Accept-Encoding'}
+        use_gzip = 'gzip' in request.accept_encodings and entry.gzipped is not None
+        if use_gzip:
+            etag += '-gzip'
+        headers['ETag'] = f'"{etag}"'
+
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(entry.gzipped, mimetype='text/html', headers=headers)
+        return Response(entry.body, mimetype='text/html', headers=headers)
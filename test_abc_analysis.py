@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for ABC classification (abc_analysis.py)
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import String, create_engine, event, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+from abc_analysis import ABCAnalyzer, persist
+
+TODAY = date(2026, 3, 31)
+
+
+def make_sale(day, *lines):
+    """A ledger-shaped sale on a day, with ``(sku, quantity, price)`` lines"""
+    return {'date': datetime.combine(day, datetime.min.time()).replace(hour=12).isoformat(),
+            'items': [{'sku': sku, 'quantity': quantity, 'price': price} for sku, quantity, price in lines]}
+
+
+def test_classes_follow_cumulative_revenue_share():
+    """SKUs start in A until 80% of revenue ranks above them, then B until 95%"""
+    analyzer = ABCAnalyzer(periods=90)
+    analyzer.rebuild([
+        make_sale(TODAY, ('OIL', 70, 10)),
+        make_sale(TODAY - timedelta(days=3), ('TEA', 20, 10), ('BOX', 6, 10)),
+        make_sale(TODAY - timedelta(days=10), ('RUG', 4, 10)),
+        # Outside the window
+        make_sale(TODAY - timedelta(days=90), ('RUG', 1000, 10)),
+    ], today=TODAY)
+    assert analyzer.revenue() == {'OIL': 700, 'TEA': 200, 'BOX': 60, 'RUG': 40}
+    classes = analyzer.classify(['OIL', 'LAMP'], today=TODAY)
+    assert classes == {'OIL': 'A', 'TEA': 'A', 'BOX': 'B', 'RUG': 'C', 'LAMP': 'C'}
+    assert analyzer.summary(classes)['C'] == {'count': 2, 'revenue': 40}
+
+
+def test_incremental_window_matches_a_rescan():
+    """Adding the newest day and dropping the oldest equals rebuilding the window"""
+    sales = [make_sale(TODAY - timedelta(days=offset), ('OIL', offset % 5 + 1, 10), ('TEA', 2, offset))
+             for offset in range(40)]
+    incremental = ABCAnalyzer(periods=30)
+    incremental.rebuild(sales, today=TODAY - timedelta(days=10))
+    for offset in range(9, -1, -1):
+        day = TODAY - timedelta(days=offset)
+        incremental.add_day(day, [sale for sale in sales if sale['date'].startswith(day.isoformat())])
+    # Replaying a day replaces it instead of adding it twice
+    incremental.add_day(TODAY, [sales[0]])
+
+    rescanned = ABCAnalyzer(periods=30)
+    rescanned.rebuild(sales, today=TODAY)
+    expected = rescanned.revenue()
+    assert incremental.revenue().keys() == expected.keys()
+    for sku, amount in incremental.revenue().items():
+        assert abs(amount - expected[sku]) < 1e-6
+    assert incremental.classify(today=TODAY) == rescanned.classify(today=TODAY)
+
+
+def test_sale_listener_moves_the_window():
+    """Recorded sales count towards their day, and the first sale of a new day expires old ones"""
+    analyzer = ABCAnalyzer(periods=2)
+    analyzer.record_sale(make_sale(TODAY - timedelta(days=2), ('OIL', 1, 100)), [])
+    analyzer.record_sale(make_sale(TODAY - timedelta(days=1), ('TEA', 1, 10)), [])
+    revision = analyzer.revision
+    analyzer.record_sale(make_sale(TODAY, ('TEA', 1, 10)), [])
+    assert analyzer.revenue() == {'TEA': 20}
+    assert analyzer.revision > revision
+    analyzer.record_sale(make_sale(TODAY - timedelta(days=5), ('OIL', 1, 100)), [])
+    assert analyzer.revenue() == {'TEA': 20}
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Product(Base):
+    __tablename__ = 'products'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sku: Mapped[str] = mapped_column(String(20), unique=True)
+    abc_classification: Mapped[str] = mapped_column(String(1), default='C')
+
+
+def test_persist_updates_changed_rows_in_one_statement():
+    """Classes are written with a single executemany UPDATE of the rows that changed"""
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    with Session(engine) as session:
+        session.add_all([Product(id=1, sku='OIL', abc_classification='B'),
+                         Product(id=2, sku='TEA', abc_classification='B'),
+                         Product(id=3, sku='BOX', abc_classification='C')])
+        session.commit()
+        statements.clear()
+
+        assert persist(session, Product, {'OIL': 'A', 'TEA': 'B', 'BOX': 'A', 'GONE': 'A'}) == 2
+        session.commit()
+        assert sum(statement.startswith('UPDATE') for statement in statements) == 1
+        assert dict(session.execute(select(Product.sku, Product.abc_classification)).all()) == {
+            'OIL': 'A', 'TEA': 'B', 'BOX': 'A'}
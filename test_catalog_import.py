@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming catalog import
+"""
+
+import io
+
+import openpyxl
+import pytest
+
+from catalog_import import CatalogImporter, ImportFormatError, iter_csv_rows, iter_xlsx_rows
+from inventory_store import ProductStore
+
+CSV = b"""SKU,Name,Category,Stock,Price,Cost
+CTN-BLU-001,Cotton Fabric - Blue,Textiles,200,26.00,18.50
+TEA-MNT-001,Th\xc3\xa9 \xc3\xa0 la menthe,Groceries,40,12.00,8.00
+BAD-001,Broken Row,Groceries,-3,1,1
+,No SKU,Groceries,1,1,1
+LMP-001,Lamp,Electronics,4,99.5,60
+"""
+
+
+def make_workbook(*rows):
+    """An in-memory XLSX file with ``rows`` on its first sheet"""
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def make_store():
+    return ProductStore([
+        {'name': 'Cotton Fabric - Blue', 'sku': 'CTN-BLU-001', 'category': 'Textiles',
+         'stock': 150, 'price': 25.50, 'cost': 18.00},
+    ])
+
+
+def test_import_upserts_by_sku_in_chunks():
+    """Valid rows create or update products; bad rows are reported"""
+    store = make_store()
+    events = list(CatalogImporter(store, chunk_size=2).run(iter_csv_rows(io.BytesIO(CSV))))
+
+    assert len(events) == 4  # three chunks plus the final report
+    assert [e['rows'] for e in events[:3]] == [2, 4, 5]
+    final = events[-1]
+    assert final['done']
+    assert (final['created'], final['updated'], final['failed']) == (2, 1, 2)
+    assert final['errors'] == [{'row': 4, 'error': 'stock must be a whole number'},
+                               {'row': 5, 'error': 'sku is required'}]
+
+    cotton = store.get_by_sku('CTN-BLU-001')
+    assert (cotton['id'], cotton['stock'], cotton['price']) == (1, 200, 26.0)
+    assert store.get_by_sku('TEA-MNT-001')['name'] == 'Thé à la menthe'
+    assert store.get_by_sku('LMP-001')['status'] == 'Low Stock'
+    assert store.aggregates.total_products == 3
+    assert store.aggregates.inventory_value == pytest.approx(200 * 18.5 + 40 * 8 + 4 * 60)
+
+
+def test_missing_columns_are_rejected_up_front():
+    """A file without the required header fails before any row is read"""
+    with pytest.raises(ImportFormatError):
+        iter_csv_rows(io.BytesIO(b'sku,name\nA,B\n'))
+
+
+def test_xlsx_rows_are_read_lazily_and_the_workbook_closed(monkeypatch):
+    """The first sheet is read in read-only mode and closed once its rows are consumed"""
+    opened = []
+    original = openpyxl.load_workbook
+
+    def load_workbook(stream, **options):
+        opened.append((options, original(stream, **options)))
+        return opened[-1][1]
+
+    monkeypatch.setattr(openpyxl, 'load_workbook', load_workbook)
+    stream = make_workbook(['SKU', 'Name', 'Category', 'Stock', 'Price', 'Cost'],
+                           ['CTN-BLU-001', 'Cotton Fabric - Blue', 'Textiles', 200, 26, 18.5],
+                           [None, None, None, None, None, None],
+                           ['LMP-001', 'Lamp', 'Electronics', 4, 99.5, 60])
+    store = make_store()
+    final = list(CatalogImporter(store).run(iter_xlsx_rows(stream)))[-1]
+
+    options, workbook = opened[0]
+    assert options['read_only']
+    assert workbook._archive.fp is None  # closed
+    assert (final['created'], final['updated'], final['failed']) == (1, 1, 0)
+    assert store.get_by_sku('CTN-BLU-001')['stock'] == 200
+    assert store.get_by_sku('LMP-001')['price'] == 99.5
+
+
+def test_xlsx_without_required_columns_is_rejected():
+    """An XLSX header missing columns fails up front"""
+    with pytest.raises(ImportFormatError, match='Missing columns: stock, price, cost'):
+        iter_xlsx_rows(make_workbook(['SKU', 'Name', 'Category'], ['A', 'B', 'C']))
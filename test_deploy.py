@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Route tests for the deployment app (app_deploy.py)
+"""
+
+import gzip
+import io
+import json
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+from inventory_store import encode_cursor
+
+
+@pytest.fixture
+def deploy(tmp_path, monkeypatch):
+    """Fresh app_deploy module so each test starts from the sample data"""
+    from config import Config
+    monkeypatch.setattr(Config, 'JOURNAL_DIR', str(tmp_path / 'journal'))
+    monkeypatch.setattr(Config, 'SALES_LEDGER_DIR', str(tmp_path / 'sales'))
+    import app_deploy
+    return importlib.reload(app_deploy)
+
+
+@pytest.fixture
+def client(deploy):
+    deploy.app.config['TESTING'] = True
+    with deploy.app.test_client() as client:
+        yield client
+
+
+def test_app_imports_without_sqlalchemy(tmp_path):
+    """requirements.txt has no SQLAlchemy, so serving the app must not need it"""
+    env = dict(os.environ, JOURNAL_DIR=str(tmp_path / 'journal'), SALES_LEDGER_DIR=str(tmp_path / 'sales'))
+    code = "import sys; sys.modules['sqlalchemy'] = None; import app_deploy"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_index_and_health(client):
+    """Main page and health check are served"""
+    assert client.get('/').status_code == 200
+    assert client.get('/health').status_code == 200
+
+
+def test_dashboard_with_a_product_without_category(client, deploy):
+    """Uncategorized products are totalled under '' instead of breaking the JSON"""
+    deploy.store.add({'name': 'Loose Mint', 'sku': 'MNT-001', 'category': None,
+                      'stock': 10, 'price': 5, 'cost': 2})
+    response = client.get('/api/dashboard')
+    assert response.status_code == 200
+    assert response.get_json()['categories']['']['products'] == 1
+
+
+def test_add_product_and_update_stock(client):
+    """Products added through the API are indexed and adjustable"""
+    response = client.post('/api/products', json={
+        'name': 'Silk Scarf', 'sku': 'SLK-SCF-001', 'category': 'Textiles',
+        'stock': 12, 'price': 40, 'cost': 25
+    })
+    product = response.get_json()['product']
+    assert product['id'] == 6
+    assert product['status'] == 'Normal'
+
+    response = client.post('/api/products', json={
+        'name': 'Dup', 'sku': 'SLK-SCF-001', 'category': 'Textiles',
+        'stock': 1, 'price': 1, 'cost': 1
+    })
+    assert response.status_code == 409
+
+    for missing in ('sku', 'category'):
+        fields = {'name': 'Incomplete', 'sku': 'INC-001', 'category': 'Textiles', 'stock': 1, 'price': 1, 'cost': 1}
+        fields[missing] = None
+        assert client.post('/api/products', json=fields).status_code == 400
+    for reorder_level in ('x', -5, 2.5, True):
+        fields = {'name': 'Rug', 'sku': 'RUG-001', 'category': 'Textiles', 'stock': 1, 'price': 1, 'cost': 1,
+                  'reorder_level': reorder_level}
+        assert client.post('/api/products', json=fields).status_code == 400
+    assert client.get('/api/products').get_json()['total'] == 6
+
+    response = client.put('/api/products/6/stock', json={'adjustment': -4})
+    assert response.get_json()['product']['status'] == 'Low Stock'
+    assert client.put('/api/products/99/stock', json={'adjustment': 1}).status_code == 404
+
+
+def test_process_sale(client, deploy):
+    """A sale decrements stock and records the totals"""
+    response = client.post('/api/sales', json={
+        'items': [{'product_id': 1, 'quantity': 10}, {'product_id': 4, 'quantity': 1}]
+    })
+    sale = response.get_json()['sale']
+    assert sale['total_amount'] == pytest.approx(10 * 25.50 + 85.00)
+    assert deploy.store.get(1)['stock'] == 140
+
+
+def test_short_sale_is_rejected_without_side_effects(client, deploy):
+    """A sale with a short line returns 400 and changes nothing"""
+    response = client.post('/api/sales', json={
+        'items': [{'product_id': 1, 'quantity': 10}, {'product_id': 2, 'quantity': 50}]
+    })
+    assert response.status_code == 400
+    assert deploy.store.get(1)['stock'] == 150
+    assert len(deploy.sales) == 0
+    assert client.post('/api/sales', json={'items': 5}).status_code == 400
+
+
+def test_products_are_paginated_and_projected(client):
+    """The product listing follows cursors and applies filters and projections"""
+    data = client.get('/api/products?limit=2&sort=-stock&fields=id,stock').get_json()
+    assert data['products'] == [{'id': 1, 'stock': 150}, {'id': 4, 'stock': 75}]
+    assert data['total'] == 5
+
+    cursor = data['next_cursor']
+    data = client.get(f'/api/products?limit=2&sort=-stock&fields=id&cursor={cursor}').get_json()
+    assert data['products'] == [{'id': 5}, {'id': 2}]
+    # A cursor only resumes the order it came from
+    assert client.get(f'/api/products?limit=2&sort=stock&cursor={cursor}').status_code == 400
+
+    data = client.get('/api/products?category=Electronics&status=Low%20Stock').get_json()
+    assert [p['sku'] for p in data['products']] == ['LED-10W-001', 'MSE-WRL-001']
+    assert data['next_cursor'] is None
+
+    assert client.get('/api/products?fields=secret').status_code == 400
+    assert client.get('/api/products?cursor=garbage').status_code == 400
+    for key in (['stock', False, 'abc', 3], ['stock', False, 5, True], ['name', 0, 'Silk', 4]):
+        cursor = encode_cursor(key[0], key[1:])
+        assert client.get(f'/api/products?sort={key[0]}&cursor={cursor}').status_code == 400
+    assert client.get('/api/products?sort=status').status_code == 400
+    assert client.get('/api/products?limit=0').status_code == 400
+
+
+def test_product_listing_etag_and_gzip(client):
+    """Unchanged pages revalidate with 304 and writes change the ETag"""
+    response = client.get('/api/products')
+    etag = response.headers['ETag']
+    assert client.get('/api/products', headers={'If-None-Match': etag}).status_code == 304
+
+    client.put('/api/products/1/stock', json={'adjustment': -1})
+    response = client.get('/api/products', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['products'][0]['stock'] == 149
+
+    response = client.get('/api/products', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data).startswith(b'{"products":')
+
+
+def test_dashboard_reads_live_totals(client):
+    """Dashboard figures change as soon as stock moves"""
+    totals = client.get('/api/dashboard').get_json()
+    assert totals['inventory_value'] == 7990.0
+    assert totals['low_stock_count'] == 2
+    assert b'7,990.00 MAD' in client.get('/').data
+
+    client.post('/api/sales', json={'items': [{'product_id': 5, 'quantity': 8}]})
+    totals = client.get('/api/dashboard').get_json()
+    assert totals['inventory_value'] == 7990.0 - 8 * 80.0
+    assert totals['low_stock_count'] == 1
+    assert totals['out_of_stock_count'] == 2
+    assert totals['total_sales'] == 1
+    assert b'7,350.00 MAD' in client.get('/').data
+
+
+def test_forecast_endpoint(client):
+    """The forecast endpoint serves any category in the chart shape"""
+    data = client.get('/api/forecast/Tools').get_json()
+    assert len(data['labels']) == 60
+    assert len(data['forecast']) == 30
+
+
+def test_forecast_uses_recorded_sales(client):
+    """Once a category has sales its forecast comes from the fitted model"""
+    assert client.get('/api/forecast/textiles').get_json()['model'] == 'synthetic'
+    client.post('/api/sales', json={'items': [{'product_id': 1, 'quantity': 4}]})
+    data = client.get('/api/forecast/textiles').get_json()
+    assert data['model'] == 'holt-winters'
+    assert data['historical'][-1] == 4
+    assert client.get('/api/forecast/sku/CTN-BLU-001').get_json()['model'] == 'holt-winters'
+    assert client.get('/api/forecast/sku/NOPE').status_code == 404
+
+
+def test_forecasts_are_cached_until_a_sale(client):
+    """Repeated reads hit the cache and a sale in the series invalidates it"""
+    first = client.get('/api/forecast/electronics').data
+    assert client.get('/api/forecast/electronics').data == first
+    assert client.get('/api/forecast/cache/stats').get_json()['hits'] == 1
+
+    client.post('/api/sales', json={'items': [{'product_id': 2, 'quantity': 1}]})
+    assert client.get('/api/forecast/electronics').get_json()['model'] == 'holt-winters'
+    stats = client.get('/api/forecast/cache/stats').get_json()
+    assert stats['misses'] == 2
+    assert stats['invalidations'] == 1
+
+
+def test_abc_classification_endpoint(client, deploy):
+    """Sales move products into classes and a restart rebuilds them from the ledger"""
+    client.post('/api/sales', json={'items': [{'product_id': 1, 'quantity': 10},
+                                              {'product_id': 2, 'quantity': 1}]})
+    data = client.get('/api/analytics/abc').get_json()
+    assert data['period_days'] == 90
+    assert data['products'][0] == {'sku': 'CTN-BLU-001', 'class': 'A', 'revenue': 255.0}
+    assert data['summary']['B']['count'] == 1
+    assert data['summary']['C']['count'] == 3
+    assert [row['sku'] for row in client.get('/api/analytics/abc?class=A').get_json()['products']] == ['CTN-BLU-001']
+    assert client.get('/api/analytics/abc?class=D').status_code == 400
+
+    revenue = deploy.abc_analyzer.revenue()
+    restarted = importlib.reload(deploy)
+    assert restarted.abc_analyzer.revenue() == revenue
+
+
+def test_abc_classification_skips_products_without_sku(client, deploy):
+    """A SKU-less product, sold or not, does not break the ranking"""
+    product = deploy.store.add({'name': 'Loose Mint', 'sku': None, 'category': 'Food',
+                                'stock': 10, 'price': 5, 'cost': 2})
+    client.post('/api/sales', json={'items': [{'product_id': product['id'], 'quantity': 1}]})
+    response = client.get('/api/analytics/abc')
+    assert response.status_code == 200
+    assert None not in [row['sku'] for row in response.get_json()['products']]
+
+
+def test_replenishment_endpoint(client):
+    """Products at their reorder point are reported, with demand from recorded sales"""
+    data = client.get('/api/replenishment').get_json()
+    assert [row['sku'] for row in data['products']] == ['CHR-OFF-001', 'LED-10W-001']
+    client.post('/api/sales', json={'items': [{'product_id': 1, 'quantity': 20}]})
+    rows = {row['sku']: row for row in client.get('/api/replenishment?all=1').get_json()['products']}
+    assert rows['CTN-BLU-001']['daily_demand'] == 20
+    assert rows['CTN-BLU-001']['reorder_point'] == 20 * 7 + 5
+    assert len(rows) == 5
+    assert client.get('/api/replenishment?limit=x').status_code == 400
+    assert client.get('/api/replenishment?limit=-1').status_code == 400
+
+
+def test_alerts_endpoint(client):
+    """Products below normal are listed and crossings show up as recent alerts"""
+    data = client.get('/api/alerts').get_json()
+    assert [row['sku'] for row in data['attention']] == ['CHR-OFF-001', 'LED-10W-001', 'MSE-WRL-001']
+    assert data['recent'] == []
+
+    client.post('/api/products', json={'name': 'Cedar Box', 'sku': 'CDR-BOX-001', 'category': 'Woodwork',
+                                       'stock': 30, 'price': 120, 'cost': 70, 'reorder_level': 25})
+    client.post('/api/sales', json={'items': [{'product_id': 6, 'quantity': 10}]})
+    recent = client.get('/api/alerts').get_json()['recent']
+    assert [(row['sku'], row['from'], row['to']) for row in recent] == [('CDR-BOX-001', 'normal', 'low')]
+    assert client.get('/api/alerts?limit=-1').status_code == 400
+
+
+def test_search_endpoint(client):
+    """SKU prefixes and accent-insensitive names are searched, one page at a time"""
+    data = client.get('/api/products/search?q=fabric&per_page=1').get_json()
+    assert data['total'] == 2
+    assert [product['sku'] for product in data['products']] == ['SLK-RED-001']
+    data = client.get('/api/products/search?q=fabric&per_page=1&page=2').get_json()
+    assert [product['sku'] for product in data['products']] == ['CTN-BLU-001']
+
+    client.post('/api/products', json={'name': 'Crème Éclat', 'sku': 'CRM-ECL-001', 'category': 'Cosmetics',
+                                       'stock': 10, 'price': 50, 'cost': 20})
+    data = client.get('/api/products/search?q=eclat').get_json()
+    assert [product['sku'] for product in data['products']] == ['CRM-ECL-001']
+    assert client.get('/api/products/search?q=ctn-').get_json()['total'] == 1
+    assert client.get('/api/products/search?q=x&page=two').status_code == 400
+
+
+def test_events_stream(client, deploy):
+    """The SSE endpoint pushes changes and unsubscribes when the client leaves"""
+    response = client.get('/api/events')
+    assert response.mimetype == 'text/event-stream'
+    messages = iter(response.response)
+    assert next(messages).startswith(b'retry:')
+    assert deploy.event_hub.subscriber_count == 1
+
+    client.put('/api/products/1/stock', json={'adjustment': -10})
+    message = next(messages).decode()
+    assert message.startswith('event: stock\n')
+    assert json.loads(message.split('data: ')[1])['delta'] == -10
+    response.close()
+    assert deploy.event_hub.subscriber_count == 0
+
+
+def test_events_stream_refused_when_full(client, deploy, monkeypatch):
+    """Dashboards beyond the stream limit get a 503 instead of a thread"""
+    monkeypatch.setattr(deploy.event_hub, 'max_subscribers', 0)
+    response = client.get('/api/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '60'
+    assert deploy.event_hub.subscriber_count == 0
+
+
+def test_bulk_stock_endpoint(client, deploy):
+    """A delivery of many SKUs is applied in one request"""
+    response = client.put('/api/products/stock', json={'adjustments': [
+        {'sku': 'CHR-OFF-001', 'adjustment': 30},
+        {'product_id': 5, 'adjustment': 40},
+        {'product_id': 99, 'adjustment': 1},
+    ]})
+    data = response.get_json()
+    assert (data['applied'], data['failed']) == (2, 1)
+    assert deploy.store.get(3)['status'] == 'Normal'
+    assert client.get('/api/dashboard').get_json()['low_stock_count'] == 1
+    assert client.put('/api/products/stock', json={'adjustments': 'x'}).status_code == 400
+
+
+def test_import_endpoint_streams_progress(client, deploy):
+    """An uploaded CSV is imported and progress is streamed as NDJSON"""
+    csv_file = (io.BytesIO(b'sku,name,category,stock,price,cost\nNEW-001,New,Tools,30,10,5\n'), 'catalog.csv')
+    response = client.post('/api/products/import?progress=1', data={'file': csv_file},
+                           content_type='multipart/form-data')
+    events = [json.loads(line) for line in response.data.splitlines()]
+    assert events[-1]['done'] and events[-1]['created'] == 1
+    assert deploy.store.get_by_sku('NEW-001')['category'] == 'Tools'
+
+    bad = (io.BytesIO(b'a,b\n1,2\n'), 'catalog.csv')
+    response = client.post('/api/products/import', data={'file': bad},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    response = client.post('/api/products/import', data={'file': (io.BytesIO(b''), 'x.pdf')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+
+
+def test_exports_stream_products_and_sales(client):
+    """Products and sales export as NDJSON or CSV with filters"""
+    lines = client.get('/api/export/products?category=Electronics').data.splitlines()
+    assert [json.loads(line)['sku'] for line in lines] == ['LED-10W-001', 'MSE-WRL-001']
+
+    csv_text = client.get('/api/export/products?format=csv').data.decode()
+    assert csv_text.splitlines()[0] == 'id,sku,name,category,stock,price,cost,status'
+    assert len(csv_text.splitlines()) == 6
+
+    sale = client.post('/api/sales', json={'items': [{'product_id': 1, 'quantity': 2}]}).get_json()['sale']
+    client.post('/api/sales', json={'items': [{'product_id': 2, 'quantity': 1}]})
+    rows = [json.loads(line) for line in client.get('/api/export/sales?category=Textiles').data.splitlines()]
+    assert [(row['id'], row['items']) for row in rows] == [(sale['id'], 2)]
+    assert client.get('/api/export/sales?to=2000-01-01').data == b''
+    assert client.get('/api/export/sales?from=yesterday').status_code == 400
+    assert client.get('/api/export/sales?format=xml').status_code == 400
+
+
+def test_state_survives_restart(deploy, client):
+    """Journaled products, stock changes and sales are restored on reload"""
+    client.post('/api/products', json={
+        'name': 'Cedar Box', 'sku': 'CDR-BOX-001', 'category': 'Woodwork',
+        'stock': 8, 'price': 120, 'cost': 70
+    })
+    client.put('/api/products/1/stock', json={'adjustment': 5})
+    sale = client.post('/api/sales', json={'items': [{'product_id': 1, 'quantity': 2}]}).get_json()
+    sku_key = deploy.DemandForecaster.sku_key(deploy.SAMPLE_PRODUCTS[0]['sku'])
+    demand = deploy.demand_forecaster.forecast(sku_key)['historical'][-1]
+
+    restarted = importlib.reload(deploy)
+    assert restarted.demand_forecaster.forecast(sku_key)['historical'][-1] == demand == 2
+    assert restarted.store.get_by_sku('CDR-BOX-001')['stock'] == 8
+    assert restarted.store.get(1)['stock'] == deploy.SAMPLE_PRODUCTS[0]['stock'] + 3
+    assert [s['id'] for s in restarted.sales] == [sale['sale']['id']]
+    next_sale = restarted.sale_engine.process([{'product_id': 1, 'quantity': 1}])
+    assert next_sale['id'] > sale['sale']['id']
+    assert next_sale['sale_number'] != sale['sale']['sale_number']
+
+
+def test_shared_state_backend(tmp_path, monkeypatch):
+    """With STATE_BACKEND=sqlite a new worker starts from the shared database"""
+    from config import Config
+    monkeypatch.setattr(Config, 'STATE_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'SHARED_STATE_PATH', str(tmp_path / 'inventory.db'))
+    import app_deploy
+    worker = importlib.reload(app_deploy)
+    response = worker.app.test_client().post('/api/sales', json={'items': [{'product_id': 2, 'quantity': 1}]})
+    assert response.status_code == 200
+
+    worker = importlib.reload(app_deploy)
+    client = worker.app.test_client()
+    assert worker.store.get(2)['stock'] == worker.SAMPLE_PRODUCTS[1]['stock'] - 1
+    assert client.get('/api/dashboard').get_json()['total_sales'] == 1
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized forecast engine
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from forecasting import ForecastEngine, DemandForecaster
+
+TODAY = datetime(2024, 3, 15)
+
+
+def test_forecast_shape_matches_api():
+    """A single forecast has 60 labels, 30 history and 30 forecast points"""
+    data = ForecastEngine(seed=1).forecast('textiles', TODAY)
+    assert set(data) == {'labels', 'historical', 'forecast', 'confidence_upper', 'confidence_lower'}
+    assert len(data['labels']) == 60
+    assert data['labels'][29] == 'Mar 15'
+    assert data['labels'][30] == 'Mar 16'
+    assert len(data['historical']) == len(data['forecast']) == 30
+    assert all(lo <= f <= hi for lo, f, hi in
+               zip(data['confidence_lower'], data['forecast'], data['confidence_upper']))
+
+
+def test_seeded_forecasts_are_deterministic():
+    """The same seed gives the same numbers; no seed varies"""
+    assert ForecastEngine(seed=7).forecast('Electronics', TODAY) == \
+        ForecastEngine(seed=7).forecast('Electronics', TODAY)
+    assert ForecastEngine(seed=7).forecast('Electronics', TODAY) != \
+        ForecastEngine(seed=8).forecast('Electronics', TODAY)
+
+
+def test_batch_covers_thousands_of_series():
+    """One batched call produces every series at once"""
+    categories = [f'category-{i}' for i in range(5000)] + ['textiles']
+    batch = ForecastEngine(seed=3).forecast_batch(categories, TODAY)
+    assert batch['historical'].shape == (5001, 30)
+    assert batch['forecast'].shape == (5001, 30)
+    assert (batch['confidence_lower'] >= 0).all()
+    # Textiles demand is centred on its higher baseline
+    assert batch['historical'][-1].mean() > np.median(batch['historical'][:-1].mean(axis=1))
+
+
+def test_holt_winters_learns_weekly_pattern():
+    """A repeating weekly demand pattern is carried into the forecast"""
+    forecaster = DemandForecaster()
+    start = datetime(2024, 1, 1)  # a Monday
+    pattern = [20, 22, 21, 23, 30, 5, 4]
+    for day in range(12 * 7):
+        forecaster.record('sku:CTN-BLU-001', pattern[day % 7], start + timedelta(days=day))
+
+    today = start + timedelta(days=12 * 7)
+    data = forecaster.forecast('sku:CTN-BLU-001', today)
+    weekly = data['forecast'][:7]
+    # Tomorrow is a Tuesday; weekend days stay far below weekdays
+    assert weekly[0] == pytest.approx(22, abs=3)
+    assert max(weekly[4], weekly[5]) < min(weekly[0], weekly[1], weekly[2])
+    assert data['historical'][-2] == 4  # yesterday (Sunday) closed day
+    assert len(data['forecast']) == 30
+
+
+def test_record_sale_updates_sku_and_category():
+    """Sales feed both the SKU and the category series"""
+    forecaster = DemandForecaster()
+    product = {'sku': 'LED-10W-001', 'category': 'Electronics'}
+    forecaster.record_sale({'date': TODAY.isoformat()}, [(product, 3)])
+    assert 'sku:LED-10W-001' in forecaster
+    assert forecaster.category_key('electronics') in forecaster
+    data = forecaster.forecast('category:electronics', TODAY)
+    assert data['historical'][-1] == 3
+
+    forecaster.record_sale({'date': TODAY.isoformat()}, [({'sku': 'LOOSE-001', 'category': None}, 1)])
+    assert forecaster.category_key(None) in forecaster
+
+
+def test_replay_rebuilds_models_from_ledger_sales():
+    """Replayed ledger sales give the same series as live sales"""
+    sales = [{'date': (TODAY - timedelta(days=day)).isoformat(),
+              'items': [{'product_id': 1, 'sku': 'LED-10W-001', 'quantity': day + 1, 'price': 20},
+                        {'product_id': 9, 'sku': 'OLD-SKU', 'quantity': 1, 'price': 5}]}
+             for day in range(14, -1, -1)]
+    replayed = DemandForecaster()
+    replayed.replay(sales, {'LED-10W-001': 'Electronics'})
+    live = DemandForecaster()
+    for sale in sales:
+        live.record_sale(sale, [({'sku': 'LED-10W-001', 'category': 'Electronics'}, sale['items'][0]['quantity'])])
+
+    assert 'sku:OLD-SKU' in replayed
+    for key in ('sku:LED-10W-001', 'category:electronics'):
+        assert replayed.forecast(key, TODAY) == live.forecast(key, TODAY)
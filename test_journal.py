@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the write-ahead journal and snapshots (journal.py)
+"""
+
+import os
+import threading
+
+from inventory_store import ProductStore
+from journal import Journal, LOG_PREFIX, SNAPSHOT_PREFIX
+from sales_engine import SaleEngine
+
+
+def make_products():
+    return [
+        {'name': 'Argan Oil', 'sku': 'ARG-001', 'category': 'Cosmetics', 'stock': 40, 'price': 90, 'cost': 50},
+        {'name': 'Mint Tea', 'sku': 'TEA-001', 'category': 'Food', 'stock': 25, 'price': 30, 'cost': 12},
+    ]
+
+
+def open_journal(directory, **options):
+    """Start a process' worth of state on top of a journal directory"""
+    store = ProductStore(make_products())
+    engine = SaleEngine(store)
+    journal = Journal(str(directory), store, engine, **options)
+    summary = journal.recover()
+    return store, engine, journal, summary
+
+
+def test_recover_replays_log(tmp_path):
+    """Products, adjustments, imports and sales are rebuilt from the log"""
+    store, engine, journal, _ = open_journal(tmp_path)
+    store.add({'name': 'Cedar Box', 'sku': 'CDR-001', 'category': 'Woodwork',
+               'stock': 8, 'price': 120, 'cost': 70})
+    store.adjust_stock(1, -5)
+    store.bulk_adjust([{'sku': 'TEA-001', 'adjustment': 10}])
+    store.bulk_upsert([{'name': 'Mint Tea (Large)', 'sku': 'TEA-001', 'category': 'Food',
+                        'stock': 50, 'price': 45, 'cost': 18}])
+    sale = engine.process([{'product_id': 1, 'quantity': 3}, {'product_id': 3, 'quantity': 1}])
+    journal.close()
+
+    store, engine, _, summary = open_journal(tmp_path)
+    # Five mutations and the lease of a sale number block
+    assert summary == {'snapshot_lsn': 0, 'replayed': 6}
+    assert store.get(1)['stock'] == 32
+    assert store.get_by_sku('TEA-001')['name'] == 'Mint Tea (Large)'
+    assert store.get_by_sku('CDR-001')['stock'] == 7
+    assert store.aggregates.total_units == 32 + 50 + 7
+    assert list(engine.sales) == [sale]
+    next_sale = engine.process([{'product_id': 2, 'quantity': 1}])
+    assert next_sale['id'] > sale['id']
+    # The rest of the leased number block is skipped rather than reused
+    assert next_sale['sale_number'] == sale['sale_number'][:9] + '101'
+
+
+def test_snapshot_limits_replay_to_log_tail(tmp_path):
+    """After a checkpoint only later records are replayed and old logs are gone"""
+    store, engine, journal, _ = open_journal(tmp_path)
+    for _ in range(5):
+        engine.process([{'product_id': 1, 'quantity': 1}])
+    lsn = journal.checkpoint()
+    store.adjust_stock(2, -4)
+    journal.close()
+
+    names = os.listdir(tmp_path)
+    assert f'{SNAPSHOT_PREFIX}{lsn:016d}.ndjson.gz' in names
+    assert not any(name.startswith(LOG_PREFIX) and int(name[4:20]) <= lsn for name in names)
+
+    store, engine, _, summary = open_journal(tmp_path)
+    assert summary == {'snapshot_lsn': 6, 'replayed': 1}
+    assert store.get(1)['stock'] == 35
+    assert store.get(2)['stock'] == 21
+    assert len(engine.sales) == 5
+
+
+def test_torn_tail_is_discarded(tmp_path):
+    """A half-written last record is dropped and logging continues after it"""
+    store, _, journal, _ = open_journal(tmp_path)
+    store.adjust_stock(1, -1)
+    store.adjust_stock(1, -1)
+    journal.close()
+    (log,) = [name for name in os.listdir(tmp_path) if name.startswith(LOG_PREFIX)]
+    with open(tmp_path / log, 'r+b') as f:
+        f.truncate(os.path.getsize(tmp_path / log) - 5)
+
+    store, _, journal, summary = open_journal(tmp_path)
+    assert summary['replayed'] == 1
+    assert store.get(1)['stock'] == 39
+    store.adjust_stock(1, -10)
+    journal.close()
+
+    store, _, _, summary = open_journal(tmp_path)
+    assert summary['replayed'] == 2
+    assert store.get(1)['stock'] == 29
+
+
+def test_concurrent_sales_are_all_durable(tmp_path):
+    """Group-committed sales from many threads all survive a restart"""
+    store, engine, journal, _ = open_journal(tmp_path, snapshot_interval=50)
+
+    def sell():
+        for _ in range(20):
+            engine.process([{'product_id': 1, 'quantity': 1}])
+
+    threads = [threading.Thread(target=sell) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with journal._checkpoint_lock:
+        journal.close()
+
+    store, engine, _, _ = open_journal(tmp_path)
+    assert store.get(1)['stock'] == 0
+    assert len({sale['id'] for sale in engine.sales}) == 40
+    assert len({sale['sale_number'] for sale in engine.sales}) == 40
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for live change events (live_events.py)
+"""
+
+from inventory_store import ProductStore
+from live_events import EventHub, Subscription, stream
+from sales_engine import SaleEngine
+from stock_alerts import AlertEngine
+
+
+def test_queue_coalesces_by_product():
+    """Stock deltas and alerts about one product merge; sales stay separate"""
+    queue = Subscription(maxsize=10)
+    queue.offer('stock', 1, {'product_id': 1, 'stock': 8, 'delta': -2})
+    queue.offer('sale', 100, {'id': 100})
+    queue.offer('stock', 1, {'product_id': 1, 'stock': 5, 'delta': -3})
+    queue.offer('alert', 1, {'from': 'normal', 'to': 'low'})
+    queue.offer('alert', 1, {'from': 'low', 'to': 'critical'})
+    queue.offer('sale', 101, {'id': 101})
+    assert queue.get(0) == [
+        ('stock', {'product_id': 1, 'stock': 5, 'delta': -5}),
+        ('sale', {'id': 100}),
+        ('alert', {'from': 'normal', 'to': 'critical'}),
+        ('sale', {'id': 101}),
+    ]
+    assert queue.get(0) == []
+
+
+def test_overflowing_queue_asks_for_resync():
+    """A client too far behind gets one resync event instead of a backlog"""
+    queue = Subscription(maxsize=3)
+    for sale_id in range(5):
+        queue.offer('sale', sale_id, {'id': sale_id})
+    assert len(queue) == 1
+    assert queue.get(0) == [('resync', {})]
+    queue.offer('sale', 9, {'id': 9})
+    assert queue.get(0) == [('sale', {'id': 9})]
+
+
+def test_hub_publishes_store_sale_and_alert_events():
+    """A sale produces its stock delta, the sale and the level crossing"""
+    store = ProductStore([{'name': 'Mint Tea', 'sku': 'TEA-001', 'category': 'Food',
+                           'stock': 12, 'price': 30, 'cost': 12}])
+    engine = SaleEngine(store)
+    alerts = AlertEngine()
+    alerts.attach(store)
+    hub = EventHub()
+    hub.attach(store, engine, alerts)
+    subscription = hub.subscribe()
+
+    sale = engine.process([{'product_id': 1, 'quantity': 4}])
+    events = dict(subscription.get(0))
+    assert events['stock'] == {'product_id': 1, 'sku': 'TEA-001', 'stock': 8, 'delta': -4, 'status': 'Low Stock'}
+    assert events['sale']['sale_number'] == sale['sale_number']
+    assert events['alert'] == {'product_id': 1, 'sku': 'TEA-001', 'from': 'normal', 'to': 'low', 'stock': 8}
+
+    hub.unsubscribe(subscription)
+    store.adjust_stock(1, 5)
+    assert subscription.get(0) == []
+
+
+def test_hub_refuses_subscribers_beyond_its_limit():
+    """A full hub returns None until a subscriber leaves"""
+    hub = EventHub(max_subscribers=1)
+    first = hub.subscribe()
+    assert hub.subscribe() is None
+    hub.unsubscribe(first)
+    assert hub.subscribe() is not None
+
+
+def test_stream_sends_heartbeats_and_events():
+    """An idle stream emits keep-alive comments; events go out as SSE messages"""
+    subscription = Subscription()
+    polls = []
+    messages = stream(subscription, heartbeat=0.02, poll=0.01, on_poll=lambda: polls.append(1))
+    assert next(messages).startswith('retry:')
+    assert next(messages) == ': heartbeat\n\n'
+    subscription.offer('sale', 1, {'id': 1})
+    assert next(messages) == 'event: sale\ndata: {"id":1}\n\n'
+    assert len(polls) >= 3
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the read-through model cache (model_cache.py)
+"""
+
+import pytest
+from sqlalchemy import ForeignKey, String, create_engine, event, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+
+from model_cache import ModelCache
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Category(Base):
+    __tablename__ = 'categories'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String(50), unique=True)
+
+
+class Product(Base):
+    __tablename__ = 'products'
+    id: Mapped[int] = mapped_column(primary_key=True)
+    sku: Mapped[str] = mapped_column(String(20), unique=True)
+    name: Mapped[str] = mapped_column(String(100))
+    stock: Mapped[int]
+    category_id: Mapped[int] = mapped_column(ForeignKey('categories.id'))
+
+
+@pytest.fixture
+def db():
+    """An in-memory database with a session factory, a cache and a query counter"""
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    with Session() as session:
+        session.add(Category(id=1, name='Textiles'))
+        session.add_all([Product(id=1, sku='CTN-BLU-001', name='Cotton Fabric', stock=150, category_id=1),
+                         Product(id=2, sku='WOL-RED-001', name='Wool Yarn', stock=4, category_id=1)])
+        session.commit()
+    cache = ModelCache(ttls={'Product': 60})
+    cache.install(Session)
+    queries = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+    return Session, cache, queries
+
+
+def test_hits_skip_the_database(db):
+    """Repeated lookups by id, unique column and named list run SQL once"""
+    Session, cache, queries = db
+    low_stock = select(Product).where(Product.stock < 10)
+    for _ in range(3):
+        with Session() as session:
+            assert cache.get(session, Product, 1).name == 'Cotton Fabric'
+            assert cache.get_by(session, Product, sku='WOL-RED-001').id == 2
+            assert cache.get_by(session, Category, name='Textiles').id == 1
+            assert [p.sku for p in cache.query(session, Product, 'low_stock', low_stock)] == ['WOL-RED-001']
+    assert len(queries) == 4
+    assert cache.stats()['hits'] == 8
+
+
+def test_commit_invalidates_rows_and_lists(db):
+    """Committed changes drop the touched rows and the model's lists"""
+    Session, cache, queries = db
+    low_stock = select(Product).where(Product.stock < 10).order_by(Product.id)
+    with Session() as session:
+        cache.get(session, Product, 1)
+        cache.get(session, Category, 1)
+        cache.query(session, Product, 'low_stock', low_stock)
+
+    with Session() as session:
+        product = cache.get(session, Product, 1)
+        product.stock = 3
+        session.add(Product(id=3, sku='SLK-001', name='Silk', stock=2, category_id=1))
+        session.commit()
+
+    with Session() as session:
+        assert cache.get(session, Product, 1).stock == 3
+        assert [p.id for p in cache.query(session, Product, 'low_stock', low_stock)] == [1, 2, 3]
+        count = len(queries)
+        assert cache.get(session, Category, 1).name == 'Textiles'
+        assert len(queries) == count
+
+
+def test_rollback_keeps_cache(db):
+    """Flushed changes that are rolled back do not invalidate anything"""
+    Session, cache, queries = db
+    with Session() as session:
+        cache.get(session, Product, 2)
+    with Session() as session:
+        session.get(Product, 2).stock = 99
+        session.flush()
+        session.rollback()
+    count = len(queries)
+    with Session() as session:
+        assert cache.get(session, Product, 2).stock == 4
+    assert len(queries) == count
+
+
+def test_pending_changes_are_not_overwritten(db):
+    """A cached read returns the session's own modified instance"""
+    Session, cache, _ = db
+    with Session() as session:
+        cache.get(session, Product, 1)
+    with Session() as session:
+        product = session.get(Product, 1)
+        product.stock = 7
+        assert cache.get(session, Product, 1) is product
+        assert product.stock == 7
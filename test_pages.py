@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled, cached HTML pages
+"""
+
+import gzip
+
+from flask import Flask
+
+from template_cache import CompiledPage
+
+
+def test_page_rerenders_only_on_new_version():
+    """Context is evaluated once per data version"""
+    app = Flask(__name__)
+    page = CompiledPage(app, '<p>{{ count }}</p>')
+    calls = []
+
+    def context():
+        calls.append(1)
+        return {'count': len(calls)}
+
+    entry, etag = page.render(1, context)
+    assert entry.body == b'<p>1</p>'
+    assert page.render(1, context) == (entry, etag)
+    entry, new_etag = page.render(2, context)
+    assert entry.body == b'<p>2</p>'
+    assert new_etag != etag
+    assert len(calls) == 2
+
+
+def test_pages_are_served_compressed_with_etags():
+    """Every app serves its main page gzipped and revalidates it with 304"""
+    import app as main_app
+    import app_deploy
+    import demo_app
+
+    for flask_app in (main_app.app, app_deploy.app, demo_app.app):
+        with flask_app.test_client() as client:
+            response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert b'SIMS' in gzip.decompress(response.data)
+
+            etag = response.headers['ETag']
+            response = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+            assert response.status_code == 304
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar product table
+"""
+
+import json
+
+import pytest
+
+from inventory_store import (DuplicateSKUError, PRODUCT_FIELDS, STATUS_LOW, STATUS_NORMAL, STATUS_OUT,
+                             stock_status)
+from product_table import ProductTable
+
+
+def make_table():
+    return ProductTable([
+        {'id': 1, 'name': 'Cotton Fabric - Blue', 'sku': 'CTN-BLU-001', 'category': 'Textiles',
+         'stock': 150, 'price': 25.50, 'cost': 18.00},
+        {'id': 2, 'name': 'Théière en argent', 'sku': 'TEA-POT-001', 'category': 'Handicrafts',
+         'stock': 5, 'price': 45.00, 'cost': 30.00},
+        {'id': 3, 'name': 'Office Chair Premium', 'sku': 'CHR-OFF-001', 'category': 'Textiles',
+         'stock': 0, 'price': 350.00, 'cost': 250.00},
+    ], capacity=2)
+
+
+def test_rows_serialize_like_product_dicts():
+    """Row views have the dict products' fields, types and JSON shape"""
+    table = make_table()
+    row = table.get(2)
+    assert list(row) == list(PRODUCT_FIELDS)
+    assert row.as_dict() == {
+        'id': 2, 'name': 'Théière en argent', 'sku': 'TEA-POT-001', 'category': 'Handicrafts',
+        'stock': 5, 'price': 45.0, 'cost': 30.0, 'status': STATUS_LOW
+    }
+    assert json.loads(json.dumps(row.as_dict())) == dict(row)
+    assert table.get_by_sku('CHR-OFF-001')['status'] == STATUS_OUT
+    assert table.get(99) is None
+
+
+def test_writes_go_to_the_columns():
+    """Setting stock updates the status code; names and categories can change"""
+    table = make_table()
+    row = table.get(1)
+    row['stock'] = 3
+    row['name'] = 'Cotton Fabric - Navy'
+    row['category'] = 'Fabrics'
+    assert table.get(1)['status'] == STATUS_LOW
+    assert table.get(1)['name'] == 'Cotton Fabric - Navy'
+    assert [r['id'] for r in table.in_category('Fabrics')] == [1]
+    table.compact()
+    assert [r['name'] for r in table][:2] == ['Cotton Fabric - Navy', 'Théière en argent']
+    with pytest.raises(KeyError):
+        row['id'] = 7
+
+
+def test_bulk_adjust_and_totals():
+    """Vectorized adjustments clamp at zero and totals match the rows"""
+    table = make_table()
+    table.adjust_stock([0, 1], [-200, 20])
+    assert [r['stock'] for r in table] == [0, 25, 0]
+    assert [r['id'] for r in table.with_status(STATUS_OUT)] == [1, 3]
+    assert table.totals() == {
+        'total_products': 3, 'total_units': 25, 'inventory_value': 750.0,
+        'retail_value': 1125.0, 'low_stock_count': 0, 'out_of_stock_count': 2
+    }
+
+
+def test_append_checks_ids_and_skus():
+    """New rows get the next id; duplicate SKUs and decreasing ids are rejected"""
+    table = make_table()
+    assert table.append({'name': 'Lamp', 'sku': 'LMP-001', 'category': 'Home',
+                         'stock': 9, 'price': 80, 'cost': 40})['id'] == 4
+    with pytest.raises(DuplicateSKUError):
+        table.append({'name': 'Lamp', 'sku': 'LMP-001', 'category': 'Home',
+                      'stock': 1, 'price': 1, 'cost': 1})
+    with pytest.raises(ValueError):
+        table.append({'id': 2, 'name': 'Rug', 'sku': 'RUG-001', 'category': 'Home',
+                      'stock': 1, 'price': 1, 'cost': 1})
+    assert len(table) == 4
+
+
+def test_status_follows_each_products_reorder_level():
+    """Rows use the store's status rule with their own reorder level"""
+    table = ProductTable([{'name': 'Mint Tea', 'sku': 'TEA-001', 'category': 'Food', 'stock': 30,
+                           'reorder_level': 50, 'price': 30, 'cost': 12}])
+    row = table.get(1)
+    assert row['status'] == stock_status(30, 50) == STATUS_LOW
+    table.adjust_stock([0], [25])
+    assert row['status'] == STATUS_NORMAL
+    table.set_value(0, 'reorder_level', 60)
+    assert row['status'] == STATUS_LOW
+    assert table.totals()['low_stock_count'] == 1
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for batch replenishment planning (replenishment.py)
+"""
+
+import math
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from replenishment import ReplenishmentEngine, columns_from_rows, load_columns
+
+
+def test_plan_matches_the_textbook_formulas():
+    """EOQ, safety stock and reorder point per SKU, with fallbacks for missing inputs"""
+    engine = ReplenishmentEngine(ordering_cost=100, holding_rate=0.25, service_z=1.65,
+                                 lead_time_days=7, safety_stock=5)
+    columns = columns_from_rows([
+        ('OIL', 40, 60.0, 10.0, 2.0, 4),
+        ('TEA', 500, 12.0, 3.0, None, None),
+        ('BOX', 2, 0.0, 0.0, None, 10),
+    ])
+    plan = engine.plan(columns)
+    assert plan['eoq'][0] == pytest.approx(math.sqrt(2 * 3650 * 100 / 15))
+    assert plan['safety_stock'].tolist() == pytest.approx([1.65 * 2 * 2, 5, 5])
+    assert plan['reorder_point'].tolist() == pytest.approx([40 + 6.6, 21 + 5, 5])
+    assert plan['reorder'].tolist() == [True, False, True]
+    # No holding cost: order just the shortfall
+    assert plan['eoq'][2] == 0
+    assert plan['order_quantity'][2] == 3
+
+
+def test_report_sorts_by_days_of_cover():
+    """Only products at their reorder point are listed, the least covered first"""
+    engine = ReplenishmentEngine()
+    columns = {
+        'sku': np.array(['A', 'B', 'C', 'D'], dtype=object),
+        'stock': np.array([30, 5, 12, 3]),
+        'cost': np.array([10, 10, 10, 10]),
+        'daily_demand': np.array([10, 5, 0.5, 0]),
+    }
+    report = engine.report(columns)
+    assert [row['sku'] for row in report] == ['B', 'A', 'D']
+    assert report[0]['days_of_cover'] == 1.0
+    assert report[-1]['days_of_cover'] is None
+    assert [row['sku'] for row in engine.report(columns, include_all=True, limit=2)] == ['B', 'A']
+
+
+def test_columns_load_in_one_query():
+    """Demand, cost and lead time columns come from a single SELECT with NULLs as fallbacks"""
+    db = create_engine('sqlite://')
+    with Session(db) as session:
+        session.execute(text('CREATE TABLE products (sku TEXT, stock INT, cost REAL, '
+                             'daily_demand REAL, lead_time_days INT)'))
+        session.execute(text("INSERT INTO products VALUES ('OIL', 5, 60, 4, NULL), ('TEA', 90, 12, 1, 3)"))
+        columns = load_columns(session, text('SELECT sku, stock, cost, daily_demand, NULL, lead_time_days '
+                                             'FROM products ORDER BY sku'))
+    plan = ReplenishmentEngine(lead_time_days=7, safety_stock=5).plan(columns)
+    assert plan['lead_time_days'].tolist() == [7, 3]
+    assert plan['reorder_point'].tolist() == [33, 8]
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the sale id allocator (sale_ids.py)
+"""
+
+import threading
+
+import pytest
+
+from sale_ids import (EPOCH_SECONDS, MAX_SEQUENCE, NumberBlocks, SaleIdAllocator,
+                      issued_at, split_id, worker_id)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_ids_are_time_ordered_and_carry_the_worker():
+    """Ids sort by second and decode to their worker and time"""
+    clock = FakeClock(EPOCH_SECONDS + 1000)
+    ids = SaleIdAllocator(worker_id(2, 5), clock=clock)
+    first, second = ids.next_id(), ids.next_id()
+    clock.now += 1
+    third = ids.next_id()
+    assert first < second < third < 2 ** 53
+    assert split_id(first) == (1000, worker_id(2, 5), 0)
+    assert split_id(second) == (1000, worker_id(2, 5), 1)
+    assert issued_at(third).timestamp() == EPOCH_SECONDS + 1001
+    with pytest.raises(ValueError):
+        worker_id(8, 0)
+
+
+def test_ids_stay_monotonic_when_the_clock_misbehaves():
+    """A clock stepping back or an exhausted sequence never repeats an id"""
+    clock = FakeClock(EPOCH_SECONDS + 500)
+    ids = SaleIdAllocator(clock=clock)
+    issued = [ids.next_id() for _ in range(MAX_SEQUENCE + 3)]
+    clock.now -= 100
+    issued += [ids.next_id() for _ in range(3)]
+    assert issued == sorted(set(issued))
+    assert split_id(issued[-1])[0] == 501
+
+    restarted = SaleIdAllocator(clock=clock)
+    restarted.reserve_ids_through(issued[-1])
+    assert restarted.next_id() > issued[-1]
+
+
+def test_workers_issue_unique_ids_concurrently():
+    """Threads of several workers never share an id"""
+    workers = [SaleIdAllocator(worker_id(0, slot)) for slot in range(3)]
+    issued = []
+    lock = threading.Lock()
+
+    def allocate(ids):
+        batch = [ids.next_id() for _ in range(2000)]
+        with lock:
+            issued.extend(batch)
+
+    threads = [threading.Thread(target=allocate, args=(ids,)) for ids in workers for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(issued)) == 12000
+
+
+def test_sale_numbers_come_in_blocks_per_day():
+    """Workers sharing a block source number each day's sales without overlap"""
+    blocks = NumberBlocks()
+    a = SaleIdAllocator(block_size=2)
+    b = SaleIdAllocator(block_size=2)
+    numbers = [a.next_number('20260105', blocks), b.next_number('20260105', blocks),
+               a.next_number('20260105', blocks), a.next_number('20260105', blocks)]
+    assert numbers == [1, 3, 2, 5]
+    assert a.next_number('20260106', blocks) == 1
+
+    a.discard_numbers()
+    assert a.next_number('20260106', blocks) == 3
+    blocks.advance('20260106', 10)
+    assert blocks.lease('20260106', 2) == 10
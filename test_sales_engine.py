@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for transactional sale processing
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from inventory_store import ProductStore
+from sales_engine import SaleEngine, InsufficientStock, InvalidSaleItem, ProductNotFound
+
+
+def make_engine():
+    store = ProductStore([
+        {'id': 1, 'name': 'Cotton Fabric - Blue', 'sku': 'CTN-BLU-001', 'category': 'Textiles',
+         'stock': 150, 'price': 25.50, 'cost': 18.00},
+        {'id': 2, 'name': 'LED Light Bulb 10W', 'sku': 'LED-10W-001', 'category': 'Electronics',
+         'stock': 5, 'price': 45.00, 'cost': 30.00},
+    ])
+    return SaleEngine(store)
+
+
+def test_sale_commits_all_lines():
+    """A valid sale decrements every line and records totals"""
+    engine = make_engine()
+    sale = engine.process([{'product_id': 1, 'quantity': 2}, {'product_id': 2, 'quantity': 5}])
+    assert sale['sale_number'] == f'#{datetime.now():%Y%m%d}001'
+    assert sale['total_amount'] == pytest.approx(2 * 25.50 + 5 * 45.00)
+    assert engine.store.get(2)['stock'] == 0
+    assert engine.store.get(2)['status'] == 'Out of Stock'
+    assert list(engine.sales) == [sale]
+
+
+def test_failing_listener_does_not_fail_the_sale(caplog):
+    """A listener that raises is logged; later listeners still see the committed sale"""
+    engine = make_engine()
+    seen = []
+
+    def broken(sale, lines):
+        raise RuntimeError('boom')
+
+    engine.listeners.extend([broken, lambda sale, lines: seen.append(sale)])
+    sale = engine.process([{'product_id': 2, 'quantity': 1}])
+    assert seen == [sale]
+    assert engine.store.get(2)['stock'] == 4
+    assert 'boom' in caplog.text
+
+
+def test_failed_line_leaves_stock_untouched():
+    """A short line rolls back the whole sale"""
+    engine = make_engine()
+    with pytest.raises(InsufficientStock):
+        engine.process([{'product_id': 1, 'quantity': 10}, {'product_id': 2, 'quantity': 6}])
+    assert engine.store.get(1)['stock'] == 150
+    assert len(engine.sales) == 0
+
+    # Duplicate lines for the same product are checked against their sum
+    with pytest.raises(InsufficientStock):
+        engine.process([{'product_id': 2, 'quantity': 3}, {'product_id': 2, 'quantity': 3}])
+    assert engine.store.get(2)['stock'] == 5
+
+
+def test_invalid_lines_are_rejected():
+    """Unknown products and bad quantities raise before any change"""
+    engine = make_engine()
+    with pytest.raises(ProductNotFound):
+        engine.process([{'product_id': 1, 'quantity': 1}, {'product_id': 42, 'quantity': 1}])
+    with pytest.raises(InvalidSaleItem):
+        engine.process([{'product_id': 1, 'quantity': 0}])
+    with pytest.raises(InvalidSaleItem):
+        engine.process([])
+    with pytest.raises(InvalidSaleItem):
+        engine.process(5)
+    assert engine.store.get(1)['stock'] == 150
+
+
+def test_concurrent_sales_never_oversell():
+    """Parallel sales of the same SKU never take stock below zero"""
+    engine = make_engine()
+    sold = []
+
+    def sell():
+        for _ in range(20):
+            try:
+                engine.process([{'product_id': 2, 'quantity': 1}, {'product_id': 1, 'quantity': 1}])
+                sold.append(1)
+            except InsufficientStock:
+                pass
+
+    threads = [threading.Thread(target=sell) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sold) == 5
+    assert engine.store.get(2)['stock'] == 0
+    assert engine.store.get(1)['stock'] == 145
+    assert len({sale['id'] for sale in engine.sales}) == 5
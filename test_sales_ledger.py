@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded sales ledger
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import sales_ledger
+from sales_ledger import SalesLedger
+
+START = datetime(2024, 1, 1, 9, 0)
+
+
+def make_sale(sale_id):
+    return {'id': sale_id, 'date': (START + timedelta(hours=sale_id)).isoformat(),
+            'items': [{'product_id': 1, 'sku': 'CTN-BLU-001', 'quantity': 1, 'price': 25.5}],
+            'total_amount': 25.5}
+
+
+def test_hot_window_spills_to_segments(tmp_path, monkeypatch):
+    """Old sales move to disk while the in-memory window stays bounded"""
+    monkeypatch.setattr(sales_ledger, 'BLOCK_SIZE', 10)
+    ledger = SalesLedger(str(tmp_path), hot_limit=100)
+    for sale_id in range(1, 1001):
+        ledger.append(make_sale(sale_id))
+
+    assert len(ledger) == 1000
+    assert len(ledger.recent()) <= 100
+    assert ledger.segment_count() > 0
+    assert [sale['id'] for sale in ledger] == list(range(1, 1001))
+    assert ledger.last_id == 1000
+
+
+def test_range_query_and_reload(tmp_path, monkeypatch):
+    """Time-range queries reach spilled sales and survive a reopen"""
+    monkeypatch.setattr(sales_ledger, 'BLOCK_SIZE', 10)
+    ledger = SalesLedger(str(tmp_path), hot_limit=50)
+    for sale_id in range(1, 201):
+        ledger.append(make_sale(sale_id))
+
+    start, end = START + timedelta(hours=20), START + timedelta(hours=30)
+    assert [sale['id'] for sale in ledger.query(start, end)] == list(range(20, 31))
+
+    reopened = SalesLedger(str(tmp_path), hot_limit=50)
+    assert len(reopened) == sum(1 for _ in reopened.query())
+    assert [sale['id'] for sale in reopened.query(start, end)] == list(range(20, 31))
+    assert not any(name.endswith('.tmp') for name in os.listdir(tmp_path))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for product search (search_index.py)
+"""
+
+import pytest
+
+import search_index
+from inventory_store import ProductStore
+from search_index import RANK_EXACT_SKU, RANK_NAME, RANK_NAME_WORDS, RANK_SKU_PREFIX, SearchIndex, normalize
+
+
+def make_product(name, sku, stock=10):
+    return {'name': name, 'sku': sku, 'category': 'Textiles', 'stock': stock, 'price': 10.0, 'cost': 5.0}
+
+
+def test_normalize_folds_accents_case_and_arabic_variants():
+    """Diacritics, harakat, hamza carriers and letter variants fold to plain letters"""
+    assert normalize('Crème  BRÛLÉE-Épicée') == 'creme brulee epicee'
+    assert normalize('زَيْت أَرْغان') == normalize('زيت ارغان')
+    assert normalize('مربّى') == normalize('مربي')
+    assert normalize('قهوة') == 'قهوه'
+
+
+@pytest.mark.parametrize('scan_limit', [0, search_index.SCAN_LIMIT])
+def test_search_ranks_skus_then_word_starts_then_substrings(monkeypatch, scan_limit):
+    """Exact SKU, SKU prefix, word-start name and inner name matches rank in that order"""
+    # Posting list intersections and name checks give the same matches
+    monkeypatch.setattr(search_index, 'SCAN_LIMIT', scan_limit)
+    store = ProductStore()
+    index = SearchIndex()
+    index.attach(store)
+    ids = {}
+    for name, sku in [('Cotton Fabric - Blue', 'CTN-BLU-001'), ('Cotton Fabric - Red', 'CTN-RED-001'),
+                      ('Ctn Wrap', 'WRP-001'), ('Acetone', 'ACT-001'), ('Tissu Coton Écru', 'TSS-001')]:
+        ids[sku] = store.add(make_product(name, sku))['id']
+
+    total, page = index.search('ctn-blu-001')
+    assert page[0] == (RANK_EXACT_SKU, ids['CTN-BLU-001'])
+    total, page = index.search('CTN-')
+    assert page == [(RANK_SKU_PREFIX, ids['CTN-BLU-001']), (RANK_SKU_PREFIX, ids['CTN-RED-001']),
+                    (RANK_NAME_WORDS, ids['WRP-001'])]
+    total, page = index.search('ecru cot')
+    assert page == [(RANK_NAME_WORDS, ids['TSS-001'])]
+    total, page = index.search('ton')
+    assert (total, page[0]) == (4, (RANK_NAME, ids['ACT-001']))
+    total, page = index.search('ton', offset=3, limit=2)
+    assert (total, len(page)) == (4, 1)
+    assert index.search('zz') == (0, [])
+
+
+def test_renames_and_new_products_are_searchable_immediately():
+    """The store listener re-indexes changed names and buffers new SKUs"""
+    store = ProductStore()
+    index = SearchIndex()
+    index.attach(store)
+    product = store.add(make_product('Argan Oil', 'OIL-ARG-001'))
+    assert index.search('argan')[0] == 1
+    store.bulk_upsert([make_product('زيت أرغان', 'OIL-ARG-001')])
+    assert index.search('argan') == (0, [])
+    assert index.search('ارغان')[1] == [(RANK_NAME_WORDS, product['id'])]
+    # Stock changes leave the index alone
+    store.adjust_stock(product['id'], -1)
+    assert index.search('oil-arg')[1] == [(RANK_SKU_PREFIX, product['id'])]
+
+
+def test_products_without_name_or_sku_are_not_matched():
+    """Missing names and SKUs index as empty strings instead of failing the mutation"""
+    store = ProductStore()
+    index = SearchIndex()
+    index.attach(store)
+    store.add(make_product(None, None))
+    product = store.add(make_product('Linen Towel', 'LIN-TWL-001'))
+    assert index.search('lin') == (1, [(RANK_SKU_PREFIX, product['id'])])
+    assert index.search('') == (0, [])
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for inventory state shared between worker processes (shared_state.py)
+"""
+
+import multiprocessing
+from datetime import datetime, timedelta
+
+import pytest
+
+from inventory_store import ProductStore
+from sales_engine import InsufficientStock, SaleEngine
+from shared_state import SharedSalesLedger, SharedState
+
+
+def make_worker(path):
+    """One worker process' store and sale engine on a shared database"""
+    store = ProductStore([
+        {'name': 'Argan Oil', 'sku': 'ARG-001', 'category': 'Cosmetics', 'stock': 40, 'price': 90, 'cost': 50},
+        {'name': 'Mint Tea', 'sku': 'TEA-001', 'category': 'Food', 'stock': 25, 'price': 30, 'cost': 12},
+    ])
+    state = SharedState(str(path))
+    engine = SaleEngine(store, SharedSalesLedger(state))
+    state.attach(store, engine)
+    return state, store, engine
+
+
+def test_workers_see_each_others_writes(tmp_path):
+    """Products, adjustments and sales of one worker reach the other"""
+    path = tmp_path / 'inventory.db'
+    state_a, store_a, engine_a = make_worker(path)
+    state_b, store_b, engine_b = make_worker(path)
+    seen = []
+    engine_b.listeners.append(lambda sale, lines: seen.append((sale['id'], lines[0][0]['sku'])))
+
+    store_a.add({'name': 'Cedar Box', 'sku': 'CDR-001', 'category': 'Woodwork',
+                 'stock': 8, 'price': 120, 'cost': 70})
+    store_a.adjust_stock(2, 5)
+    sale = engine_a.process([{'product_id': 1, 'quantity': 3}])
+    state_b.refresh()
+
+    assert store_b.get_by_sku('CDR-001')['stock'] == 8
+    assert store_b.get(2)['stock'] == 30
+    assert store_b.get(1)['stock'] == 37
+    assert store_b.aggregates.total_products == 3
+    assert seen == [(sale['id'], 'ARG-001')]
+
+    # Workers hold distinct slots and lease distinct sale number blocks
+    second = engine_b.process([{'product_id': 3, 'quantity': 1}])
+    assert engine_a.ids.worker_id != engine_b.ids.worker_id
+    assert second['id'] > sale['id']
+    assert (sale['sale_number'][9:], second['sale_number'][9:]) == ('001', '101')
+    assert len(engine_a.sales) == len(engine_b.sales) == 2
+    assert [s['id'] for s in engine_a.sales] == [sale['id'], second['id']]
+
+
+def test_writes_validate_against_shared_stock(tmp_path):
+    """A worker cannot sell stock another worker already sold"""
+    path = tmp_path / 'inventory.db'
+    _, _, engine_a = make_worker(path)
+    _, store_b, engine_b = make_worker(path)
+    engine_a.process([{'product_id': 1, 'quantity': 40}])
+    with pytest.raises(InsufficientStock):
+        engine_b.process([{'product_id': 1, 'quantity': 1}])
+    assert store_b.get(1)['stock'] == 0
+
+
+def test_restarted_worker_loads_shared_state(tmp_path):
+    """A new worker starts from the database, not its seed products"""
+    path = tmp_path / 'inventory.db'
+    _, store, engine = make_worker(path)
+    store.adjust_stock(1, -15)
+    engine.process([{'product_id': 2, 'quantity': 5}])
+
+    _, store, engine = make_worker(path)
+    assert [p['stock'] for p in store.all()] == [25, 20]
+    assert engine.process([{'product_id': 2, 'quantity': 1}])['sale_number'].endswith('101')
+    today = datetime.now()
+    assert len(list(engine.sales.query(today - timedelta(hours=1), today + timedelta(hours=1)))) == 2
+    assert list(engine.sales.query(today + timedelta(days=1))) == []
+
+
+def _sell_until_out(path, results):
+    _, _, engine = make_worker(path)
+    sold = []
+    for _ in range(30):
+        try:
+            sale = engine.process([{'product_id': 1, 'quantity': 1}])
+            sold.append((sale['id'], sale['sale_number']))
+        except InsufficientStock:
+            pass
+    results.put(sold)
+
+
+def test_processes_never_oversell_or_reuse_ids(tmp_path):
+    """Concurrent worker processes sell exactly the stock, with unique ids"""
+    path = str(tmp_path / 'inventory.db')
+    make_worker(path)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    workers = [context.Process(target=_sell_until_out, args=(path, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    sold = [sale for _ in workers for sale in results.get(timeout=60)]
+    for worker in workers:
+        worker.join()
+
+    assert len(sold) == 40
+    assert len({sale_id for sale_id, _ in sold}) == len({number for _, number in sold}) == 40
+    _, store, engine = make_worker(path)
+    assert store.get(1)['stock'] == 0
+    assert len(engine.sales) == 40
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite performance profile (sqlite_tuning.py)
+"""
+
+from flask import Flask
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+import sqlite_tuning
+from config import Config, TestingConfig
+from sqlite_tuning import enable_sqlite_performance, read_pragmas
+
+PRAGMA_NAMES = ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'foreign_keys')
+
+
+def test_pragmas_applied_to_every_connection(tmp_path):
+    """Each pooled connection of a tuned engine gets the configured pragmas"""
+    engine = create_engine(f'sqlite:///{tmp_path / "sims.db"}', **Config.SQLALCHEMY_ENGINE_OPTIONS)
+    enable_sqlite_performance(Config.SQLITE_PRAGMAS, engine)
+    with engine.connect():
+        # A second connection is opened while the first is checked out
+        assert read_pragmas(engine, PRAGMA_NAMES) == {
+            'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024, 'foreign_keys': 1
+        }
+    assert engine.pool.size() == Config.SQLALCHEMY_ENGINE_OPTIONS['pool_size']
+    engine.dispose()
+
+
+def test_reenabling_replaces_pragmas(tmp_path):
+    """Enabling twice on one target keeps a single listener with the new values"""
+    engine = create_engine(f'sqlite:///{tmp_path / "sims.db"}')
+    enable_sqlite_performance({'busy_timeout': 100}, engine)
+    listener = enable_sqlite_performance({'busy_timeout': 200}, engine)
+    assert read_pragmas(engine, ['busy_timeout']) == {'busy_timeout': 200}
+    event.remove(engine, 'connect', listener)
+    engine.dispose()
+
+
+def test_init_app_enables_profile_for_sqlite():
+    """Config.init_app registers the profile for engines created later"""
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    TestingConfig.init_app(app)
+    listener = sqlite_tuning._listeners.pop(Engine)
+    try:
+        assert event.contains(Engine, 'connect', listener)
+    finally:
+        event.remove(Engine, 'connect', listener)
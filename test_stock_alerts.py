@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for stock levels and the alert engine (stock_alerts.py)
+"""
+
+from inventory_store import ProductStore, stock_level, stock_status
+from sales_engine import SaleEngine
+from stock_alerts import AlertEngine
+
+
+def make_store():
+    return ProductStore([
+        {'name': 'Argan Oil', 'sku': 'ARG-001', 'category': 'Cosmetics', 'stock': 40,
+         'price': 90, 'cost': 50, 'reorder_level': 20},
+        {'name': 'Mint Tea', 'sku': 'TEA-001', 'category': 'Food', 'stock': 25, 'price': 30, 'cost': 12},
+        {'name': 'Cedar Box', 'sku': 'CDR-001', 'category': 'Woodwork', 'stock': 3, 'price': 120, 'cost': 70},
+    ])
+
+
+def test_levels_follow_the_reorder_level():
+    """Low at the reorder level, critical at half of it, with the default level of 10"""
+    assert [stock_level(stock) for stock in (11, 10, 6, 5, 0)] == ['normal', 'low', 'low', 'critical', 'out']
+    assert stock_level(20, reorder_level=20) == 'low'
+    assert stock_level(10, reorder_level=20) == 'critical'
+    assert stock_status(5) == 'Low Stock'
+    assert make_store().get(1)['status'] == 'Normal'
+
+
+def test_mutations_raise_transitions():
+    """Sales and adjustments report each level crossing once, as it happens"""
+    store = make_store()
+    alerts = AlertEngine()
+    alerts.attach(store)
+    seen = []
+    alerts.listeners.append(seen.append)
+    engine = SaleEngine(store)
+
+    engine.process([{'product_id': 1, 'quantity': 20}])
+    engine.process([{'product_id': 1, 'quantity': 1}])
+    store.adjust_stock(1, -19)
+    store.adjust_stock(3, 50)
+    assert [(t['sku'], t['from'], t['to'], t['escalated']) for t in seen] == [
+        ('ARG-001', 'normal', 'low', True),
+        ('ARG-001', 'low', 'out', True),
+        ('CDR-001', 'critical', 'normal', False),
+    ]
+    # Reloading the same catalog is not a change
+    store.load(dict(product) for product in store.all())
+    assert len(seen) == 3
+    assert alerts.recent(1)[0]['sku'] == 'CDR-001'
+
+
+def test_attention_is_ordered_by_days_of_cover():
+    """The queue holds only products below normal, fewest days of cover first"""
+    store = make_store()
+    demand = {'ARG-001': 10.0, 'TEA-001': 1.0, 'CDR-001': 0.5}
+    alerts = AlertEngine(demand_rate=lambda product: demand[product['sku']])
+    alerts.attach(store)
+    assert [p['sku'] for p in alerts.attention()] == ['CDR-001']
+
+    store.adjust_stock(1, -25)
+    store.adjust_stock(2, -17)
+    assert [(p['sku'], p['days_of_cover']) for p in alerts.attention()] == [
+        ('ARG-001', 1.5), ('CDR-001', 6.0), ('TEA-001', 8.0)]
+    assert alerts.most_urgent()['level'] == 'low'
+
+    store.adjust_stock(1, 100)
+    assert [p['sku'] for p in alerts.attention(limit=1)] == ['CDR-001']
+    assert alerts.most_urgent()['sku'] == 'CDR-001'
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the indexed in-memory product store
+"""
+
+import pytest
+
+from inventory_store import ProductStore, DuplicateSKUError, STATUS_LOW, STATUS_NORMAL, STATUS_OUT
+
+
+def make_store():
+    return ProductStore([
+        {'id': 1, 'name': 'Cotton Fabric - Blue', 'sku': 'CTN-BLU-001', 'category': 'Textiles',
+         'stock': 150, 'price': 25.50, 'cost': 18.00},
+        {'id': 2, 'name': 'LED Light Bulb 10W', 'sku': 'LED-10W-001', 'category': 'Electronics',
+         'stock': 5, 'price': 45.00, 'cost': 30.00},
+        {'id': 3, 'name': 'Office Chair Premium', 'sku': 'CHR-OFF-001', 'category': 'Office Supplies',
+         'stock': 0, 'price': 350.00, 'cost': 250.00},
+    ])
+
+
+def test_lookups_by_id_and_sku():
+    """Products are reachable by id and by SKU"""
+    store = make_store()
+    assert store.get(2)['sku'] == 'LED-10W-001'
+    assert store.get_by_sku('CHR-OFF-001')['id'] == 3
+    assert store.get(99) is None
+    assert store.get_by_sku('NOPE') is None
+
+
+def test_secondary_indexes():
+    """Category and status listings come from the secondary indexes"""
+    store = make_store()
+    assert [p['id'] for p in store.in_category('Textiles')] == [1]
+    assert [p['id'] for p in store.with_status(STATUS_LOW)] == [2]
+    assert [p['id'] for p in store.with_status(STATUS_OUT)] == [3]
+
+
+def test_add_assigns_next_id_and_rejects_duplicate_sku():
+    """New products get the next free id and SKUs stay unique"""
+    store = make_store()
+    product = store.add({'name': 'Silk', 'sku': 'SLK-RED-001', 'category': 'Textiles',
+                         'stock': 75, 'price': 85.0, 'cost': 60.0})
+    assert product['id'] == 4
+    assert product['status'] == STATUS_NORMAL
+    assert len(store.in_category('Textiles')) == 2
+    with pytest.raises(DuplicateSKUError):
+        store.add({'name': 'Copy', 'sku': 'SLK-RED-001', 'category': 'Textiles',
+                   'stock': 1, 'price': 1.0, 'cost': 1.0})
+
+
+def test_adjust_stock_moves_status_index():
+    """Stock changes keep the status index in sync"""
+    store = make_store()
+    store.adjust_stock(1, -145)
+    assert store.get(1)['status'] == STATUS_LOW
+    assert {p['id'] for p in store.with_status(STATUS_LOW)} == {1, 2}
+    store.adjust_stock(1, -100)
+    assert store.get(1)['stock'] == 0
+    assert {p['id'] for p in store.with_status(STATUS_OUT)} == {1, 3}
+    assert store.with_status(STATUS_NORMAL) == []
+    assert store.adjust_stock(99, 5) is None
+
+
+def test_query_pages_with_cursor():
+    """Listings are filtered, sorted and resumed from a cursor key"""
+    store = make_store()
+    store.add({'name': 'Silk', 'sku': 'SLK-RED-001', 'category': 'Textiles',
+               'stock': 75, 'price': 85.0, 'cost': 60.0})
+
+    page, next_key, total = store.query(sort='price', descending=True, limit=2)
+    assert [p['id'] for p in page] == [3, 4]
+    assert total == 4
+    page, next_key, _ = store.query(sort='price', descending=True, after=next_key, limit=2)
+    assert [p['id'] for p in page] == [2, 1]
+    assert next_key is None
+
+    page, _, total = store.query(category='Textiles', min_stock=100)
+    assert [p['id'] for p in page] == [1]
+    assert total == 1
+    page, _, _ = store.query(category='Textiles', status=STATUS_NORMAL, sort='name')
+    assert [p['name'] for p in page] == ['Cotton Fabric - Blue', 'Silk']
+
+
+def test_aggregates_follow_every_mutation():
+    """Running totals match a full recomputation after adds and stock changes"""
+    store = make_store()
+    store.add({'name': 'Silk', 'sku': 'SLK-RED-001', 'category': 'Textiles',
+               'stock': 75, 'price': 85.0, 'cost': 60.0})
+    store.adjust_stock(1, -145)
+    store.adjust_stock(2, -5)
+
+    totals = store.aggregates.as_dict()
+    products = store.all()
+    assert totals['total_products'] == 4
+    assert totals['inventory_value'] == round(sum(p['stock'] * p['cost'] for p in products), 2)
+    assert totals['retail_value'] == round(sum(p['stock'] * p['price'] for p in products), 2)
+    assert totals['low_stock_count'] == 1
+    assert totals['out_of_stock_count'] == 2
+    assert totals['categories']['Textiles'] == {
+        'products': 2, 'units': 80, 'inventory_value': 5 * 18.0 + 75 * 60.0,
+        'retail_value': 5 * 25.5 + 75 * 85.0
+    }
+
+
+def test_bulk_adjust_merges_entries_per_product():
+    """Bulk adjustments resolve ids and SKUs and update each product once"""
+    store = make_store()
+    version = store.version
+    results = store.bulk_adjust([
+        {'product_id': 2, 'adjustment': 20},
+        {'sku': 'LED-10W-001', 'adjustment': -1},
+        {'sku': 'CHR-OFF-001', 'adjustment': 4},
+        {'sku': 'NOPE', 'adjustment': 1},
+        {'product_id': 1, 'adjustment': 'many'},
+        {'product_id': [1], 'adjustment': 1},
+        {'sku': {'CHR': 1}, 'adjustment': 1},
+        {'product_id': 1, 'adjustment': 1.9},
+        {'product_id': 1, 'adjustment': True},
+        {'product_id': 1, 'adjustment': 2.0},
+    ])
+    assert [r['success'] for r in results] == [True, True, True, False, False, False, False, False, False, True]
+    assert [r.get('error') for r in results[5:9]] == ['product_id must be an integer', 'sku must be a string',
+                                                      'Adjustment must be an integer', 'Adjustment must be an integer']
+    assert results[0]['stock'] == results[1]['stock'] == 24
+    assert results[2]['status'] == STATUS_LOW
+    assert results[3]['error'] == 'Product not found'
+    assert store.get(1)['stock'] == 152
+    # One version bump per product touched
+    assert store.version == version + 3
+    assert store.aggregates.out_of_stock_count == 0
+
+
+def test_failing_listener_does_not_break_the_mutation(caplog):
+    """A listener that raises is logged; later listeners still run and the change stands"""
+    store = make_store()
+    seen = []
+
+    def broken(product):
+        raise RuntimeError('boom')
+
+    store.listeners.extend([broken, seen.append])
+    product = store.adjust_stock(2, 10)
+    assert product['stock'] == 15
+    assert seen == [product]
+    assert 'boom' in caplog.text
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded LRU/TTL cache
+"""
+
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_and_count_hits():
+    """Entries are served until their TTL passes"""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    clock.now = 61
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 0)
+
+
+def test_lru_eviction_and_tag_invalidation():
+    """The least recently used entry is evicted; tags drop related entries"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.put('a', 1, tags=('sku:A',))
+    cache.put('b', 2, tags=('sku:B',))
+    cache.get('a')
+    cache.put('c', 3, tags=('sku:A',))
+    assert cache.get('b') is None
+    assert cache.stats()['evictions'] == 1
+
+    cache.invalidate_tag('sku:A')
+    assert len(cache) == 0
+    assert cache.stats()['invalidations'] == 2